@@ -0,0 +1,46 @@
+// Carga diferida de imágenes: index.py emite las que quedan bajo el pliegue con data-src/data-srcset en lugar
+// de src/srcset, y aquí se copian a los atributos reales cuando la imagen se acerca a la ventana visible.
+// Dash crea el contenido de páginas y pestañas dinámicamente, así que se vigilan los nodos que se agregan.
+(function () {
+    function cargar(img) {
+        var picture = img.parentNode;
+        if (picture && picture.tagName === 'PICTURE') {
+            picture.querySelectorAll('source[data-srcset]').forEach(function (fuente) {
+                fuente.srcset = fuente.getAttribute('data-srcset');
+                fuente.removeAttribute('data-srcset');
+            });
+        }
+        if (img.hasAttribute('data-srcset')) {
+            img.srcset = img.getAttribute('data-srcset');
+            img.removeAttribute('data-srcset');
+        }
+        img.src = img.getAttribute('data-src');
+        img.removeAttribute('data-src');
+    }
+
+    var observador = 'IntersectionObserver' in window ? new IntersectionObserver(function (entradas) {
+        entradas.forEach(function (entrada) {
+            if (entrada.isIntersecting) {
+                observador.unobserve(entrada.target);
+                cargar(entrada.target);
+            }
+        });
+    }, {rootMargin: '200px 0px'}) : null;
+
+    function registrar(nodo) {
+        if (nodo.nodeType !== 1) {
+            return;
+        }
+        var imagenes = nodo.matches('img[data-src]') ? [nodo] : nodo.querySelectorAll('img[data-src]');
+        Array.prototype.forEach.call(imagenes, function (img) {
+            observador ? observador.observe(img) : cargar(img);
+        });
+    }
+
+    new MutationObserver(function (cambios) {
+        cambios.forEach(function (cambio) {
+            cambio.addedNodes.forEach(registrar);
+        });
+    }).observe(document.documentElement, {childList: true, subtree: true});
+    registrar(document.documentElement);
+})();
@@ -0,0 +1,272 @@
+# Benchmark de index.py sobre mástiles sintéticos a distintas escalas.
+#
+#   python benchmark.py                              # escalas 1x, 10x y 100x y eda.xlsx, en .cache_datos/benchmark.json
+#   python benchmark.py --escalas 1 10 --salida resultados.json --comparar .cache_datos/benchmark.json
+#   python benchmark.py --escalas --archivos otro_mastil.xlsx
+#
+# Genera un mástil sintético por escala con las mismas columnas que eda.xlsx (huecos y valores fuera de rango
+# incluidos) y registra cada uno, junto con los archivos reales de --archivos (eda.xlsx si existe), como sitio
+# de la app con una caché vacía. Mide la carga, la limpieza por reglas de rango, el trabajo de descomposición
+# estacional, cada constructor create_*, los callbacks de pestañas y display_page, con el tamaño de lo que se envía.
+#
+# Lo que no mide: el trabajo de descomposición corre en este mismo proceso (turno incluido), sin el arranque del
+# proceso de DiskcacheManager ni el sondeo del navegador; tampoco la ingesta de lotes ni el backtesting de modelos.
+import os
+import sys
+import json
+import time
+import inspect
+import argparse
+import platform
+import tempfile
+import subprocess
+import numpy as np
+import pandas as pd
+
+FILAS_BASE = 19109  # registros de eda.xlsx: unos cuatro meses y medio a 10 minutos
+PASO = pd.Timedelta(minutes=10)
+
+
+def ruido_suave(generador, n, escala_registros):
+    # Ruido gaussiano filtrado con un núcleo exponencial: da series autocorrelacionadas como las de un mástil
+    nucleo = np.exp(-np.arange(4 * escala_registros) / escala_registros)
+    ruido = np.convolve(generador.standard_normal(n + len(nucleo)), nucleo / np.sqrt((nucleo ** 2).sum()), mode='valid')
+    return ruido[:n]
+
+
+def generar_mastil(n_filas, semilla=0, fraccion_huecos=0.02, fraccion_fuera_de_rango=0.005):
+    generador = np.random.default_rng(semilla)
+    fechas = pd.date_range('2022-01-01', periods=n_filas, freq=PASO)
+    hora = (fechas.hour.to_numpy() + fechas.minute.to_numpy() / 60) / 24 * 2 * np.pi
+    diurno = np.sin(hora - np.pi / 2)
+
+    # Velocidad a 100 m y perfil vertical con ley de potencia (exponente mayor de noche)
+    v100 = np.clip(12.3 + 4.0 * ruido_suave(generador, n_filas, 72) + 0.8 * diurno, 0.2, None)
+    alfa = np.clip(0.12 - 0.04 * diurno + 0.02 * ruido_suave(generador, n_filas, 36), 0.0, 0.4)
+    v80, v60 = v100 * 0.8 ** alfa, v100 * 0.6 ** alfa
+    direccion = (66 + np.cumsum(generador.normal(0, 2.0, n_filas))) % 360
+
+    def gemelo(v):
+        return v * (1 + generador.normal(0, 0.01, n_filas))
+
+    tabla = pd.DataFrame({
+        'SoftwareVersion': fechas,
+        'WindSpeed100m_1': gemelo(v100),
+        'WinSpeed100m_2': gemelo(v100),
+        'WindSpeed80_1': gemelo(v80),
+        'WindSpeed80_2': gemelo(v80),
+        'WindSpeed60': gemelo(v60),
+        'Presion': 1006.2 + 1.8 * ruido_suave(generador, n_filas, 144),
+        'Humedad': np.clip(84.5 + 4.0 * ruido_suave(generador, n_filas, 72) - 3 * diurno, 0, 100),
+        'Temperatura100m': 26.3 + 0.6 * diurno + 0.5 * ruido_suave(generador, n_filas, 144),
+        'Temperatura21m': 26.5 + 0.8 * diurno + 0.5 * ruido_suave(generador, n_filas, 144),
+        'canal vacio': np.zeros(n_filas, dtype=np.int64),
+        'WindDirection100': direccion,
+        'WindDirection80': (direccion + generador.normal(0, 1.0, n_filas)) % 360,
+        'WindDirection60m': (direccion + generador.normal(0, 1.5, n_filas)) % 360,
+    })
+
+    sensores = [col for col in tabla.columns if col not in ('SoftwareVersion', 'canal vacio')]
+    # Huecos: rachas de longitud geométrica (media de 2 horas) que empiezan en posiciones aleatorias
+    for col in sensores:
+        n_rachas = max(1, int(n_filas * fraccion_huecos / 12))
+        inicios = generador.integers(0, n_filas, n_rachas)
+        largos = generador.geometric(1 / 12, n_rachas)
+        posiciones = (inicios[:, None] + np.arange(largos.max())[None, :])[np.arange(largos.max())[None, :] < largos[:, None]]
+        tabla.loc[np.minimum(posiciones, n_filas - 1), col] = np.nan
+    # Valores fuera de rango del estilo de los del dataset real (sensores pegados o descalibrados)
+    fuera_de_rango = {'WindSpeed100m_1': [0.2, 45], 'WindSpeed80_2': [0.2, 45], 'WindSpeed60': [0.2, 45], 'Presion': [900, 1100],
+                      'Humedad': [0.03, 120], 'Temperatura100m': [-29.9, 60], 'WindDirection100': [-10, 400]}
+    for col, valores in fuera_de_rango.items():
+        filas = generador.choice(n_filas, int(n_filas * fraccion_fuera_de_rango), replace=False)
+        tabla.loc[filas, col] = generador.choice(valores, len(filas))
+    return tabla
+
+
+def medir(funcion, *args, **kwargs):
+    inicio = time.perf_counter()
+    resultado = funcion(*args, **kwargs)
+    return time.perf_counter() - inicio, resultado
+
+
+def tamano_json(objeto):
+    import plotly.io.json
+    return len(plotly.io.json.to_json_plotly(objeto))
+
+
+def medir_constructores(index, sitio):
+    resultados = {}
+    for nombre in sorted(n for n in dir(index) if n.startswith('create_')):
+        constructor = getattr(index, nombre)
+        parametros = list(inspect.signature(constructor).parameters)
+        if parametros[:1] != ['sitio']:
+            continue
+        frio, figura = medir(constructor, sitio)
+        caliente, _ = medir(constructor, sitio)  # Acierto de la caché de figuras
+        resultados[nombre] = {'frio_s': frio, 'caliente_s': caliente, 'bytes': tamano_json(figura)}
+    return resultados
+
+
+def medir_callbacks(index, sitio):
+    # Con la caché de figuras vacía: la primera llamada arma y serializa las figuras a partir de los
+    # resultados derivados (rollups, perfiles, ajustes) que ya quedaron calculados para esta versión
+    index.vaciar_cache_figuras()
+    resultados = {}
+    pestanas_eda = ['tab-graficos', 'tab-tablas', 'tab-estadisticas', 'tab-cortante', 'tab-weibull', 'tab-correlacion', 'tab-crudos']
+    for tab in pestanas_eda:
+        frio, salida = medir(index.tab_layout2, tab, sitio)
+        caliente, _ = medir(index.tab_layout2, tab, sitio)
+        resultados[f'tab_layout2/{tab}'] = {'frio_s': frio, 'caliente_s': caliente, 'bytes': tamano_json(salida)}
+    return resultados
+
+
+def medir_descomposicion(index, sitio):
+    # Lo mismo que hace calcular_descomposicion en el proceso de fondo, sin descomposiciones previas en disco ni en la LRU
+    version = index.version_sitio(sitio)
+    index.descomposicion_variable.cache_clear()
+    index.podar_descomposiciones(sitio, None)
+    resultados = {}
+    inicio = time.perf_counter()
+    with index.turno_trabajo():
+        resultados['turno_s'] = time.perf_counter() - inicio
+        for var in index.wind_variables:
+            resultados[var] = {'frio_s': medir(index.descomposicion_variable, sitio, var, version)[0]}
+        resultados['figura_s'], figura = medir(index.create_seasonal_decomposition_figure, sitio)
+    resultados['trabajo_s'] = time.perf_counter() - inicio
+    resultados['bytes'] = tamano_json(figura)
+    return resultados
+
+
+def medir_escala(index, sitio, ruta):
+    from index import (almacen_sitio, leer_archivo, _leer_almacen, _preparar_eda, _compactar, aplicar_reglas_rango,
+                       reglas_rango, estado_sitio)
+
+    resultado = {}
+    resultado['carga_fria_s'], destino = medir(almacen_sitio, ruta)  # Parseo + limpieza por rango + almacén columnar
+    resultado['carga_caliente_s'], tabla = medir(lambda: _compactar(_leer_almacen(destino)))  # Memory-map del almacén
+    resultado['filas'] = len(tabla)
+    crudo = _compactar(_preparar_eda(leer_archivo(ruta)))
+    resultado['limpieza_rangos_s'], (_, reporte) = medir(aplicar_reglas_rango, crudo, reglas_rango)
+    resultado['rechazados_por_rango'] = int(reporte['Rechazados'].sum())
+    resultado['estado_sitio_s'], estado = medir(estado_sitio, sitio)
+    resultado['bytes_dataset'] = int(estado['df'].memory_usage(index=True, deep=True).sum())
+    resultado['descomposicion'] = medir_descomposicion(index, sitio)
+    index.vaciar_cache_figuras()  # Los constructores se miden desde cero, incluida la figura de descomposición
+    resultado['constructores'] = medir_constructores(index, sitio)
+    resultado['callbacks'] = medir_callbacks(index, sitio)
+    return resultado
+
+
+def medir_generales(index):
+    # Callbacks y constructores que no dependen del sitio (introducción, modelos y navegación)
+    resultados = {}
+    for tab in ['tab-int', 'tab-descripcion', 'tab-diccionario']:
+        segundos, salida = medir(index.tab_layout1, tab)
+        resultados[f'tab_layout1/{tab}'] = {'frio_s': segundos, 'bytes': tamano_json(salida)}
+    for tab in index.modelos_objetivos:
+        frio, salida = medir(index.tab_layout3, tab)
+        caliente, _ = medir(index.tab_layout3, tab)
+        resultados[f'tab_layout3/{tab}'] = {'frio_s': frio, 'caliente_s': caliente, 'bytes': tamano_json(salida)}
+    for ruta in ['/', '/eda', '/modelos']:
+        segundos, salida = medir(index.display_page, ruta)
+        resultados[f'display_page{ruta}'] = {'frio_s': segundos, 'bytes': tamano_json(salida)}
+    return resultados
+
+
+def aplanar(datos, prefijo=''):
+    for clave, valor in datos.items():
+        if isinstance(valor, dict):
+            yield from aplanar(valor, f'{prefijo}{clave}.')
+        else:
+            yield f'{prefijo}{clave}', valor
+
+
+def comparar(actual, anterior, tolerancia):
+    # Lista los tiempos que empeoraron más que la tolerancia respecto a una corrida anterior
+    previos = dict(aplanar(anterior))
+    regresiones = []
+    for clave, valor in aplanar(actual):
+        previo = previos.get(clave)
+        if clave.endswith('_s') and isinstance(previo, (int, float)) and previo > 0.001 and valor > previo * (1 + tolerancia):
+            regresiones.append((clave, previo, valor))
+    return regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de index.py sobre mástiles sintéticos')
+    raiz = os.path.dirname(os.path.abspath(__file__))
+    parser.add_argument('--escalas', type=int, nargs='*', default=[1, 10, 100], help='múltiplos del tamaño de eda.xlsx')
+    parser.add_argument('--filas-base', type=int, default=FILAS_BASE)
+    parser.add_argument('--archivos', nargs='*', default=[p for p in [os.path.join(raiz, 'eda.xlsx')] if os.path.exists(p)],
+                        help='mástiles reales que se miden además de los sintéticos (por defecto eda.xlsx si existe)')
+    parser.add_argument('--salida', default=os.path.join(raiz, '.cache_datos', 'benchmark.json'))
+    parser.add_argument('--comparar', help='JSON de una corrida anterior para señalar regresiones')
+    parser.add_argument('--tolerancia', type=float, default=0.2, help='aumento relativo de tiempo que cuenta como regresión')
+    parser.add_argument('--semilla', type=int, default=0)
+    args = parser.parse_args()
+
+    directorio = tempfile.mkdtemp(prefix='benchmark-')
+    rutas = {}
+    generacion = {}
+    for escala in args.escalas:
+        sitio = f'x{escala}'
+        rutas[sitio] = os.path.join(directorio, f'{sitio}.parquet')
+        generacion[sitio], tabla = medir(generar_mastil, args.filas_base * escala, args.semilla)
+        tabla.to_parquet(rutas[sitio])
+    for archivo in args.archivos:
+        rutas[os.path.splitext(os.path.basename(archivo))[0]] = os.path.abspath(archivo)
+
+    # La app se importa con una caché vacía, sin ingesta ni calentamiento y con los sitios sintéticos registrados
+    os.environ.update({
+        'DIRECTORIO_CACHE': os.path.join(directorio, 'cache'),
+        'DIRECTORIO_INGESTA': os.path.join(directorio, 'ingesta'),
+        'SITIOS': json.dumps(rutas),
+        'MODO_ARRANQUE': 'perezoso',
+    })
+    # index.py usa rutas relativas a su directorio (modelos.xlsx, assets)
+    args.salida = os.path.abspath(args.salida)
+    args.comparar = args.comparar and os.path.abspath(args.comparar)
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    sys.path.insert(0, os.getcwd())
+    importacion, index = medir(__import__, 'index')
+
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    import dash
+    import plotly
+    resultados = {
+        'fecha': pd.Timestamp.now().isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'versiones': {'numpy': np.__version__, 'pandas': pd.__version__, 'dash': dash.__version__, 'plotly': plotly.__version__},
+        'importacion_s': importacion,
+        'generales': medir_generales(index),
+        'escalas': {},
+    }
+    for sitio, ruta in rutas.items():
+        print(f'Midiendo {sitio} ({os.path.basename(ruta)})...', flush=True)
+        resultados['escalas'][sitio] = {'generacion_s': generacion.get(sitio), **medir_escala(index, sitio, ruta)}
+
+    os.makedirs(os.path.dirname(args.salida), exist_ok=True)
+    with open(args.salida, 'w') as f:
+        json.dump(resultados, f, indent=2)
+    print(f'Resultados en {args.salida}')
+    for sitio, escala in resultados['escalas'].items():
+        print(f"  {sitio}: {escala['filas']} filas, carga {escala['carga_fria_s']:.2f} s (fría) / {escala['carga_caliente_s']:.3f} s, "
+              f"limpieza {escala['limpieza_rangos_s']:.3f} s, descomposición {escala['descomposicion']['trabajo_s']:.2f} s")
+        for nombre, medida in {**escala['constructores'], **escala['callbacks']}.items():
+            print(f"    {nombre:<40} {medida['frio_s']:8.3f} s {medida['bytes'] / 1024:10.1f} KiB")
+
+    if args.comparar:
+        with open(args.comparar) as f:
+            regresiones = comparar(resultados, json.load(f), args.tolerancia)
+        for clave, previo, valor in regresiones:
+            print(f'REGRESIÓN {clave}: {previo:.3f} s -> {valor:.3f} s')
+        if regresiones:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
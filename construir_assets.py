@@ -0,0 +1,165 @@
+# Paso de construcción de los recursos estáticos de index.py.
+#
+#   python construir_assets.py                 # genera assets_optimizados/ a partir de assets/
+#   python construir_assets.py --limpiar       # además borra las variantes que ya no están en el manifiesto
+#
+# Cada PNG de assets/ que index.py muestra con imagen(...) se reescala a los anchos de ANCHOS (sin ampliar nunca el original) y se guarda en AVIF
+# (si Pillow lo soporta) y WebP, más un PNG de respaldo a ANCHO_RESPALDO, con la huella del contenido en el
+# nombre: intro-1a2b3c4d-360.webp. Los PNG que la app ya no usa (las capturas de los modelos, reemplazadas por
+# figuras) se dejan fuera.
+# Los recursos de texto (JS, CSS, SVG) se copian con su huella y con versiones precomprimidas .gz y .br
+# (esta última solo si está instalado brotli). index.py lee manifiesto.json para armar los srcset y sirve
+# todo desde /estaticos con caché inmutable de un año. Como los nombres dependen del contenido, volver a
+# ejecutarlo solo genera lo que cambió.
+import os
+import io
+import re
+import gzip
+import json
+import shutil
+import hashlib
+import argparse
+import concurrent.futures
+from PIL import Image, features
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+DIRECTORIO = os.path.dirname(os.path.abspath(__file__))
+ANCHOS = (180, 360, 720, 1080)
+ANCHO_RESPALDO = 360  # el PNG solo lo usan navegadores sin WebP: basta con un ancho
+FORMATOS = {
+    'avif': {'quality': 55, 'speed': 8},
+    'webp': {'quality': 80, 'method': 4},
+    'png': {'optimize': True},
+}
+EXTENSIONES_TEXTO = ('.js', '.css', '.svg')
+NOMBRE_MANIFIESTO = 'manifiesto.json'
+APLICACION = os.path.join(DIRECTORIO, 'index.py')
+
+
+def huella(contenido):
+    return hashlib.sha256(contenido).hexdigest()[:8]
+
+
+def imagenes_usadas(aplicacion=APLICACION):
+    # Nombres pasados como primer argumento a imagen(...) en la app
+    with open(aplicacion, encoding='utf-8') as archivo:
+        return set(re.findall(r"imagen\(\s*'([^']+\.png)'", archivo.read()))
+
+
+def formatos_disponibles():
+    # AVIF depende de cómo se compiló Pillow (libavif); sin él quedan WebP y PNG
+    return [formato for formato in FORMATOS if formato != 'avif' or features.check('avif')]
+
+
+def variantes_imagen(ruta, destino, formatos):
+    with open(ruta, 'rb') as archivo:
+        contenido = archivo.read()
+    base = os.path.splitext(os.path.basename(ruta))[0]
+    sello = huella(contenido)
+    # Image.open solo lee la cabecera: si todas las variantes ya existen la imagen no llega a decodificarse
+    original = Image.open(io.BytesIO(contenido))
+    ancho, alto = original.size
+    if original.mode not in ('RGB', 'RGBA'):
+        original = original.convert('RGBA' if 'A' in original.getbands() or 'transparency' in original.info else 'RGB')
+
+    anchos = sorted({min(objetivo, ancho) for objetivo in ANCHOS})
+    entrada = {'ancho': ancho, 'alto': alto, 'bytes': len(contenido), 'variantes': {formato: [] for formato in formatos}}
+    for objetivo in anchos:
+        escalada = None
+        for formato in formatos:
+            if formato == 'png' and objetivo != min(ANCHO_RESPALDO, ancho):
+                continue
+            nombre = f'{base}-{sello}-{objetivo}.{formato}'
+            ruta_variante = os.path.join(destino, nombre)
+            if not os.path.exists(ruta_variante):
+                if escalada is None:
+                    escalada = original if objetivo == ancho else original.resize(
+                        (objetivo, max(1, round(alto * objetivo / ancho))), Image.LANCZOS)
+                temporal = ruta_variante + '.tmp'
+                escalada.save(temporal, format=formato.upper(), **FORMATOS[formato])
+                os.replace(temporal, ruta_variante)
+            entrada['variantes'][formato].append({'ancho': objetivo, 'archivo': nombre, 'bytes': os.path.getsize(ruta_variante)})
+    return entrada
+
+
+def comprimir(ruta):
+    with open(ruta, 'rb') as archivo:
+        contenido = archivo.read()
+    # mtime=0 para que el .gz sea reproducible y no cambie entre construcciones
+    with open(ruta + '.gz', 'wb') as archivo:
+        archivo.write(gzip.compress(contenido, compresslevel=9, mtime=0))
+    if brotli is not None:
+        with open(ruta + '.br', 'wb') as archivo:
+            archivo.write(brotli.compress(contenido, quality=11))
+
+
+def variante_texto(ruta, destino):
+    with open(ruta, 'rb') as archivo:
+        contenido = archivo.read()
+    base, extension = os.path.splitext(os.path.basename(ruta))
+    nombre = f'{base}-{huella(contenido)}{extension}'
+    ruta_variante = os.path.join(destino, nombre)
+    if not os.path.exists(ruta_variante):
+        shutil.copyfile(ruta, ruta_variante)
+    if not os.path.exists(ruta_variante + '.gz') or (brotli is not None and not os.path.exists(ruta_variante + '.br')):
+        comprimir(ruta_variante)
+    return {'archivo': nombre, 'bytes': len(contenido)}
+
+
+def construir(origen, destino, limpiar=False):
+    os.makedirs(destino, exist_ok=True)
+    formatos = formatos_disponibles()
+    manifiesto = {'formatos': formatos, 'imagenes': {}, 'textos': {}}
+    nombres = sorted(os.listdir(origen))
+    usadas = imagenes_usadas()
+    imagenes = [nombre for nombre in nombres if nombre.lower().endswith('.png') and nombre in usadas]
+    # La codificación AVIF/WebP es lo costoso: una imagen por proceso
+    with concurrent.futures.ProcessPoolExecutor() as ejecutor:
+        entradas = ejecutor.map(variantes_imagen, [os.path.join(origen, nombre) for nombre in imagenes],
+                                [destino] * len(imagenes), [formatos] * len(imagenes))
+        manifiesto['imagenes'] = dict(zip(imagenes, entradas))
+    for nombre in nombres:
+        if os.path.splitext(nombre)[1].lower() in EXTENSIONES_TEXTO:
+            manifiesto['textos'][nombre] = variante_texto(os.path.join(origen, nombre), destino)
+
+    temporal = os.path.join(destino, NOMBRE_MANIFIESTO + '.tmp')
+    with open(temporal, 'w', encoding='utf-8') as archivo:
+        json.dump(manifiesto, archivo, indent=1)
+    os.replace(temporal, os.path.join(destino, NOMBRE_MANIFIESTO))
+
+    if limpiar:
+        vigentes = {NOMBRE_MANIFIESTO}
+        for entrada in manifiesto['imagenes'].values():
+            vigentes.update(variante['archivo'] for lista in entrada['variantes'].values() for variante in lista)
+        for entrada in manifiesto['textos'].values():
+            vigentes.update(entrada['archivo'] + sufijo for sufijo in ('', '.gz', '.br'))
+        for nombre in os.listdir(destino):
+            if nombre not in vigentes:
+                os.remove(os.path.join(destino, nombre))
+    return manifiesto
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Genera las variantes optimizadas de assets/')
+    parser.add_argument('--origen', default=os.path.join(DIRECTORIO, 'assets'))
+    parser.add_argument('--destino', default=os.path.join(DIRECTORIO, 'assets_optimizados'))
+    parser.add_argument('--limpiar', action='store_true', help='borra las variantes obsoletas')
+    args = parser.parse_args()
+
+    manifiesto = construir(args.origen, args.destino, limpiar=args.limpiar)
+    total_original = sum(entrada['bytes'] for entrada in manifiesto['imagenes'].values())
+    print(f"{len(manifiesto['imagenes'])} imágenes ({total_original / 1e6:.1f} MB), formatos: {', '.join(manifiesto['formatos'])}")
+    for nombre, entrada in manifiesto['imagenes'].items():
+        detalle = ', '.join(f"{formato} {lista[0]['ancho']} px {lista[0]['bytes'] / 1024:.0f} KB"
+                            for formato, lista in entrada['variantes'].items())
+        print(f"  {nombre}: {entrada['bytes'] / 1024:.0f} KB -> {detalle}")
+    for nombre, entrada in manifiesto['textos'].items():
+        print(f"  {nombre} -> {entrada['archivo']} (+ .gz{' y .br' if brotli is not None else ''})")
+
+
+if __name__ == '__main__':
+    main()
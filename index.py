@@ -1,4 +1,26 @@
+import os
+import io
+import sys
+import json
+import re
+import base64
+import pickle
+import shutil
+import hashlib
+import mimetypes
+import functools
+import threading
+import multiprocessing
+import collections
+import concurrent.futures
+import traceback
+import tempfile
+import time
+import contextlib
 import dash
+import flask
+import diskcache
+import psutil
 import numpy as np
 import pandas as pd
 from dash import dcc, html
@@ -7,18 +29,390 @@ import plotly.graph_objs as go
 from plotly.subplots import make_subplots
 import dash_bootstrap_components as dbc  
 
-# Estilo de Dash con Bootstrap
-app = dash.Dash(external_stylesheets=[dbc.themes.ZEPHYR], suppress_callback_exceptions=True)
+# Recursos estáticos optimizados que genera construir_assets.py: variantes AVIF/WebP/PNG redimensionadas de
+# las imágenes de assets/ y los scripts con su huella y precomprimidos. Sin manifiesto se usan los originales.
+directorio_estaticos = os.environ.get('DIRECTORIO_ESTATICOS', 'assets_optimizados')
+RUTA_ESTATICOS = '/estaticos/'
+CACHE_ESTATICOS_S = 365 * 24 * 3600
+
+
+def leer_manifiesto_estaticos():
+    try:
+        with open(os.path.join(directorio_estaticos, 'manifiesto.json'), encoding='utf-8') as archivo:
+            return json.load(archivo)
+    except (OSError, ValueError):
+        return {'formatos': [], 'imagenes': {}, 'textos': {}}
+
+
+manifiesto_estaticos = leer_manifiesto_estaticos()
+scripts_estaticos = manifiesto_estaticos['textos']
+
+# Estilo de Dash con Bootstrap. Se pasa el nombre del módulo para que Dash no lo deduzca inspeccionando la pila
+# de llamadas, que recorre el código fuente de todos los módulos cargados y es lo más lento del arranque.
+# Los scripts de assets/ que tienen versión optimizada se sirven desde /estaticos en lugar de /assets.
+app = dash.Dash(
+    __name__, external_stylesheets=[dbc.themes.ZEPHYR], suppress_callback_exceptions=True,
+    external_scripts=[RUTA_ESTATICOS + entrada['archivo'] for entrada in scripts_estaticos.values()],
+    assets_ignore='|'.join(f'^{re.escape(nombre)}$' for nombre in scripts_estaticos),
+)
 server = app.server
 
-# Datos a usar
+# Caché columnar en disco: el Excel se convierte una sola vez a un almacén de arreglos .npy
+# (uno por columna) que cada worker abre con memory-map en lugar de volver a parsear el libro
+directorio_cache = os.environ.get('DIRECTORIO_CACHE', '.cache_datos')
+VERSION_ALMACEN = 2  # Cambiar si cambia el formato del almacén o la preparación de los datos
+
+
+def _huella_archivo(ruta):
+    # Hash del contenido del archivo; se reutiliza mientras no cambien su mtime ni su tamaño
+    info = os.stat(ruta)
+    ruta_indice = os.path.join(directorio_cache, 'indice.json')
+    try:
+        with open(ruta_indice) as f:
+            indice = json.load(f)
+    except (OSError, ValueError):
+        indice = {}
+
+    clave_rapida = f'{os.path.abspath(ruta)}|{info.st_mtime_ns}|{info.st_size}'
+    if clave_rapida not in indice:
+        sha = hashlib.sha256()
+        with open(ruta, 'rb') as f:
+            for bloque in iter(lambda: f.read(1 << 20), b''):
+                sha.update(bloque)
+        indice[clave_rapida] = sha.hexdigest()
+        os.makedirs(directorio_cache, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directorio_cache, suffix='.json')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(indice, f)
+        os.replace(tmp, ruta_indice)  # Reemplazo atómico, seguro entre workers
+
+    nombre = os.path.splitext(os.path.basename(ruta))[0]
+    return f'{nombre}-v{VERSION_ALMACEN}-{indice[clave_rapida][:16]}-{info.st_mtime_ns}'
+
+
+def _guardar_almacen(tabla, destino, metadatos=None):
+    # Escribe en un directorio temporal y lo renombra al final para que ningún worker lea un almacén a medias
+    os.makedirs(directorio_cache, exist_ok=True)
+    tmp = tempfile.mkdtemp(dir=directorio_cache)
+    columnas = []
+    for i, col in enumerate(tabla.columns):
+        valores = tabla[col].to_numpy()
+        np.save(os.path.join(tmp, f'{i}.npy'), valores, allow_pickle=valores.dtype == object)
+        columnas.append({'nombre': col, 'archivo': f'{i}.npy', 'objeto': valores.dtype == object})
+    with open(os.path.join(tmp, 'columnas.json'), 'w') as f:
+        json.dump(columnas, f)
+    if metadatos is not None:
+        with open(os.path.join(tmp, 'metadatos.json'), 'w') as f:
+            json.dump(metadatos, f)
+    try:
+        os.rename(tmp, destino)
+    except OSError:
+        shutil.rmtree(tmp, ignore_errors=True)  # Otro worker ya lo generó
+
+
+def _leer_almacen(origen):
+    with open(os.path.join(origen, 'columnas.json')) as f:
+        columnas = json.load(f)
+    datos = {}
+    for col in columnas:
+        ruta = os.path.join(origen, col['archivo'])
+        # Las columnas numéricas se mapean en memoria (solo lectura): las páginas se comparten entre workers
+        datos[col['nombre']] = np.load(ruta, allow_pickle=True) if col['objeto'] else np.load(ruta, mmap_mode='r')
+    return pd.DataFrame(datos, copy=False)
+
+
+def _leer_metadatos(origen):
+    with open(os.path.join(origen, 'metadatos.json')) as f:
+        return json.load(f)
+
+
+# Almacenes de solo-anexión: un segmento guarda solo las filas nuevas y en sus metadatos el nombre del almacén
+# sobre el que se anexa ('anterior'). Leerlo es leer la cadena desde la base y concatenar; como la concatenación
+# ya no comparte el memory-map entre workers, al pasar de MAX_SEGMENTOS_ALMACEN segmentos se compacta la cadena
+# en un almacén completo.
+MAX_SEGMENTOS_ALMACEN = int(os.environ.get('MAX_SEGMENTOS_ALMACEN', 8))
+
+
+def _capas_almacen(destino):
+    # Directorios que forman el almacén, de la base al último segmento
+    capas = [destino]
+    while os.path.exists(os.path.join(capas[0], 'metadatos.json')):
+        anterior = _leer_metadatos(capas[0]).get('anterior')
+        if anterior is None:
+            break
+        capas.insert(0, os.path.join(directorio_cache, anterior))
+    return capas
+
+
+def _leer_capas(destino):
+    capas = _capas_almacen(destino)
+    if len(capas) == 1:
+        return _leer_almacen(destino)
+    return pd.concat([_leer_almacen(capa) for capa in capas], ignore_index=True)
+
+
+def _anexar_almacen(anterior, filas, destino, metadatos=None):
+    # Escribe `filas` como segmento sobre `anterior`, o la cadena compactada si ya tiene demasiados segmentos
+    metadatos = dict(metadatos or {})
+    if len(_capas_almacen(anterior)) > MAX_SEGMENTOS_ALMACEN:
+        _guardar_almacen(pd.concat([_leer_capas(anterior), filas], ignore_index=True), destino, metadatos)
+    else:
+        _guardar_almacen(filas, destino, {**metadatos, 'anterior': os.path.basename(anterior)})
+
+
+def podar_formatos_anteriores():
+    # Almacenes y derivados escritos con otro VERSION_ALMACEN: ninguna versión de este código los vuelve a leer
+    for nombre in os.listdir(directorio_cache) if os.path.isdir(directorio_cache) else []:
+        formato = re.search(r'-v(\d+)-[0-9a-f]{16}', nombre)
+        if formato and int(formato.group(1)) != VERSION_ALMACEN:
+            shutil.rmtree(os.path.join(directorio_cache, nombre), ignore_errors=True)
+
+
+def _preparar_eda(tabla):
+    tabla = tabla.rename(columns={'SoftwareVersion': 'Fecha'})
+    # Asegurarte de que la columna 'Fecha' está en formato datetime
+    tabla['Fecha'] = pd.to_datetime(tabla['Fecha'], errors='coerce')  # Convierte a datetime, ignorando errores
+    # Los sensores se guardan en float32: la mitad de memoria y precisión de sobra para las mediciones
+    flotantes = tabla.select_dtypes('float').columns
+    tabla[flotantes] = tabla[flotantes].astype(np.float32)
+    return tabla
+
+
+def _compactar(tabla):
+    # Modelo compacto en memoria: índice datetime64 con la fecha, sensores en float32 y texto como categorías
+    tabla = tabla.set_index('Fecha')
+    textos = tabla.select_dtypes(['object', 'string']).columns
+    return tabla.astype({col: 'category' for col in textos}) if len(textos) else tabla
+
+
+def leer_archivo(ruta):
+    if ruta.endswith('.parquet'):
+        return pd.read_parquet(ruta)
+    elif ruta.endswith('.csv'):
+        return pd.read_csv(ruta)
+    return pd.read_excel(ruta)
+
+
+def cargar_datos(ruta, preparar=None):
+    # Lee el almacén columnar si existe para esta versión del archivo; si no, parsea el Excel (o Parquet/CSV) y lo genera
+    destino = os.path.join(directorio_cache, _huella_archivo(ruta))
+    if not os.path.isdir(destino):
+        tabla = leer_archivo(ruta)
+        if preparar is not None:
+            tabla = preparar(tabla)
+        _guardar_almacen(tabla, destino)
+    return _leer_almacen(destino)
+
+
+def _preparar_sitio(tabla):
+    # Dataset tal como se sirve: compactado y con las reglas de rango ya aplicadas. El reporte de rechazados
+    # se guarda como metadato del almacén, porque después de limpiar ya no puede recalcularse.
+    tabla, reporte = aplicar_reglas_rango(_compactar(_preparar_eda(tabla)), reglas_rango)
+    return tabla.reset_index(), {'reporte_rangos': reporte.to_dict('list')}
+
+
+def almacen_sitio(archivo):
+    destino = os.path.join(directorio_cache, f'sitio-{_huella_archivo(archivo)}')
+    if not os.path.isdir(destino):
+        tabla, metadatos = _preparar_sitio(leer_archivo(archivo))
+        _guardar_almacen(tabla, destino, metadatos)
+    return destino
+
+
+# Trabajos en segundo plano: los cálculos pesados corren en procesos aparte mediante los callbacks en
+# segundo plano de Dash, con una cola en disco (diskcache) compartida por todos los workers. El navegador
+# recibe el identificador del trabajo y consulta su progreso sin ocupar un worker mientras espera.
+# MAX_TRABAJOS_SIMULTANEOS limita cuántos cálculos corren a la vez; los demás esperan turno en la cola.
+# Los trabajos corren en procesos que terminan al acabar: lo que calculan se guarda en cache_trabajos
+# (compartida en disco), no en cachés LRU que se perderían con el proceso.
+cache_trabajos = diskcache.Cache(os.path.join(directorio_cache, 'trabajos'))
+# Con cache_by (aunque vacío) Dash guarda el resultado de cada trabajo indexado por sus entradas, que
+# incluyen la versión del dataset: una versión nueva (ingesta, otro archivo) es otra entrada
+gestor_trabajos = dash.DiskcacheManager(cache_trabajos, cache_by=[], expire=24 * 3600)
+# Sin cache_by: cada pedido de reentrenamiento corre de nuevo (el resultado queda en directorio_backtesting)
+gestor_reentrenamiento = dash.DiskcacheManager(cache_trabajos, expire=24 * 3600)
+MAX_TRABAJOS_SIMULTANEOS = int(os.environ.get('MAX_TRABAJOS_SIMULTANEOS', 2))
+DURACION_TURNO_TRABAJO = int(os.environ.get('DURACION_TURNO_TRABAJO', 2 * 3600))  # segundos
+ESPERA_TURNO_TRABAJO = 0.5  # segundos entre intentos de tomar un turno
+
+
+def _proceso_vivo(pid, inicio):
+    # El pid solo cuenta si es el mismo proceso (misma hora de creación) y no quedó zombi tras ser terminado
+    try:
+        proceso = psutil.Process(pid)
+        return proceso.create_time() == inicio and proceso.status() != psutil.STATUS_ZOMBIE
+    except psutil.Error:
+        return False
+
+
+@contextlib.contextmanager
+def turno_trabajo():
+    # Cada turno ocupado guarda el pid del proceso que lo tomó, su hora de creación y la hora de la concesión.
+    # Dash mata los trabajos reemplazados sin pasar por el `finally`: un turno cuyo proceso ya no existe, o
+    # cuya concesión superó DURACION_TURNO_TRABAJO, se recupera en lugar de quedar ocupado para siempre.
+    yo = psutil.Process()
+    propio = (yo.pid, yo.create_time())
+    while True:
+        with cache_trabajos.transact():
+            ahora = time.time()
+            turnos = {n: (pid, inicio, desde) for n, (pid, inicio, desde) in cache_trabajos.get('turnos', {}).items()
+                      if ahora - desde < DURACION_TURNO_TRABAJO and _proceso_vivo(pid, inicio)}
+            libre = next((n for n in range(MAX_TRABAJOS_SIMULTANEOS) if n not in turnos), None)
+            if libre is not None:
+                turnos[libre] = (*propio, ahora)
+            cache_trabajos.set('turnos', turnos)
+        if libre is not None:
+            break
+        time.sleep(ESPERA_TURNO_TRABAJO)
+    try:
+        yield
+    finally:
+        with cache_trabajos.transact():
+            turnos = cache_trabajos.get('turnos', {})
+            if turnos.get(libre, ())[:2] == propio:
+                del turnos[libre]
+                cache_trabajos.set('turnos', turnos)
+
+# Registro de sitios (mástiles). Cada sitio es un dataset aparte que se carga la primera vez que se
+# consulta, junto con su estado derivado (reglas de rango, estadísticas y faltantes). Cuando los sitios
+# cargados superan MAX_BYTES_SITIOS se descarta el usado hace más tiempo; volverá a leerse del almacén.
+# SITIOS es un JSON {"nombre": "archivo.xlsx"} o la ruta a un archivo con ese JSON; una entrada también
+# puede ser {"archivo": ..., "ingesta": ...}. Sin SITIOS se usa un único sitio con eda.xlsx.
 file_path = r'eda.xlsx'
-df = pd.read_excel(file_path)
-df.rename(columns={'SoftwareVersion': 'Fecha'}, inplace=True)
-
-# Asegurarte de que la columna 'Fecha' está en formato datetime
-df['Fecha'] = pd.to_datetime(df['Fecha'], errors='coerce')  # Convierte a datetime, ignorando errores
-df['Mes'] = df['Fecha'].dt.month  # Extraer el mes de la columna 'Fecha'
+directorio_ingesta = os.environ.get('DIRECTORIO_INGESTA', 'ingesta')
+MAX_BYTES_SITIOS = int(os.environ.get('MAX_BYTES_SITIOS', 1024 * 1024 * 1024))
+
+
+def leer_registro_sitios():
+    valor = os.environ.get('SITIOS', '').strip()
+    if not valor:
+        return {'principal': {'archivo': file_path, 'ingesta': directorio_ingesta}}
+    if not valor.startswith('{'):
+        with open(valor) as f:
+            valor = f.read()
+    registro = {}
+    for nombre, entrada in json.loads(valor).items():
+        entrada = {'archivo': entrada} if isinstance(entrada, str) else dict(entrada)
+        entrada.setdefault('ingesta', os.path.join(directorio_ingesta, nombre))
+        registro[nombre] = entrada
+    return registro
+
+
+sitios = leer_registro_sitios()
+SITIO_PREDETERMINADO = next(iter(sitios))
+_sitios_cargados = collections.OrderedDict()
+_candado_sitios = threading.RLock()
+
+
+def version_datos(sitio, huella_base, archivos):
+    # Depende solo del archivo base y del conjunto de lotes ingeridos, no de cuándo ni en qué orden los leyó
+    # cada worker: todos los workers calculan la misma versión para los mismos datos
+    # Lleva VERSION_ALMACEN como la huella del archivo, para que podar_formatos_anteriores reconozca sus derivados
+    if not archivos:
+        return f'{sitio}-{huella_base}'
+    huella = hashlib.sha256('|'.join([sitio, huella_base] + sorted(archivos.values())).encode()).hexdigest()[:32]
+    return f'{sitio}-v{VERSION_ALMACEN}-{huella}'
+
+
+def estado_desde_almacen(sitio, destino, huella_base, archivos, candado=None):
+    # El almacén ya tiene los datos limpios: `df` solo envuelve las columnas mapeadas en memoria, sin copiarlas,
+    # así que los workers (y el proceso maestro con --preload) comparten las mismas páginas
+    tabla = _compactar(_leer_capas(destino))
+    estado = {
+        'df': tabla,
+        'almacen': destino,  # Último segmento (o almacén completo) de la versión
+        'version': version_datos(sitio, huella_base, archivos),  # Identifica la versión del dataset en las cachés de resultados
+        'huella_base': huella_base,
+        'reporte_rangos': pd.DataFrame(_leer_metadatos(destino)['reporte_rangos']),
+        'estadisticas': calcular_estadisticas(tabla),
+        # Conteo de faltantes por variable; al ingerir filas nuevas solo se suman los de esas filas
+        'conteo_faltantes': tabla[variables_a_analizar].isnull().sum(),
+        'total_filas': len(tabla),
+        'archivos_ingeridos': archivos,  # nombre -> huella de cada lote ya incorporado
+        'candado': candado or threading.Lock(),  # Serializa la ingesta del sitio; se conserva entre versiones
+    }
+    estado['missing_data'] = calcular_datos_faltantes(estado)
+    estado['bytes'] = int(tabla.memory_usage(index=True, deep=True).sum())
+    return estado
+
+
+def cargar_sitio(sitio):
+    archivo = sitios[sitio]['archivo']
+    estado = estado_desde_almacen(sitio, almacen_sitio(archivo), _huella_archivo(archivo), {})
+    return ingerir_lotes(sitio, estado) or estado
+
+
+def estado_sitio(sitio):
+    if sitio not in sitios:
+        raise ValueError(f'Sitio desconocido: {sitio}')
+    with _candado_sitios:
+        estado = _sitios_cargados.get(sitio)
+        if estado is None:
+            estado = _sitios_cargados[sitio] = cargar_sitio(sitio)
+            # Descarta los sitios usados hace más tiempo hasta respetar el presupuesto de memoria
+            while len(_sitios_cargados) > 1 and sum(e['bytes'] for e in _sitios_cargados.values()) > MAX_BYTES_SITIOS:
+                _sitios_cargados.popitem(last=False)
+        else:
+            _sitios_cargados.move_to_end(sitio)
+        return estado
+
+
+def datos_sitio(sitio):
+    return estado_sitio(sitio)['df']
+
+
+def version_sitio(sitio):
+    return estado_sitio(sitio)['version']
+
+# Imágenes con <picture>: una fuente por formato del manifiesto (AVIF y WebP) con todos sus anchos en srcset,
+# y el PNG redimensionado como respaldo, para que el navegador descargue la variante más liviana que le sirva al
+# tamaño mostrado (`tamanos`, el atributo sizes). Las que quedan bajo el pliegue salen con data-src/data-srcset
+# y las carga assets/diferidas.js al acercarse a la ventana, porque html.Img no admite loading='lazy'.
+mimetypes.add_type('image/avif', '.avif')
+mimetypes.add_type('image/webp', '.webp')
+
+
+def srcset_estatico(variantes):
+    return ', '.join(f"{RUTA_ESTATICOS}{variante['archivo']} {variante['ancho']}w" for variante in variantes)
+
+
+def imagen(nombre, tamanos, style=None, diferida=True, alt=''):
+    entrada = manifiesto_estaticos['imagenes'].get(nombre)
+    if entrada is None:
+        return html.Img(src=f'/assets/{nombre}', style=style, alt=alt)
+
+    atributo_src, atributo_srcset = ('data-src', 'data-srcset') if diferida else ('src', 'srcSet')
+    fuentes = [
+        html.Source(type=mimetypes.guess_type(f'x.{formato}')[0], sizes=tamanos,
+                    **{atributo_srcset: srcset_estatico(entrada['variantes'][formato])})
+        for formato in manifiesto_estaticos['formatos'] if formato != 'png'
+    ]
+    respaldo = entrada['variantes']['png']
+    imagen_png = html.Img(
+        sizes=tamanos, style=style, alt=alt,
+        **{atributo_src: RUTA_ESTATICOS + respaldo[-1]['archivo'], atributo_srcset: srcset_estatico(respaldo)}
+    )
+    return html.Picture(fuentes + [imagen_png], style={'display': 'contents'})
+
+
+@server.route(RUTA_ESTATICOS + '<path:archivo>')
+def ruta_estaticos(archivo):
+    # Los nombres llevan la huella del contenido, así que pueden cachearse sin revalidar. Para los recursos de
+    # texto se entrega la versión precomprimida (.br o .gz) que acepte el cliente.
+    aceptadas = flask.request.headers.get('Accept-Encoding', '')
+    for codificacion, sufijo in (('br', '.br'), ('gzip', '.gz')):
+        if codificacion in aceptadas and os.path.isfile(os.path.join(directorio_estaticos, archivo + sufijo)):
+            respuesta = flask.send_from_directory(
+                os.path.abspath(directorio_estaticos), archivo + sufijo,
+                mimetype=mimetypes.guess_type(archivo)[0], max_age=CACHE_ESTATICOS_S)
+            respuesta.headers['Content-Encoding'] = codificacion
+            break
+    else:
+        respuesta = flask.send_from_directory(os.path.abspath(directorio_estaticos), archivo, max_age=CACHE_ESTATICOS_S)
+    respuesta.cache_control.public = True
+    respuesta.cache_control.immutable = True
+    respuesta.vary.add('Accept-Encoding')
+    return respuesta
 
 # Definir las variables de interés
 variables = ['WindSpeed80_2', 'Presion', 'temperatura 100m', 'Humedad']
@@ -30,7 +424,7 @@ app.layout = html.Div([
     dbc.Row([
         dbc.Col([
             html.Div([
-                html.Div([html.Img(src='/assets/images.png', style={'width': '195px', 'marginTop': 'auto'})]),
+                html.Div([imagen('images.png', '195px', style={'width': '195px', 'marginTop': 'auto'}, diferida=False)]),
                 html.Hr(style={'border': '2px solid #A7C6ED'}),
                 dbc.Nav([
                     dbc.NavLink('INICIO', href='/', active='exact', style={'color': '#FFF', 'textAlign': 'center'}),
@@ -63,12 +457,25 @@ layout_pagina1 = html.Div([
 layout_pagina2 = html.Div([
     html.H1('Análisis exploratorio de datos', style={'fontWeight': 'bold', 'textAlign': 'center', 'color': '#004F6D'}),
     html.H5('En esta sección se mostrará por medio de gráficas y tablas el comportamiento de las variables y los datos.', style={'color': '#000000'}),
+    # Selector de sitio; con un solo sitio registrado queda oculto
+    html.Div([
+        html.Label('Sitio'),
+        dcc.Dropdown(id='selector-sitio', options=[{'label': nombre, 'value': nombre} for nombre in sitios],
+                     value=SITIO_PREDETERMINADO, clearable=False, persistence=True, persistence_type='session'),
+    ], style={'width': '250px', 'marginBottom': '10px', 'display': 'block' if len(sitios) > 1 else 'none'}),
     dcc.Tabs(id='tabs-eda', value='tab-eda', children=[
         dcc.Tab(label='Análisis de variables', value='tab-graficos', style={'border': '2px solid #004F6D', 'color': '#004F6D', 'fontWeight': 'bold'}),
         dcc.Tab(label='Descomposición Estacional', value='tab-tablas', style={'border': '2px solid #004F6D', 'color': '#004F6D', 'fontWeight': 'bold'}),
         dcc.Tab(label='Datos faltantes', value='tab-estadisticas', style={'border': '2px solid #004F6D', 'color': '#004F6D', 'fontWeight': 'bold'}),
+        dcc.Tab(label='Perfil vertical', value='tab-cortante', style={'border': '2px solid #004F6D', 'color': '#004F6D', 'fontWeight': 'bold'}),
+        dcc.Tab(label='Recurso y energía', value='tab-weibull', style={'border': '2px solid #004F6D', 'color': '#004F6D', 'fontWeight': 'bold'}),
+        dcc.Tab(label='Correlación de variables', value='tab-correlacion', style={'border': '2px solid #004F6D', 'color': '#004F6D', 'fontWeight': 'bold'}),
+        dcc.Tab(label='Datos crudos', value='tab-crudos', style={'border': '2px solid #004F6D', 'color': '#004F6D', 'fontWeight': 'bold'}),
     ]),
-    html.Div(id='tabs-eda-content')
+    html.Div(id='tabs-eda-content'),
+    # Revisión periódica de datos nuevos en el directorio de ingesta
+    dcc.Interval(id='intervalo-ingesta', interval=int(os.environ.get('INTERVALO_INGESTA_MS', 60000))),
+    dcc.Store(id='vista-eda')
 ])
 
 layout_pagina3 = html.Div([
@@ -80,7 +487,14 @@ layout_pagina3 = html.Div([
         dcc.Tab(label='Modelo 4', value='tab-modelo4', style={'border': '2px solid #004F6D', 'color': '#004F6D', 'fontWeight': 'bold'}),
         dcc.Tab(label='Modelo 5', value='tab-modelo5', style={'border': '2px solid #004F6D', 'color': '#004F6D', 'fontWeight': 'bold'}),
     ]),
-    html.Div(id='tabs-modelos-content')
+    html.Div(id='tabs-modelos-content'),
+    html.Div([
+        dbc.Button('Reentrenar modelos', id='boton-reentrenar', className='mb-3', color='primary',
+                   style={'background-color': '#004F6D', 'width': '250px', 'font-size': '16px'}),
+        dbc.Progress(id='progreso-reentrenamiento', value=0, striped=True, animated=True, style={'display': 'none'}),
+        html.Div(id='estado-reentrenamiento', style={'fontSize': '12px', 'color': '#555555'}),
+    ], style={'textAlign': 'center', 'marginTop': '20px'}),
+    dcc.Store(id='version-modelos')
 ])
 
 # Diccionario de variables
@@ -111,8 +525,8 @@ def tab_layout1(tab):
                 ' para analizar estas series de tiempo, identificar patrones y optimizar la predicción de energía eólica. Además, se desarrollarán visualizaciones interactivas para facilitar la toma de decisiones estratégicas basadas en estos datos.'
             ], style={'margin-top': '40px', 'text-align': 'justify'}),
             html.Div([
-                html.Img(src='/assets/intro2.png', style={'width': '34%', 'height': '340px', 'margin-right': '4%'}),
-                html.Img(src='/assets/intro.png', style={'width': '34%', 'height': '340px'})
+                imagen('intro2.png', 'calc((100vw - 15rem) * 0.34)', style={'width': '34%', 'height': '340px', 'margin-right': '4%'}, diferida=False),
+                imagen('intro.png', 'calc((100vw - 15rem) * 0.34)', style={'width': '34%', 'height': '340px'}, diferida=False)
             ], style={'display': 'flex', 'justify-content': 'center', 'margin-top': '20px'})
         ])
 
@@ -126,8 +540,8 @@ def tab_layout1(tab):
             ]),
             html.Div([
                 html.Div([
-                    html.Img(src='/assets/desc1.png', style={'width': '180px', 'height': '180px', 'margin-bottom': '20px'}),
-                    html.Img(src='/assets/desc2.png', style={'width': '180px', 'height': '180px', 'margin-bottom': '20px'})
+                    imagen('desc1.png', '180px', style={'width': '180px', 'height': '180px', 'margin-bottom': '20px'}),
+                    imagen('desc2.png', '180px', style={'width': '180px', 'height': '180px', 'margin-bottom': '20px'})
                 ], style={'display': 'flex', 'flex-direction': 'column', 'justify-content': 'flex-start', 'margin-right': '20px'}),
                 html.Div([
                     dbc.Button('Variables Clave', id='collapse-button-1', className='mb-3', color='primary',
@@ -138,8 +552,8 @@ def tab_layout1(tab):
                                style={'background-color': '#004F6D', 'width': '250px', 'font-size': '16px', 'margin-right': '10px'})
                 ], style={'display': 'flex', 'flex-direction': 'column', 'justify-content': 'center', 'align-items': 'center'}),
                 html.Div([
-                    html.Img(src='/assets/desc3.png', style={'width': '180px', 'height': '180px', 'margin-bottom': '10px'}),
-                    html.Img(src='/assets/desc4.png', style={'width': '180px', 'height': '180px', 'margin-bottom': '10px'})
+                    imagen('desc3.png', '180px', style={'width': '180px', 'height': '180px', 'margin-bottom': '10px'}),
+                    imagen('desc4.png', '180px', style={'width': '180px', 'height': '180px', 'margin-bottom': '10px'})
                 ], style={'display': 'flex', 'flex-direction': 'column', 'justify-content': 'flex-start', 'margin-left': '20px'})
             ], style={'display': 'flex', 'justify-content': 'center', 'align-items': 'center', 'margin-top': '40px'}),
             dbc.Collapse(
@@ -212,18 +626,33 @@ def tab_layout1(tab):
 
 # Callbacks para manejar el contenido en las pestañas
 @app.callback(
-    dash.dependencies.Output('tabs-eda-content', 'children'),
-    [dash.dependencies.Input('tabs-eda', 'value')]
+    [dash.dependencies.Output('tabs-eda-content', 'children'),
+     dash.dependencies.Output('vista-eda', 'data')],
+    [dash.dependencies.Input('tabs-eda', 'value'),
+     dash.dependencies.Input('selector-sitio', 'value'),
+     dash.dependencies.Input('intervalo-ingesta', 'n_intervals')],
+    [dash.dependencies.State('vista-eda', 'data')]
 )
-
-def tab_layout2(tab):
+def tab_layout2(tab, sitio=SITIO_PREDETERMINADO, n_intervals=None, vista=None):
+    # Cada tick del intervalo revisa si llegaron datos nuevos al sitio elegido; la pestaña solo se vuelve
+    # a dibujar si cambió la pestaña, el sitio o la versión de su dataset
+    revisar_ingesta(sitio)
+    vista_actual = {'tab': tab, 'sitio': sitio, 'version': version_sitio(sitio)}
+    if vista == vista_actual:
+        return dash.no_update, dash.no_update
+    return contenido_eda(tab, sitio), vista_actual
+
+
+def contenido_eda(tab, sitio=SITIO_PREDETERMINADO):
+    estado = estado_sitio(sitio)
+    tabla_sitio, version = estado['df'], estado['version']
     if tab == 'tab-graficos':
         return html.Div([
             html.H5('Estadísticas generales del conjunto de datos', style={'textAlign': 'center'}),
             dash_table.DataTable(
                 id='table',
-                columns=[{"name": i, "id": i} for i in df.describe().reset_index().columns],
-                data=df.describe().reset_index().to_dict('records'),
+                columns=[{"name": i, "id": i} for i in tabla_estadisticas(sitio, version).columns],
+                data=tabla_estadisticas(sitio, version).to_dict('records'),
                 style_table={'width': '100%', 'height': '400px', 'overflowY': 'auto', 'overflowX': 'auto'},  # Scroll vertical y horizontal
                 style_cell={
                     'textAlign': 'center',
@@ -252,6 +681,29 @@ def tab_layout2(tab):
                 ],
                 export_format='csv',
             ),
+            # Selección de ventana de tiempo y resolución para las series de tiempo
+            html.Div([
+                html.Div([
+                    html.Label('Rango de fechas'),
+                    dcc.DatePickerRange(
+                        id='rango-fechas',
+                        min_date_allowed=tabla_sitio.index.min().date(),
+                        max_date_allowed=tabla_sitio.index.max().date(),
+                        display_format='YYYY-MM-DD',
+                    ),
+                ], style={'margin-right': '30px'}),
+                html.Div([
+                    html.Label('Resolución'),
+                    dcc.RadioItems(
+                        id='resolucion',
+                        options=[{'label': etiqueta, 'value': valor} for valor, etiqueta in
+                                 [('raw', 'Datos crudos'), ('hora', 'Horaria'), ('dia', 'Diaria'), ('mes', 'Mensual')]],
+                        value='raw',
+                        inline=True,
+                        inputStyle={'margin-right': '5px', 'margin-left': '10px'},
+                    ),
+                ]),
+            ], style={'display': 'flex', 'justify-content': 'center', 'align-items': 'flex-end', 'marginTop': '20px'}),
             # Gráficos de líneas de velocidades del viento
             html.H3('Gráficos de Líneas para Velocidades del Viento', style={
                 'textAlign': 'center',
@@ -259,16 +711,26 @@ def tab_layout2(tab):
                 'color': '#004F6D',
                 'fontWeight': 'bold'
             }),
-            dcc.Graph(id='wind-speed-subplots', figure=create_wind_speed_figure()),  # Aquí se añade la gráfica de velocidades del viento
+            dcc.Graph(id='wind-speed-subplots', figure=create_wind_speed_figure(sitio)),  # Aquí se añade la gráfica de velocidades del viento
 
-            html.H3('Gráficos de dispersión polar', style={
+            html.H3('Rosas de los vientos', style={
                 'textAlign': 'center',
                 'marginTop': '40px',
                 'color': '#004F6D',
                 'fontWeight': 'bold'
             }),
             html.H5('Velocidad y dirección del viento a diferentes alturas (100m, 80m, 60m)', style={'textAlign': 'center'}),
-            dcc.Graph(id='windrose-graph', figure=create_polar_scatter()),  # Llamada a la función que genera las rosas de los vientos
+            html.Div([
+                html.Div([
+                    html.Label('Sectores de dirección'),
+                    dcc.Dropdown(id='sectores-rosa', options=[{'label': str(n), 'value': n} for n in [8, 12, 16, 24, 36]], value=16, clearable=False),
+                ], style={'width': '200px', 'margin-right': '20px'}),
+                html.Div([
+                    html.Label('Ancho de clase de velocidad (m/s)'),
+                    dcc.Dropdown(id='ancho-clase-rosa', options=[{'label': str(n), 'value': n} for n in [1, 2, 3, 5]], value=2, clearable=False),
+                ], style={'width': '250px'}),
+            ], style={'display': 'flex', 'justify-content': 'center'}),
+            dcc.Graph(id='windrose-graph', figure=create_polar_scatter(sitio)),  # Llamada a la función que genera las rosas de los vientos
 
             html.H3('Gráficos de Temperatura a Diferentes Alturas', style={
                 'textAlign': 'center',
@@ -276,286 +738,440 @@ def tab_layout2(tab):
                 'color': '#004F6D',
                 'fontWeight': 'bold'
             }),
-            dcc.Graph(id='temperature-graphs', figure=create_temperature_figure()),  # Gráfico de temperaturas a diferentes alturas
+            dcc.Graph(id='temperature-graphs', figure=create_temperature_figure(sitio)),  # Gráfico de temperaturas a diferentes alturas
         ], style={'display': 'flex', 'flexDirection': 'column', 'alignItems': 'center'})  # Centrar los gráficos
 
     elif tab == 'tab-tablas':
         return html.Div([
             html.H3('Descomposición Estacional de Velocidades del Viento', style={'textAlign': 'center'}),
-            dcc.Graph(id='seasonal-decompose-wind', figure=create_seasonal_decomposition_figure())  # Llamar a la función que genera la descomposición estacional
+            # La descomposición se calcula como trabajo en segundo plano (ver calcular_descomposicion)
+            dbc.Progress(id='progreso-descomposicion', value=0, striped=True, animated=True, style={'display': 'none'}),
+            dcc.Store(id='solicitud-descomposicion', data={'sitio': sitio, 'version': version}),
+            dcc.Graph(id='seasonal-decompose-wind')
         ])
 
     elif tab == 'tab-estadisticas':
         return html.Div([
             html.H5('Datos faltantes, según rango de valores variables meteorológicas', style={'textAlign': 'center'}),
-            dcc.Graph(id='missing-data-graph', figure=create_missing_data_plot()),  # Mostrar el gráfico de datos faltantes
-
-        ])
-
-
-
-# Callback para manejar el contenido de los modelos
-@app.callback(
-    dash.dependencies.Output('tabs-modelos-content', 'children'),
-    [dash.dependencies.Input('tabs-modelos', 'value')]
-)
+            dcc.Graph(id='missing-data-graph', figure=create_missing_data_plot(sitio)),  # Mostrar el gráfico de datos faltantes
 
-def tab_layout3(tab):
-    if tab == 'tab-modelo1':
-        data1 = pd.DataFrame({
-            'Modelo': ['Regresión K-NN', 'Regresión Lasso', 'Regresión Lineal', 'Regresión Ridge'],
-            'MAPE': [5.894020, 4.030474, 4.013425, 4.013893],
-            'RMSE': [1.227196, 0.851866, 0.845024, 0.846827],
-            'R^2': [0.510433, 0.764100, 0.767875, 0.766883],
-            'Ljung-Box p-value': ['1.169459e-22', '3.756088e-67', '1.306806e-63', '7.620692e-65'],
-            'Jarque-Bera p-value': [0.000070, 0.219406, 0.248818, 0.241076]
-        })
-        
-        return html.Div([
-            # Título al principio
-            html.H3('Modelo 1: Wind speed 100 metros (Sensor 1)', style={'textAlign': 'center', 'marginBottom': '15px'}), 
-            
+            html.H5('Valores rechazados por regla de rango', style={'textAlign': 'center', 'marginTop': '20px'}),
             dash_table.DataTable(
-                columns=[{"name": i, "id": i} for i in data1.columns],  # Columnas correctas
-                data=data1.to_dict('records'),  # Convierte el DataFrame a un diccionario
-                style_table={'width': '100%', 'overflowX': 'scroll'},
+                id='tabla-reglas-rango',
+                columns=[{"name": i, "id": i} for i in estado['reporte_rangos'].columns],
+                data=estado['reporte_rangos'].to_dict('records'),
+                style_table={'width': '100%', 'overflowX': 'auto'},
                 style_cell={
                     'textAlign': 'center',
-                    'padding': '10px',
-                    'whiteSpace': 'normal',
-                    'height': 'auto',
-                    'minWidth': '100px',
-                    'maxWidth': '180px',
-                    'fontSize': '14px',
+                    'padding': '4px',
+                    'fontSize': '12px',
                     'fontFamily': 'Arial'
                 },
                 style_header={
                     'backgroundColor': '#004F6D',
                     'fontWeight': 'bold',
                     'color': 'white',
-                    'border': '2px solid black'
+                    'border': '1px solid black',
                 },
-      
                 export_format='csv',
             ),
-            
-            # Primera imagen
-            html.Img(src='/assets/knn1.png', style={'width': '80%', 'display': 'block', 'margin': 'auto', 'padding': '20px'}),
-
-            # Segunda imagen
-            html.Img(src='/assets/lineal1.png', style={'width': '80%', 'display': 'block', 'margin': 'auto', 'padding': '20px'}),
 
-            # Tercera imagen
-            html.Img(src='/assets/ridge1.png', style={'width': '80%', 'display': 'block', 'margin': 'auto', 'padding': '20px'}),
+            html.H5('Huecos por sensor', style={'textAlign': 'center', 'marginTop': '20px'}),
+            dash_table.DataTable(
+                id='tabla-huecos',
+                columns=[{"name": i, "id": i} for i in resumen_huecos(sitio, version).columns],
+                data=resumen_huecos(sitio, version).to_dict('records'),
+                style_table={'width': '100%', 'overflowX': 'auto'},
+                style_cell={
+                    'textAlign': 'center',
+                    'padding': '4px',
+                    'fontSize': '12px',
+                    'fontFamily': 'Arial'
+                },
+                style_header={
+                    'backgroundColor': '#004F6D',
+                    'fontWeight': 'bold',
+                    'color': 'white',
+                    'border': '1px solid black',
+                },
+                sort_action='native',
+                export_format='csv',
+            ),
 
-            # Cuarta imagen
-            html.Img(src='/assets/lasso1.png', style={'width': '80%', 'display': 'block', 'margin': 'auto', 'padding': '20px'}),
-        ])
-    
-    elif tab == 'tab-modelo2':
-        data2 = pd.DataFrame({
-            'Modelo': ['Regresión K-NN', 'Regresión Lasso', 'Regresión Lineal', 'Regresión Ridge'],
-            'MAPE': [5.832642, 4.015778, 3.996092, 3.996013],
-            'RMSE': [1.204380, 0.837676, 0.830596, 0.832460],
-            'R^2': [0.517706, 0.766688, 0.770615, 0.769584],
-            'Ljung-Box p-value': ['8.404607e-23', '3.521004e-67', '1.214976e-63', '7.349954e-65'],
-            'Jarque-Bera p-value': [0.000114, 0.173372, 0.198714, 0.191579]
-        })
-        
-        return html.Div([
-            # Título al principio
-            html.H3('Modelo 2: Wind speed 100 metros (Sensor 2)', style={'textAlign': 'center', 'marginBottom': '15px'}),  
+            html.H5('Disponibilidad diaria por sensor', style={'textAlign': 'center', 'marginTop': '20px'}),
+            dcc.Graph(id='disponibilidad-graph', figure=create_availability_heatmap(sitio)),
 
+            html.H5('Consistencia entre sensores gemelos y relleno de huecos', style={'textAlign': 'center', 'marginTop': '20px'}),
             dash_table.DataTable(
-                columns=[{"name": i, "id": i} for i in data2.columns],  # Columnas correctas
-                data=data2.to_dict('records'),  # Convierte el DataFrame a un diccionario
-                style_table={'width': '100%', 'overflowX': 'scroll'},
+                id='tabla-consistencia',
+                columns=[{"name": i, "id": i} for i in resumen_consistencia(sitio, version).columns],
+                data=resumen_consistencia(sitio, version).to_dict('records'),
+                style_table={'width': '100%', 'overflowX': 'auto'},
                 style_cell={
                     'textAlign': 'center',
-                    'padding': '10px',
+                    'padding': '4px',
                     'whiteSpace': 'normal',
                     'height': 'auto',
-                    'minWidth': '100px',
-                    'maxWidth': '180px',
-                    'fontSize': '14px',
+                    'fontSize': '12px',
                     'fontFamily': 'Arial'
                 },
                 style_header={
                     'backgroundColor': '#004F6D',
                     'fontWeight': 'bold',
                     'color': 'white',
-                    'border': '2px solid black'
+                    'border': '1px solid black',
                 },
-
                 export_format='csv',
             ),
-            
-            # Primera imagen
-            html.Img(src='/assets/knn2.png', style={'width': '80%', 'display': 'block', 'margin': 'auto', 'padding': '20px'}),
-
-            # Segunda imagen
-            html.Img(src='/assets/lineal2.png', style={'width': '80%', 'display': 'block', 'margin': 'auto', 'padding': '20px'}),
-
-            # Tercera imagen
-            html.Img(src='/assets/ridge2.png', style={'width': '80%', 'display': 'block', 'margin': 'auto', 'padding': '20px'}),
+            dcc.Graph(id='consistencia-graph', figure=create_consistency_figure(sitio)),
+        ])
 
-            # Cuarta imagen
-            html.Img(src='/assets/lasso2.png', style={'width': '80%', 'display': 'block', 'margin': 'auto', 'padding': '20px'}),
+    elif tab == 'tab-cortante':
+        resumen = resumen_cortante(sitio, version, ALTURA_BUJE)
+        return html.Div([
+            html.H3('Cortante vertical del viento', style={'textAlign': 'center', 'color': '#004F6D', 'fontWeight': 'bold'}),
+            html.P('Exponente de la ley de potencia y rugosidad de la ley logarítmica ajustados en cada registro con las '
+                   'velocidades a 60, 80 y 100 m (promedio de los sensores de cada altura).',
+                   style={'textAlign': 'center', 'fontSize': '12px', 'color': '#555555'}),
+            html.Div([
+                html.Label('Altura del buje (m)'),
+                dcc.Dropdown(id='altura-buje', options=[{'label': f'{h:g}', 'value': h} for h in alturas_buje],
+                             value=ALTURA_BUJE, clearable=False),
+            ], style={'width': '200px', 'margin': '0 auto'}),
+            dash_table.DataTable(
+                id='tabla-cortante',
+                columns=[{"name": i, "id": i} for i in resumen.columns],
+                data=resumen.to_dict('records'),
+                style_table={'width': '60%', 'margin': '20px auto'},
+                style_cell={
+                    'textAlign': 'center',
+                    'padding': '4px',
+                    'fontSize': '12px',
+                    'fontFamily': 'Arial'
+                },
+                style_header={
+                    'backgroundColor': '#004F6D',
+                    'fontWeight': 'bold',
+                    'color': 'white',
+                    'border': '1px solid black',
+                },
+            ),
+            dcc.Graph(id='cortante-graph', figure=create_shear_figure(sitio, ALTURA_BUJE)),
         ])
-        
-    elif tab == 'tab-modelo3':
-        data3 = pd.DataFrame({
-            'Modelo': ['Regresión K-NN', 'Regresión Lasso', 'Regresión Lineal', 'Regresión Ridge'],
-            'MAPE': [6.751773, 4.232456, 4.219102, 4.214576],
-            'RMSE': [1.363591, 0.872926, 0.864644, 0.866600],
-            'R^2': [0.369181, 0.741481, 0.746364, 0.745215],
-            'Ljung-Box p-value': ['1.042822e-32', '5.546813e-63', '9.800919e-60', '8.855226e-61'],
-            'Jarque-Bera p-value': [0.000104, 0.269785, 0.375339, 0.339695]
-        })
-        
+
+    elif tab == 'tab-weibull':
+        ajustes = tabla_weibull(sitio, version, N_SECTORES_WEIBULL)
         return html.Div([
-            # Título al principio
-            html.H3('Modelo 3: Wind speed 80 metros (Sensor 1)', style={'textAlign': 'center', 'marginBottom': '15px'}),  
-        
+            html.H3('Distribución de Weibull de la velocidad del viento', style={'textAlign': 'center', 'color': '#004F6D', 'fontWeight': 'bold'}),
+            html.P(f'Parámetros k (forma) y c (escala) por altura, sector de dirección y mes, ajustados por máxima verosimilitud. '
+                   f'La fila de {ALTURA_BUJE:g} m usa la velocidad extrapolada con el perfil vertical. Solo entran las '
+                   'velocidades dentro del rango aceptado por las reglas de rango.',
+                   style={'textAlign': 'center', 'fontSize': '12px', 'color': '#555555'}),
+            dcc.Graph(id='weibull-graph', figure=create_weibull_figure(sitio)),
             dash_table.DataTable(
-                columns=[{"name": i, "id": i} for i in data3.columns],  # Columnas correctas
-                data=data3.to_dict('records'),  # Convierte el DataFrame a un diccionario
-                style_table={'width': '100%', 'overflowX': 'scroll'},
+                id='tabla-weibull',
+                columns=[{"name": i, "id": i} for i in ajustes.columns],
+                data=ajustes.to_dict('records'),
+                page_size=20,
+                filter_action='native',
+                sort_action='native',
+                style_table={'width': '100%', 'overflowX': 'auto'},
                 style_cell={
                     'textAlign': 'center',
-                    'padding': '10px',
-                    'whiteSpace': 'normal',
-                    'height': 'auto',
-                    'minWidth': '100px',
-                    'maxWidth': '180px',
-                    'fontSize': '14px',
+                    'padding': '4px',
+                    'fontSize': '12px',
                     'fontFamily': 'Arial'
                 },
                 style_header={
                     'backgroundColor': '#004F6D',
                     'fontWeight': 'bold',
                     'color': 'white',
-                    'border': '2px solid black'
+                    'border': '1px solid black',
                 },
-                
                 export_format='csv',
             ),
-            
-            # Primera imagen
-            html.Img(src='/assets/knn3.png', style={'width': '80%', 'display': 'block', 'margin': 'auto', 'padding': '20px'}),
-
-            # Segunda imagen
-            html.Img(src='/assets/lineal3.png', style={'width': '80%', 'display': 'block', 'margin': 'auto', 'padding': '20px'}),
 
-            # Tercera imagen
-            html.Img(src='/assets/ridge3.png', style={'width': '80%', 'display': 'block', 'margin': 'auto', 'padding': '20px'}),
-
-            # Cuarta imagen
-            html.Img(src='/assets/lasso3.png', style={'width': '80%', 'display': 'block', 'margin': 'auto', 'padding': '20px'}),
+            html.H3('Producción anual de energía', style={'textAlign': 'center', 'marginTop': '40px', 'color': '#004F6D', 'fontWeight': 'bold'}),
+            dcc.Upload(
+                id='carga-curva',
+                children=html.Div(['Arrastre o ', html.A('seleccione', style={'fontWeight': 'bold'}),
+                                   ' una curva de potencia (CSV o Excel con dos columnas: velocidad en m/s y potencia en kW)']),
+                style={'width': '100%', 'padding': '20px', 'borderWidth': '2px', 'borderStyle': 'dashed',
+                       'borderColor': '#004F6D', 'borderRadius': '5px', 'textAlign': 'center'},
+            ),
+            html.Div(id='estado-curva', style={'textAlign': 'center', 'fontSize': '12px', 'color': '#555555', 'marginTop': '5px'}),
+            dcc.Store(id='curva-potencia', storage_type='session'),
+            dash_table.DataTable(
+                id='tabla-aep',
+                columns=[{"name": i, "id": i} for i in columnas_energia],
+                data=[],
+                style_table={'width': '100%', 'overflowX': 'auto', 'marginTop': '10px'},
+                style_cell={
+                    'textAlign': 'center',
+                    'padding': '4px',
+                    'fontSize': '12px',
+                    'fontFamily': 'Arial'
+                },
+                style_header={
+                    'backgroundColor': '#004F6D',
+                    'fontWeight': 'bold',
+                    'color': 'white',
+                    'border': '1px solid black',
+                },
+                export_format='csv',
+            ),
         ])
-    
-    elif tab == 'tab-modelo4':
-        data4 = pd.DataFrame({
-            'Modelo': ['Regresión K-NN', 'Regresión Lasso', 'Regresión Lineal', 'Regresión Ridge'],
-            'MAPE': [6.684306, 4.206317, 4.203377, 4.196624],
-            'RMSE': [1.351586, 0.865937, 0.857570, 0.859552],
-            'R^2': [0.377391, 0.744436, 0.749351, 0.748190],
-            'Ljung-Box p-value': ['8.968552e-32', '4.300009e-63', '7.246420e-60', '6.662610e-61'],
-            'Jarque-Bera p-value': [0.000067, 0.252943, 0.344181, 0.314146]
-        })
-        
+
+    elif tab == 'tab-correlacion':
+        analisis = analisis_correlacion(sitio, version)
+        referencia = REFERENCIA_DESFASE if REFERENCIA_DESFASE in analisis['canales'] else analisis['canales'][0]
         return html.Div([
-            # Título al principio
-            html.H3('Modelo 4: Wind speed 80 metros (Sensor 2)', style={'textAlign': 'center', 'marginBottom': '15px'}),  
-            
+            html.H3('Correlación y multicolinealidad entre variables', style={'textAlign': 'center', 'color': '#004F6D', 'fontWeight': 'bold'}),
+            html.P(f'Correlaciones con los registros completos de cada par de canales; las direcciones entran como sus componentes '
+                   f'seno y coseno. Los pares con |r| de Pearson de al menos {UMBRAL_REDUNDANCIA:g} se agrupan y en cada grupo se '
+                   'sugiere conservar el canal con más datos válidos.',
+                   style={'textAlign': 'center', 'fontSize': '12px', 'color': '#555555'}),
+            html.Div([
+                html.Div([
+                    html.Label('Rango de fechas'),
+                    dcc.DatePickerRange(
+                        id='rango-correlacion',
+                        min_date_allowed=tabla_sitio.index.min().date(),
+                        max_date_allowed=tabla_sitio.index.max().date(),
+                        display_format='YYYY-MM-DD',
+                    ),
+                ], style={'margin-right': '30px'}),
+                html.Div([
+                    html.Label('Método'),
+                    dcc.RadioItems(
+                        id='metodo-correlacion',
+                        options=[{'label': etiqueta, 'value': valor} for valor, etiqueta in metodos_correlacion.items()],
+                        value='pearson',
+                        inline=True,
+                        inputStyle={'margin-right': '5px', 'margin-left': '10px'},
+                    ),
+                ]),
+            ], style={'display': 'flex', 'justify-content': 'center', 'align-items': 'flex-end', 'marginTop': '20px'}),
+            dcc.Graph(id='correlacion-graph', figure=create_correlation_figure(sitio)),
+
+            html.H5('Pares de canales ordenados por correlación', style={'textAlign': 'center', 'marginTop': '20px'}),
             dash_table.DataTable(
-                columns=[{"name": i, "id": i} for i in data4.columns],  # Columnas correctas
-                data=data4.to_dict('records'),  # Convierte el DataFrame a un diccionario
-                style_table={'width': '100%', 'overflowX': 'scroll'},
+                id='tabla-redundancia',
+                columns=[{"name": i, "id": i} for i in columnas_redundancia],
+                data=tabla_redundancia(sitio, version).to_dict('records'),
+                page_size=15,
+                sort_action='native',
+                style_table={'width': '100%', 'overflowX': 'auto'},
+                style_data_conditional=[{'if': {'filter_query': '{Redundante} = "Sí"'}, 'backgroundColor': '#FDE2E2'}],
                 style_cell={
                     'textAlign': 'center',
-                    'padding': '10px',
-                    'whiteSpace': 'normal',
-                    'height': 'auto',
-                    'minWidth': '100px',
-                    'maxWidth': '180px',
-                    'fontSize': '14px',
+                    'padding': '4px',
+                    'fontSize': '12px',
                     'fontFamily': 'Arial'
                 },
                 style_header={
                     'backgroundColor': '#004F6D',
                     'fontWeight': 'bold',
                     'color': 'white',
-                    'border': '2px solid black'
+                    'border': '1px solid black',
                 },
-    
                 export_format='csv',
             ),
-            
-            # Primera imagen
-            html.Img(src='/assets/knn4.png', style={'width': '80%', 'display': 'block', 'margin': 'auto', 'padding': '20px'}),
 
-            # Segunda imagen
-            html.Img(src='/assets/lineal4.png', style={'width': '80%', 'display': 'block', 'margin': 'auto', 'padding': '20px'}),
-
-            # Tercera imagen
-            html.Img(src='/assets/ridge4.png', style={'width': '80%', 'display': 'block', 'margin': 'auto', 'padding': '20px'}),
+            html.H5('Factor de inflación de la varianza (VIF) por canal', style={'textAlign': 'center', 'marginTop': '20px'}),
+            dash_table.DataTable(
+                id='tabla-vif',
+                columns=[{"name": i, "id": i} for i in ['Canal', 'VIF', 'Registros válidos', 'Sugerencia']],
+                data=tabla_vif(sitio, version).to_dict('records'),
+                sort_action='native',
+                style_table={'width': '80%', 'margin': '0 auto', 'overflowX': 'auto'},
+                style_cell={
+                    'textAlign': 'center',
+                    'padding': '4px',
+                    'fontSize': '12px',
+                    'fontFamily': 'Arial'
+                },
+                style_header={
+                    'backgroundColor': '#004F6D',
+                    'fontWeight': 'bold',
+                    'color': 'white',
+                    'border': '1px solid black',
+                },
+                export_format='csv',
+            ),
 
-            # Cuarta imagen
-            html.Img(src='/assets/lasso4.png', style={'width': '80%', 'display': 'block', 'margin': 'auto', 'padding': '20px'}),
-            
+            html.H5('Correlación cruzada con desfase', style={'textAlign': 'center', 'marginTop': '20px'}),
+            html.Div([
+                html.Label('Canal de referencia'),
+                dcc.Dropdown(id='referencia-desfase', options=[{'label': canal, 'value': canal} for canal in analisis['canales']],
+                             value=referencia, clearable=False),
+            ], style={'width': '300px', 'margin': '0 auto'}),
+            dcc.Graph(id='desfases-graph', figure=create_lag_figure(sitio, referencia)),
         ])
-    
-    elif tab == 'tab-modelo5':
-        data5 = pd.DataFrame({
-            'Modelo': ['Regresión K-NN', 'Regresión Lasso', 'Regresión Lineal', 'Regresión Ridge'],
-            'MAPE': [6.876112, 4.445645, 4.439774, 4.436869],
-            'RMSE': [1.332056, 0.890595, 0.880800, 0.882914],
-            'R^2': [0.349680, 0.709302, 0.715661, 0.714294],
-            'Ljung-Box p-value': ['8.837886e-33', '8.780533e-59', '1.000130e-55', '1.275099e-56'],
-            'Jarque-Bera p-value': ['1.308209e-08', '3.338686e-01', '4.692246e-01', '4.269807e-01']
-        })
-        
-        return html.Div([
-            # Título al principio
-            html.H3('Modelo 5: Wind speed 60 metros', style={'textAlign': 'center', 'marginBottom': '15px'}),  
 
+    elif tab == 'tab-crudos':
+        return html.Div([
+            html.H5('Registros del conjunto de datos', style={'textAlign': 'center', 'marginTop': '20px'}),
+            html.P('Use la fila de filtros (por ejemplo "> 10", o "2022-03" en Fecha) y los encabezados para ordenar. '
+                   'El filtrado y el orden se hacen en el servidor y solo se envía la página visible.',
+                   style={'textAlign': 'center', 'fontSize': '12px', 'color': '#555555'}),
             dash_table.DataTable(
-                columns=[{"name": i, "id": i} for i in data5.columns],  # Columnas correctas
-                data=data5.to_dict('records'),  # Convierte el DataFrame a un diccionario
-                style_table={'width': '100%', 'overflowX': 'scroll'},
+                id='tabla-crudos',
+                columns=[{'name': 'Fecha', 'id': 'Fecha', 'type': 'datetime'}] +
+                        [{'name': col, 'id': col, 'type': 'numeric'} for col in tabla_sitio.columns],
+                page_current=0,
+                page_size=25,
+                page_action='custom',
+                sort_action='custom',
+                sort_mode='single',
+                sort_by=[],
+                filter_action='custom',
+                filter_query='',
+                persistence=True,  # Conserva página, orden y filtros al volver a la pestaña
+                persistence_type='session',
+                style_table={'width': '100%', 'overflowX': 'auto'},
                 style_cell={
                     'textAlign': 'center',
-                    'padding': '10px',
-                    'whiteSpace': 'normal',
-                    'height': 'auto',
-                    'minWidth': '100px',
-                    'maxWidth': '180px',
-                    'fontSize': '14px',
+                    'padding': '4px',
+                    'minWidth': '80px',
+                    'fontSize': '11px',
                     'fontFamily': 'Arial'
                 },
                 style_header={
                     'backgroundColor': '#004F6D',
                     'fontWeight': 'bold',
                     'color': 'white',
-                    'border': '2px solid black'
+                    'border': '1px solid black',
+                    'fontSize': '12px',
                 },
-   
-                export_format='csv',
             ),
-            
-            # Primera imagen
-            html.Img(src='/assets/knn5.png', style={'width': '80%', 'display': 'block', 'margin': 'auto', 'padding': '20px'}),
+        ])
 
-            # Segunda imagen
-            html.Img(src='/assets/lineal5.png', style={'width': '80%', 'display': 'block', 'margin': 'auto', 'padding': '20px'}),
 
-            # Tercera imagen
-            html.Img(src='/assets/ridge5.png', style={'width': '80%', 'display': 'block', 'margin': 'auto', 'padding': '20px'}),
 
-            # Cuarta imagen
-            html.Img(src='/assets/lasso5.png', style={'width': '80%', 'display': 'block', 'margin': 'auto', 'padding': '20px'}),
-        ])
+# Resultados publicados de los modelos (entrenados fuera de la app), uno por sensor objetivo.
+# Se arman una sola vez al importar; el callback solo elige cuál mostrar.
+modelos_objetivos = {
+    'tab-modelo1': ('Modelo 1: Wind speed 100 metros (Sensor 1)', 'WindSpeed100_1'),
+    'tab-modelo2': ('Modelo 2: Wind speed 100 metros (Sensor 2)', 'WindSpeed100_2'),
+    'tab-modelo3': ('Modelo 3: Wind speed 80 metros (Sensor 1)', 'WindSpeed80_1'),
+    'tab-modelo4': ('Modelo 4: Wind speed 80 metros (Sensor 2)', 'WindSpeed80_2'),
+    'tab-modelo5': ('Modelo 5: Wind speed 60 metros', 'WindSpeed60'),
+}
+nombres_modelos = ['Regresión K-NN', 'Regresión Lasso', 'Regresión Lineal', 'Regresión Ridge']
+metricas_modelos = pd.DataFrame({
+    'Objetivo': [tab for tab in modelos_objetivos for _ in nombres_modelos],
+    'Modelo': nombres_modelos * len(modelos_objetivos),
+    'MAPE': [5.894020, 4.030474, 4.013425, 4.013893,
+             5.832642, 4.015778, 3.996092, 3.996013,
+             6.751773, 4.232456, 4.219102, 4.214576,
+             6.684306, 4.206317, 4.203377, 4.196624,
+             6.876112, 4.445645, 4.439774, 4.436869],
+    'RMSE': [1.227196, 0.851866, 0.845024, 0.846827,
+             1.204380, 0.837676, 0.830596, 0.832460,
+             1.363591, 0.872926, 0.864644, 0.866600,
+             1.351586, 0.865937, 0.857570, 0.859552,
+             1.332056, 0.890595, 0.880800, 0.882914],
+    'R^2': [0.510433, 0.764100, 0.767875, 0.766883,
+            0.517706, 0.766688, 0.770615, 0.769584,
+            0.369181, 0.741481, 0.746364, 0.745215,
+            0.377391, 0.744436, 0.749351, 0.748190,
+            0.349680, 0.709302, 0.715661, 0.714294],
+    'Ljung-Box p-value': ['1.169459e-22', '3.756088e-67', '1.306806e-63', '7.620692e-65',
+                          '8.404607e-23', '3.521004e-67', '1.214976e-63', '7.349954e-65',
+                          '1.042822e-32', '5.546813e-63', '9.800919e-60', '8.855226e-61',
+                          '8.968552e-32', '4.300009e-63', '7.246420e-60', '6.662610e-61',
+                          '8.837886e-33', '8.780533e-59', '1.000130e-55', '1.275099e-56'],
+    'Jarque-Bera p-value': [0.000070, 0.219406, 0.248818, 0.241076,
+                            0.000114, 0.173372, 0.198714, 0.191579,
+                            0.000104, 0.269785, 0.375339, 0.339695,
+                            0.000067, 0.252943, 0.344181, 0.314146,
+                            '1.308209e-08', '3.338686e-01', '4.692246e-01', '4.269807e-01'],
+})
+registros_metricas = {tab: grupo.drop(columns='Objetivo').to_dict('records') for tab, grupo in metricas_modelos.groupby('Objetivo')}
+columnas_metricas = [{"name": i, "id": i} for i in metricas_modelos.columns if i != 'Objetivo']
+
+
+# Callback para manejar el contenido de los modelos
+@app.callback(
+    dash.dependencies.Output('tabs-modelos-content', 'children'),
+    [dash.dependencies.Input('tabs-modelos', 'value'),
+     dash.dependencies.Input('version-modelos', 'data')]
+)
+def tab_layout3(tab, version_modelos=None):
+    if tab not in modelos_objetivos:
+        return None
+    titulo, objetivo = modelos_objetivos[tab]
+    registros, origen = metricas_vigentes()
+
+    return html.Div([
+        # Título al principio
+        html.H3(titulo, style={'textAlign': 'center', 'marginBottom': '15px'}),
+        html.P(origen, style={'textAlign': 'center', 'fontSize': '12px', 'color': '#555555'}),
+
+        dash_table.DataTable(
+            columns=columnas_metricas,
+            data=registros[tab],
+            style_table={'width': '100%', 'overflowX': 'scroll'},
+            style_cell={
+                'textAlign': 'center',
+                'padding': '10px',
+                'whiteSpace': 'normal',
+                'height': 'auto',
+                'minWidth': '100px',
+                'maxWidth': '180px',
+                'fontSize': '14px',
+                'fontFamily': 'Arial'
+            },
+            style_header={
+                'backgroundColor': '#004F6D',
+                'fontWeight': 'bold',
+                'color': 'white',
+                'border': '2px solid black'
+            },
+
+            export_format='csv',
+        ),
+
+        # Valores reales vs. predichos sobre el tramo de prueba de modelos.xlsx
+        dcc.Graph(id='grafico-prediccion', figure=create_prediction_figure(objetivo)),
+        html.P(
+            'Regresión lineal a una hora ajustada sobre el 80 % inicial de modelos.xlsx y evaluada en el 20 % final. '
+            'Predictores: presión, humedad, temperaturas, dirección del viento a 100 m y la velocidad observada una hora antes.',
+            style={'textAlign': 'center', 'fontSize': '12px', 'color': '#555555'}
+        ),
+
+        # Diagnóstico de residuos: ACF/PACF, Ljung-Box por rezago, normalidad y gráfico QQ
+        html.H5('Diagnóstico de residuos y de la serie', style={'textAlign': 'center', 'marginTop': '20px'}),
+        dcc.RadioItems(
+            id='serie-diagnostico',
+            options=[{'label': etiqueta, 'value': valor} for valor, etiqueta in series_diagnostico.items()],
+            value='residuos',
+            inline=True,
+            inputStyle={'margin-right': '5px', 'margin-left': '10px'},
+            style={'textAlign': 'center'},
+        ),
+        dcc.Graph(id='diagnostico-graph', figure=create_diagnostics_figure(objetivo)),
+        dash_table.DataTable(
+            id='tabla-diagnostico',
+            columns=[{"name": i, "id": i} for i in ['Indicador', 'Valor']],
+            data=resumen_diagnostico(objetivo, 'residuos').to_dict('records'),
+            style_table={'width': '60%', 'margin': '0 auto 20px auto'},
+            style_cell={
+                'textAlign': 'center',
+                'padding': '4px',
+                'fontSize': '12px',
+                'fontFamily': 'Arial'
+            },
+            style_header={
+                'backgroundColor': '#004F6D',
+                'fontWeight': 'bold',
+                'color': 'white',
+                'border': '1px solid black',
+            },
+            export_format='csv',
+        ),
+    ])
 
 
 
@@ -584,97 +1200,387 @@ def toggle_collapse(n1, n2, n3, is_open1, is_open2, is_open3):
 
 
 # Gráficos y funciones auxiliares
-def create_wind_speed_figure():
+
+# Caché de figuras: guarda cada figura como dict ya decodificado (lo que recibe Dash) junto con el tamaño
+# de su JSON, indexada por constructor, parámetros y versión del dataset. Un acierto evita construir la
+# figura, codificarla con Plotly y volver a decodificarla. Los constructores cuyo primer parámetro es `sitio`
+# se indexan además por la versión de ese sitio. El dict se comparte entre peticiones: no debe modificarse.
+MAX_BYTES_CACHE_FIGURAS = int(os.environ.get('MAX_BYTES_CACHE_FIGURAS', 128 * 1024 * 1024))
+_cache_figuras = collections.OrderedDict()
+_candado_figuras = threading.Lock()
+_bytes_cache_figuras = 0  # Suma de los tamaños guardados, se actualiza al insertar y al expulsar
+
+
+def memoizar_figura(constructor):
+    por_sitio = constructor.__code__.co_varnames[:1] == ('sitio',)
+
+    @functools.wraps(constructor)
+    def envoltura(*args, **kwargs):
+        global _bytes_cache_figuras
+        version = version_sitio(args[0]) if por_sitio else None
+        clave = (constructor.__name__, args, tuple(sorted(kwargs.items())), version)
+        with _candado_figuras:
+            entrada = _cache_figuras.get(clave)
+            if entrada is not None:
+                _cache_figuras.move_to_end(clave)
+        registrar_cache(constructor.__name__, entrada is not None)
+        if entrada is None:
+            # Se guarda el resultado de decodificar el JSON de Plotly (tipos nativos, sin arreglos numpy)
+            texto = constructor(*args, **kwargs).to_json()
+            entrada = (json.loads(texto), len(texto))
+            with _candado_figuras:
+                anterior = _cache_figuras.pop(clave, None)
+                if anterior is not None:  # Otro hilo la construyó a la vez
+                    _bytes_cache_figuras -= anterior[1]
+                _cache_figuras[clave] = entrada
+                _bytes_cache_figuras += entrada[1]
+                # Expulsa las figuras usadas hace más tiempo hasta respetar el presupuesto de memoria
+                while len(_cache_figuras) > 1 and _bytes_cache_figuras > MAX_BYTES_CACHE_FIGURAS:
+                    _bytes_cache_figuras -= _cache_figuras.popitem(last=False)[1][1]
+        return entrada[0]
+    return envoltura
+
+
+def vaciar_cache_figuras():
+    global _bytes_cache_figuras
+    with _candado_figuras:
+        _cache_figuras.clear()
+        _bytes_cache_figuras = 0
+
+
+# Máximo de puntos por traza que se envían al navegador en las series de tiempo
+MAX_PUNTOS_SERIE = int(os.environ.get('MAX_PUNTOS_SERIE', 2000))
+
+
+def indices_lttb(x, y, n_puntos):
+    # Largest-Triangle-Three-Buckets: devuelve los índices de los puntos que conservan la forma de la serie.
+    # Se ignoran los NaN; cada cubeta se resuelve con operaciones vectorizadas sobre sus puntos.
+    validos = np.flatnonzero(~np.isnan(y))
+    n = len(validos)
+    if n <= n_puntos or n_puntos < 3:
+        return validos
+    xv = (x[validos] - x[validos[0]]).astype(float)
+    yv = y[validos]
+
+    limites = np.linspace(1, n - 1, n_puntos - 1).astype(int)
+    seleccion = np.empty(n_puntos, dtype=int)
+    seleccion[0], seleccion[-1] = 0, n - 1
+    a = 0
+    for i in range(n_puntos - 2):
+        inicio, fin = limites[i], limites[i + 1]
+        siguiente = slice(limites[i + 1], limites[i + 2]) if i < n_puntos - 3 else slice(n - 1, n)
+        x_medio, y_medio = xv[siguiente].mean(), yv[siguiente].mean()
+        areas = np.abs((xv[a] - x_medio) * (yv[inicio:fin] - yv[a]) - (xv[a] - xv[inicio:fin]) * (y_medio - yv[a]))
+        a = inicio + int(np.argmax(areas))
+        seleccion[i + 1] = a
+    return validos[seleccion]
+
+
+def serie_reducida(sitio, columna, inicio=None, fin=None, n_puntos=MAX_PUNTOS_SERIE):
+    # Recorta la serie a la ventana visible y la reduce a lo sumo a n_puntos con LTTB
+    df = datos_sitio(sitio)
+    fechas = df.index.to_numpy()
+    mascara = ~np.isnat(fechas)
+    if inicio is not None:
+        mascara &= fechas >= np.datetime64(inicio)
+    if fin is not None:
+        mascara &= fechas <= np.datetime64(fin)
+    fechas = fechas[mascara]
+    valores = df[columna].to_numpy(dtype=float)[mascara]
+    indices = indices_lttb(fechas.astype('int64'), valores, n_puntos)
+    return fechas[indices], valores[indices]
+
+
+def ventana_relayout(relayout):
+    # Traduce el relayoutData de Plotly a una ventana (inicio, fin) del eje x.
+    # (None, None) significa vista completa; None significa que el evento no cambió el eje x.
+    if not relayout:
+        return None
+    for clave, valor in relayout.items():
+        if clave.startswith('xaxis') and clave.endswith('.autorange') and valor:
+            return None, None
+        if clave.startswith('xaxis') and clave.endswith('.range[0]'):
+            eje = clave[:-len('.range[0]')]
+            return pd.Timestamp(valor), pd.Timestamp(relayout[f'{eje}.range[1]'])
+        if clave.startswith('xaxis') and clave.endswith('.range'):
+            return pd.Timestamp(valor[0]), pd.Timestamp(valor[1])
+    return None
+
+
+# Rollups por resolución (media, mínimo, máximo y desviación por variable). Se calculan una vez por
+# versión del dataset con resample vectorizado y se guardan en el almacén columnar junto a los datos.
+# Al ingerir filas nuevas se extienden: solo se recalculan los intervalos que esas filas tocan.
+resoluciones = {'raw': None, 'hora': 'h', 'dia': 'D', 'mes': 'MS'}
+variables_series = ['WindSpeed100m_1', 'WinSpeed100m_2', 'WindSpeed80_1', 'WindSpeed80_2', 'Temperatura100m', 'Temperatura21m']
+
+
+def agregar_intervalos(df, frecuencia):
+    # resample descarta las fechas NaT; seleccionar las columnas no copia las vistas mapeadas
+    agregado = df[variables_series].resample(frecuencia).agg(['mean', 'min', 'max', 'std'])
+    agregado.columns = [f'{var}|{estadistico}' for var, estadistico in agregado.columns]
+    return agregado.reset_index()
+
+
+@functools.lru_cache(maxsize=16)
+def rollup(sitio, resolucion, version):
+    destino = os.path.join(directorio_cache, f'rollup-{version}-{resolucion}')
+    if not os.path.isdir(destino):
+        _guardar_almacen(agregar_intervalos(datos_sitio(sitio), resoluciones[resolucion]), destino)
+    return _leer_almacen(destino)
+
+
+def extender_rollups(version_anterior, version, df, nuevas_filas):
+    # Se conservan los intervalos del rollup anterior hasta el último (que pudo quedar incompleto) o hasta el
+    # de la fecha más antigua de las filas nuevas; desde ahí se vuelve a agregar con las filas de df
+    fechas_nuevas = nuevas_filas.index[nuevas_filas.index.notna()]
+    for resolucion, frecuencia in resoluciones.items():
+        origen = os.path.join(directorio_cache, f'rollup-{version_anterior}-{resolucion}')
+        destino = os.path.join(directorio_cache, f'rollup-{version}-{resolucion}')
+        if frecuencia is None or not os.path.isdir(origen) or os.path.isdir(destino):
+            continue
+        previo = _leer_almacen(origen)
+        fechas = previo['Fecha'].to_numpy()
+        if len(fechas) == 0:
+            continue
+        desde = fechas[-1]
+        if len(fechas_nuevas):
+            # Etiqueta del intervalo al que resample asigna la fecha nueva más antigua
+            desde = min(desde, pd.Series(0, index=[fechas_nuevas.min()]).resample(frecuencia).sum().index[0].to_datetime64())
+        tramo = agregar_intervalos(df[df.index >= desde], frecuencia)
+        _guardar_almacen(pd.concat([previo[fechas < desde], tramo], ignore_index=True), destino)
+
+
+def serie_agregada(sitio, columna, inicio, fin, resolucion, n_puntos=MAX_PUNTOS_SERIE):
+    # El rollup está ordenado por fecha: la ventana se ubica con búsqueda binaria y solo se lee ese tramo
+    tabla = rollup(sitio, resolucion, version_sitio(sitio))
+    fechas = tabla['Fecha'].to_numpy()
+    a = 0 if inicio is None else np.searchsorted(fechas, np.datetime64(inicio))
+    b = len(fechas) if fin is None else np.searchsorted(fechas, np.datetime64(fin), side='right')
+    media = tabla[f'{columna}|mean'].to_numpy()[a:b]
+    indices = indices_lttb(fechas[a:b].astype('int64'), media, n_puntos)
+    return (fechas[a:b][indices], media[indices],
+            tabla[f'{columna}|min'].to_numpy()[a:b][indices], tabla[f'{columna}|max'].to_numpy()[a:b][indices])
+
+
+def agregar_serie(fig, sitio, columna, nombre, color, fila, col, inicio, fin, resolucion):
+    if resoluciones.get(resolucion) is None:
+        x, y = serie_reducida(sitio, columna, inicio, fin)
+    else:
+        x, y, minimo, maximo = serie_agregada(sitio, columna, inicio, fin, resolucion)
+        # Banda entre el mínimo y el máximo de cada periodo
+        fig.add_trace(go.Scatter(x=x, y=maximo, mode='lines', line=dict(width=0), showlegend=False, hoverinfo='skip'), row=fila, col=col)
+        fig.add_trace(go.Scatter(x=x, y=minimo, mode='lines', line=dict(width=0), fill='tonexty', fillcolor='rgba(0, 79, 109, 0.15)',
+                                 showlegend=False, hoverinfo='skip'), row=fila, col=col)
+    fig.add_trace(go.Scatter(x=x, y=y, mode='lines', name=nombre, line=dict(color=color)), row=fila, col=col)
+
+
+def ventana_solicitada(relayout, inicio, fin):
+    # El zoom sobre la gráfica manda sobre el selector de fechas; al restablecer el zoom se vuelve al rango elegido
+    disparadores = [t['prop_id'] for t in dash.callback_context.triggered]
+    if any(p.endswith('.relayoutData') for p in disparadores):
+        ventana = ventana_relayout(relayout)
+        if ventana is None:
+            return None
+        if ventana != (None, None):
+            return ventana
+    return (pd.Timestamp(inicio) if inicio else None,
+            pd.Timestamp(fin) + pd.Timedelta(days=1) - pd.Timedelta(1, 'ns') if fin else None)
+
+
+def revision_zoom(inicio, fin, resolucion):
+    # Un cambio en el selector de fechas o resolución reinicia el zoom; con el selector sin tocar
+    # coincide con el uirevision de la figura inicial para no perder el zoom del usuario
+    return 'zoom' if not inicio and not fin and resolucion == 'raw' else f'{inicio}|{fin}|{resolucion}'
+
+
+@memoizar_figura
+def create_wind_speed_figure(sitio, inicio=None, fin=None, resolucion='raw'):
     fig = make_subplots(rows=2, cols=2, subplot_titles=[
         'WindSpeed 100m (Sensor 1)', 'WindSpeed 100m (Sensor 2)',
         'WindSpeed 80m (Sensor 1)', 'WindSpeed 80m (Sensor 2)'
     ])
-    fig.add_trace(go.Scatter(x=df['Fecha'], y=df['WindSpeed100m_1'], mode='lines', name='WindSpeed100m_1', line=dict(color='#1E90FF')), row=1, col=1)
-    fig.add_trace(go.Scatter(x=df['Fecha'], y=df['WinSpeed100m_2'], mode='lines', name='WinSpeed100m_2', line=dict(color='#4682B4')), row=1, col=2)
-    fig.add_trace(go.Scatter(x=df['Fecha'], y=df['WindSpeed80_1'], mode='lines', name='WindSpeed80_1', line=dict(color='#3CB371')), row=2, col=1)
-    fig.add_trace(go.Scatter(x=df['Fecha'], y=df['WindSpeed80_2'], mode='lines', name='WindSpeed80_2', line=dict(color='#66CDAA')), row=2, col=2)
-    fig.update_layout(height=800, width=1200)
+    series = [
+        ('WindSpeed100m_1', '#1E90FF', 1, 1),
+        ('WinSpeed100m_2', '#4682B4', 1, 2),
+        ('WindSpeed80_1', '#3CB371', 2, 1),
+        ('WindSpeed80_2', '#66CDAA', 2, 2),
+    ]
+    for columna, color, fila, col in series:
+        agregar_serie(fig, sitio, columna, columna, color, fila, col, inicio, fin, resolucion)
+    # uirevision conserva el zoom del usuario cuando la figura se reemplaza con más detalle
+    fig.update_layout(height=800, width=1200, uirevision='zoom')
     return fig
 
-df_cleaned = df[['WindDirection100', 'WindSpeed100m_1', 'WindDirection80', 'WindSpeed80_1', 'WindDirection60m', 'WindSpeed60']]
-def create_polar_scatter():
+# Alturas de la rosa de los vientos: (etiqueta, columna de dirección, columna de velocidad)
+alturas_rosa = [
+    ('100m', 'WindDirection100', 'WindSpeed100m_1'),
+    ('80m', 'WindDirection80', 'WindSpeed80_1'),
+    ('60m', 'WindDirection60m', 'WindSpeed60'),
+]
+
+
+def rosa_de_vientos(direccion, velocidad, n_sectores, bordes_velocidad):
+    # Frecuencia (%) por sector de dirección y clase de velocidad, contada de una vez con histogram2d
+    validos = ~np.isnan(direccion) & ~np.isnan(velocidad)
+    ancho_sector = 360 / n_sectores
+    # Se desplaza medio sector para que el primer sector quede centrado en el norte
+    direccion = (direccion[validos] + ancho_sector / 2) % 360
+    conteos, _, _ = np.histogram2d(direccion, velocidad[validos], bins=[np.linspace(0, 360, n_sectores + 1), bordes_velocidad])
+    return conteos / max(validos.sum(), 1) * 100
+
+
+@memoizar_figura
+def create_polar_scatter(sitio, n_sectores=16, ancho_clase=2):
+    from plotly.colors import sample_colorscale
+
+    df = datos_sitio(sitio)
+    bordes = np.arange(rango_velocidad_viento[0], rango_velocidad_viento[1] + ancho_clase, ancho_clase, dtype=float)
+    bordes[-1] = max(bordes[-1], rango_velocidad_viento[1])
+    colores = sample_colorscale('Blues', np.linspace(0.3, 1, len(bordes) - 1))
+    sectores = np.arange(n_sectores) * 360 / n_sectores
+
     fig = make_subplots(
         rows=2, cols=2, specs=[[{'type': 'polar'}, {'type': 'polar'}], [{'type': 'polar'}, {'type': 'polar'}]],
         subplot_titles=['Velocidad y Dirección a 100m', 'Velocidad y Dirección a 80m', 'Velocidad y Dirección a 60m']
     )
-    fig.add_trace(go.Scatterpolar(r=df_cleaned['WindSpeed100m_1'], theta=df_cleaned['WindDirection100'], mode='markers', marker=dict(size=10, color=df_cleaned['WindSpeed100m_1'], colorscale='Blues', showscale=True), name='Velocidad a 100m'), row=1, col=1)
-    fig.add_trace(go.Scatterpolar(r=df_cleaned['WindSpeed80_1'], theta=df_cleaned['WindDirection80'], mode='markers', marker=dict(size=10, color=df_cleaned['WindSpeed80_1'], colorscale='Blues', showscale=False), name='Velocidad a 80m'), row=1, col=2)
-    fig.add_trace(go.Scatterpolar(r=df_cleaned['WindSpeed60'], theta=df_cleaned['WindDirection60m'], mode='markers', marker=dict(size=10, color=df_cleaned['WindSpeed60'], colorscale='Blues', showscale=False), name='Velocidad a 60m'), row=2, col=1)
-    fig.update_layout(height=800, width=1000, polar=dict(radialaxis=dict(visible=True), angularaxis=dict(direction='clockwise')))
+    for indice, (altura, col_direccion, col_velocidad) in enumerate(alturas_rosa):
+        frecuencias = rosa_de_vientos(df[col_direccion].to_numpy(dtype=float), df[col_velocidad].to_numpy(dtype=float), n_sectores, bordes)
+        for clase in range(len(bordes) - 1):
+            fig.add_trace(go.Barpolar(
+                r=frecuencias[:, clase], theta=sectores, width=360 / n_sectores,
+                name=f'{bordes[clase]:g}-{bordes[clase + 1]:g} m/s', legendgroup=str(clase), showlegend=indice == 0,
+                marker=dict(color=colores[clase]),
+                hovertemplate=f'Velocidad a {altura}<br>%{{theta}}°: %{{r:.2f}}%<extra></extra>'
+            ), row=indice // 2 + 1, col=indice % 2 + 1)
+    eje_angular = dict(direction='clockwise', rotation=90)
+    fig.update_layout(height=800, width=1000, polar=dict(angularaxis=eje_angular), polar2=dict(angularaxis=eje_angular),
+                      polar3=dict(angularaxis=eje_angular), legend_title_text='Velocidad')
     return fig
 
 
-def create_temperature_figure():
+@app.callback(
+    dash.dependencies.Output('windrose-graph', 'figure'),
+    [dash.dependencies.Input('sectores-rosa', 'value'),
+     dash.dependencies.Input('ancho-clase-rosa', 'value')],
+    [dash.dependencies.State('selector-sitio', 'value')],
+    prevent_initial_call=True
+)
+def update_windrose(n_sectores, ancho_clase, sitio):
+    return create_polar_scatter(sitio, n_sectores, ancho_clase)
+
+
+@memoizar_figura
+def create_temperature_figure(sitio, inicio=None, fin=None, resolucion='raw'):
     fig = make_subplots(
         rows=2, cols=1, subplot_titles=['Temperatura AVG a 100 m', 'Temperatura AVG a 20 m']
     )
-    fig.add_trace(go.Scatter(x=df['Fecha'], y=df['Temperatura100m'], mode='lines', line=dict(color='#4682B4'), name='Temp 100m'), row=1, col=1)
-    fig.add_trace(go.Scatter(x=df['Fecha'], y=df['Temperatura21m'], mode='lines', line=dict(color='#3CB371'), name='Temp 20m'), row=2, col=1)
-    fig.update_layout(height=800, width=1000, showlegend=False, title="Gráficos de Temperatura a Diferentes Alturas")
+    agregar_serie(fig, sitio, 'Temperatura100m', 'Temp 100m', '#4682B4', 1, 1, inicio, fin, resolucion)
+    agregar_serie(fig, sitio, 'Temperatura21m', 'Temp 20m', '#3CB371', 2, 1, inicio, fin, resolucion)
+    fig.update_layout(height=800, width=1000, showlegend=False, title="Gráficos de Temperatura a Diferentes Alturas", uirevision='zoom')
     return fig
 
-def create_seasonal_decomposition_figure():
-    from statsmodels.tsa.seasonal import seasonal_decompose
 
-    # Definir las variables de velocidad del viento
-    wind_variables = ['WindSpeed100m_1', 'WinSpeed100m_2', 'WindSpeed80_1', 'WindSpeed80_2', 'WindSpeed60']
-    
+# Callbacks de las series de tiempo: el selector de fechas y resolución elige qué tramo del rollup leer,
+# y al hacer zoom o desplazarse se vuelve a pedir el detalle de la ventana visible
+@app.callback(
+    dash.dependencies.Output('wind-speed-subplots', 'figure'),
+    [dash.dependencies.Input('wind-speed-subplots', 'relayoutData'),
+     dash.dependencies.Input('rango-fechas', 'start_date'),
+     dash.dependencies.Input('rango-fechas', 'end_date'),
+     dash.dependencies.Input('resolucion', 'value')],
+    [dash.dependencies.State('selector-sitio', 'value')],
+    prevent_initial_call=True
+)
+def zoom_wind_speed(relayout, inicio, fin, resolucion, sitio):
+    ventana = ventana_solicitada(relayout, inicio, fin)
+    if ventana is None:
+        return dash.no_update
+    fig = create_wind_speed_figure(sitio, *ventana, resolucion)
+    # Copia superficial: la figura de la caché es compartida
+    return dict(fig, layout=dict(fig['layout'], uirevision=revision_zoom(inicio, fin, resolucion)))
+
+
+@app.callback(
+    dash.dependencies.Output('temperature-graphs', 'figure'),
+    [dash.dependencies.Input('temperature-graphs', 'relayoutData'),
+     dash.dependencies.Input('rango-fechas', 'start_date'),
+     dash.dependencies.Input('rango-fechas', 'end_date'),
+     dash.dependencies.Input('resolucion', 'value')],
+    [dash.dependencies.State('selector-sitio', 'value')],
+    prevent_initial_call=True
+)
+def zoom_temperature(relayout, inicio, fin, resolucion, sitio):
+    ventana = ventana_solicitada(relayout, inicio, fin)
+    if ventana is None:
+        return dash.no_update
+    fig = create_temperature_figure(sitio, *ventana, resolucion)
+    return dict(fig, layout=dict(fig['layout'], uirevision=revision_zoom(inicio, fin, resolucion)))
+
+
+# Definir las variables de velocidad del viento
+wind_variables = ['WindSpeed100m_1', 'WinSpeed100m_2', 'WindSpeed80_1', 'WindSpeed80_2', 'WindSpeed60']
+componentes_descomposicion = ['Original', 'Tendencia', 'Estacionalidad', 'Residuos']
+
+
+@functools.lru_cache(maxsize=32)
+def descomposicion_variable(sitio, var, version):
+    # Se calcula una sola vez por sitio, variable y versión del dataset: el trabajo en segundo plano la deja
+    # en la caché en disco y los workers la leen de ahí; la LRU evita releerla en cada figura
+    clave = ('descomposicion', sitio, version, var)
+    resultado = cache_trabajos.get(clave)
+    if resultado is None:
+        from statsmodels.tsa.seasonal import seasonal_decompose
+
+        # Realizar la descomposición estacional de la variable
+        series = datos_sitio(sitio)[var].dropna()  # Elimina los valores faltantes
+        decomposition = seasonal_decompose(series.to_numpy(dtype=float), model='additive', period=12)
+        resultado = {
+            'Fecha': series.index.to_numpy(),  # Fechas alineadas con la serie sin faltantes
+            'Original': np.asarray(decomposition.observed),
+            'Tendencia': np.asarray(decomposition.trend),
+            'Estacionalidad': np.asarray(decomposition.seasonal),
+            'Residuos': np.asarray(decomposition.resid),
+        }
+        cache_trabajos.set(clave, resultado, expire=24 * 3600)
+    return resultado
+
+
+def podar_descomposiciones(sitio, vigente):
+    # Las descomposiciones de versiones reemplazadas del sitio ya no se van a pedir: se borran del disco
+    for clave in list(cache_trabajos.iterkeys()):
+        if isinstance(clave, tuple) and clave[:2] == ('descomposicion', sitio) and clave[2] != vigente:
+            cache_trabajos.delete(clave)
+
+
+def descomposicion_estacional(sitio, version):
+    return {var: descomposicion_variable(sitio, var, version) for var in wind_variables}
+
+
+@memoizar_figura
+def create_seasonal_decomposition_figure(sitio):
+    descomposiciones = descomposicion_estacional(sitio, version_sitio(sitio))
+
     # Crear la figura con subgráficos para cada variable de velocidad del viento
     fig = make_subplots(
         rows=len(wind_variables) * 4, cols=1,  # 4 filas por variable (Datos Originales, Tendencia, Estacionalidad, Residuos)
-        subplot_titles=[f'{var} - {component}' for var in wind_variables for component in ['Original', 'Tendencia', 'Estacionalidad', 'Residuos']]
+        subplot_titles=[f'{var} - {component}' for var in wind_variables for component in componentes_descomposicion]
     )
 
     row_index = 1  # Para controlar en qué fila colocar cada subgráfico
 
     for var in wind_variables:
-        # Realizar la descomposición estacional para cada variable
-        series = df[var].dropna()  # Elimina los valores faltantes
-        
-        decomposition = seasonal_decompose(series, model='additive', period=12)
-        
         # Agregar los subgráficos para cada componente de la descomposición
-
-        # Datos Originales
-        fig.add_trace(go.Scatter(
-            x=df['Fecha'],
-            y=decomposition.observed,
-            mode='lines',
-            name=f'{var} - Serie Original'
-        ), row=row_index, col=1)
-        row_index += 1
-
-        # Tendencia
-        fig.add_trace(go.Scatter(
-            x=df['Fecha'],
-            y=decomposition.trend,
-            mode='lines',
-            name=f'{var} - Tendencia'
-        ), row=row_index, col=1)
-        row_index += 1
-
-        # Estacionalidad
-        fig.add_trace(go.Scatter(
-            x=df['Fecha'],
-            y=decomposition.seasonal,
-            mode='lines',
-            name=f'{var} - Estacionalidad'
-        ), row=row_index, col=1)
-        row_index += 1
-
-        # Residuos
-        fig.add_trace(go.Scatter(
-            x=df['Fecha'],
-            y=decomposition.resid,
-            mode='lines',
-            name=f'{var} - Residuos'
-        ), row=row_index, col=1)
-        row_index += 1
+        decomposition = descomposiciones[var]
+        for component in componentes_descomposicion:
+            # Cada componente se reduce con LTTB como las demás series de tiempo
+            indices = indices_lttb(decomposition['Fecha'].astype('int64'), decomposition[component], MAX_PUNTOS_SERIE)
+            fig.add_trace(go.Scatter(
+                x=decomposition['Fecha'][indices],
+                y=decomposition[component][indices],
+                mode='lines',
+                name=f'{var} - {component}'
+            ), row=row_index, col=1)
+            row_index += 1
 
     # Ajustar el layout
     fig.update_layout(
@@ -685,6 +1591,30 @@ def create_seasonal_decomposition_figure():
     return fig
 
 
+@app.callback(
+    dash.dependencies.Output('seasonal-decompose-wind', 'figure'),
+    [dash.dependencies.Input('solicitud-descomposicion', 'data')],
+    background=True,
+    manager=gestor_trabajos,
+    progress=[dash.dependencies.Output('progreso-descomposicion', 'value'),
+              dash.dependencies.Output('progreso-descomposicion', 'label')],
+    running=[(dash.dependencies.Output('progreso-descomposicion', 'style'), {'height': '20px'}, {'display': 'none'})],
+)
+def calcular_descomposicion(set_progress, solicitud):
+    # Trabajo en segundo plano. La solicitud trae el sitio y la versión de su dataset, así que Dash indexa la
+    # figura por versión; cada descomposición queda además en cache_trabajos para los workers web
+    sitio = solicitud['sitio']
+    set_progress((0, 'En cola'))
+    with turno_trabajo():
+        # Se usa la versión de los datos que ve este proceso: la clave en disco siempre corresponde a lo calculado
+        version = version_sitio(sitio)
+        for i, var in enumerate(wind_variables):
+            set_progress((i * 100 // len(wind_variables), f'Descomponiendo {var}'))
+            descomposicion_variable(sitio, var, version)
+        set_progress((100, 'Armando la figura'))
+        return create_seasonal_decomposition_figure(sitio)
+
+
 
 # Definir los rangos aceptados para cada variable
 rango_velocidad_viento = (4, 30)  # m/s
@@ -693,32 +1623,135 @@ rango_humedad = (50, 100)  # %
 rango_temperatura = (15, 45)  # °C
 rango_direccion_viento = (0, 360)  # grados
 
-# Aplicar las transformaciones para cada variable en el dataset
-df['WindSpeed100m_1'] = df['WindSpeed100m_1'].apply(lambda x: x if pd.notna(x) and rango_velocidad_viento[0] <= x <= rango_velocidad_viento[1] else np.nan)
-df['WinSpeed100m_2'] = df['WinSpeed100m_2'].apply(lambda x: x if pd.notna(x) and rango_velocidad_viento[0] <= x <= rango_velocidad_viento[1] else np.nan)
-df['WindSpeed80_1'] = df['WindSpeed80_1'].apply(lambda x: x if pd.notna(x) and rango_velocidad_viento[0] <= x <= rango_velocidad_viento[1] else np.nan)
-df['WindSpeed80_2'] = df['WindSpeed80_2'].apply(lambda x: x if pd.notna(x) and rango_velocidad_viento[0] <= x <= rango_velocidad_viento[1] else np.nan)
-df['WindSpeed60'] = df['WindSpeed60'].apply(lambda x: x if pd.notna(x) and rango_velocidad_viento[0] <= x <= rango_velocidad_viento[1] else np.nan)
-df['Presion'] = df['Presion'].apply(lambda x: x if pd.notna(x) and rango_presion[0] <= x <= rango_presion[1] else np.nan)
-df['Humedad'] = df['Humedad'].apply(lambda x: x if pd.notna(x) and rango_humedad[0] <= x <= rango_humedad[1] else np.nan)
-df['Temperatura100m'] = df['Temperatura100m'].apply(lambda x: x if pd.notna(x) and rango_temperatura[0] <= x <= rango_temperatura[1] else np.nan)
-df['Temperatura21m'] = df['Temperatura21m'].apply(lambda x: x if pd.notna(x) and rango_temperatura[0] <= x <= rango_temperatura[1] else np.nan)
-df['WindDirection100'] = df['WindDirection100'].apply(lambda x: x if pd.notna(x) and rango_direccion_viento[0] <= x <= rango_direccion_viento[1] else np.nan)
-df['WindDirection80'] = df['WindDirection80'].apply(lambda x: x if pd.notna(x) and rango_direccion_viento[0] <= x <= rango_direccion_viento[1] else np.nan)
-df['WindDirection60m'] = df['WindDirection60m'].apply(lambda x: x if pd.notna(x) and rango_direccion_viento[0] <= x <= rango_direccion_viento[1] else np.nan)
+# Tabla declarativa de reglas: columna -> rango aceptado, unidad y acción
+# ('anular' reemplaza por NaN los valores fuera de rango, 'recortar' los lleva al límite más cercano).
+# Un sensor nuevo solo necesita una fila más en esta tabla.
+reglas_rango = [
+    {'columna': 'WindSpeed100m_1', 'min': rango_velocidad_viento[0], 'max': rango_velocidad_viento[1], 'unidad': 'm/s', 'accion': 'anular'},
+    {'columna': 'WinSpeed100m_2', 'min': rango_velocidad_viento[0], 'max': rango_velocidad_viento[1], 'unidad': 'm/s', 'accion': 'anular'},
+    {'columna': 'WindSpeed80_1', 'min': rango_velocidad_viento[0], 'max': rango_velocidad_viento[1], 'unidad': 'm/s', 'accion': 'anular'},
+    {'columna': 'WindSpeed80_2', 'min': rango_velocidad_viento[0], 'max': rango_velocidad_viento[1], 'unidad': 'm/s', 'accion': 'anular'},
+    {'columna': 'WindSpeed60', 'min': rango_velocidad_viento[0], 'max': rango_velocidad_viento[1], 'unidad': 'm/s', 'accion': 'anular'},
+    {'columna': 'Presion', 'min': rango_presion[0], 'max': rango_presion[1], 'unidad': 'hPa', 'accion': 'anular'},
+    {'columna': 'Humedad', 'min': rango_humedad[0], 'max': rango_humedad[1], 'unidad': '%', 'accion': 'anular'},
+    {'columna': 'Temperatura100m', 'min': rango_temperatura[0], 'max': rango_temperatura[1], 'unidad': '°C', 'accion': 'anular'},
+    {'columna': 'Temperatura21m', 'min': rango_temperatura[0], 'max': rango_temperatura[1], 'unidad': '°C', 'accion': 'anular'},
+    {'columna': 'WindDirection100', 'min': rango_direccion_viento[0], 'max': rango_direccion_viento[1], 'unidad': 'grados', 'accion': 'anular'},
+    {'columna': 'WindDirection80', 'min': rango_direccion_viento[0], 'max': rango_direccion_viento[1], 'unidad': 'grados', 'accion': 'anular'},
+    {'columna': 'WindDirection60m', 'min': rango_direccion_viento[0], 'max': rango_direccion_viento[1], 'unidad': 'grados', 'accion': 'anular'},
+]
+
+
+def aplicar_reglas_rango(tabla, reglas):
+    # Valida todas las columnas en una sola pasada: una matriz (filas x reglas) comparada contra
+    # los vectores de mínimos y máximos. Los NaN no cumplen ninguna comparación y se conservan.
+    reglas = [regla for regla in reglas if regla['columna'] in tabla.columns]
+    columnas = [regla['columna'] for regla in reglas]
+    # Se trabaja en float32, el tipo compacto de los sensores
+    minimos = np.array([regla['min'] for regla in reglas], dtype=np.float32)
+    maximos = np.array([regla['max'] for regla in reglas], dtype=np.float32)
+    recortar = np.array([regla['accion'] == 'recortar' for regla in reglas])
+
+    valores = tabla[columnas].to_numpy(dtype=np.float32)
+    fuera = (valores < minimos) | (valores > maximos)
+    valores = np.where(recortar, np.clip(valores, minimos, maximos), np.where(fuera, np.float32(np.nan), valores))
+
+    reporte = pd.DataFrame({
+        'Variable': columnas,
+        'Unidad': [regla['unidad'] for regla in reglas],
+        'Mínimo': minimos,
+        'Máximo': maximos,
+        'Acción': [regla['accion'] for regla in reglas],
+        'Rechazados': fuera.sum(axis=0),
+    })
+    return tabla.assign(**dict(zip(columnas, valores.T))), reporte
+
+
+# Estadísticas generales como acumuladores combinables por columna: conteo, suma, suma de cuadrados,
+# mínimo, máximo y un t-digest (centroides media/peso) para los cuantiles. Se calculan una vez y al
+# llegar filas nuevas solo se combinan con las de esas filas, sin volver a recorrer todo el dataset.
+COMPRESION_TDIGEST = 200
+
+
+def _comprimir_tdigest(medias, pesos, compresion=COMPRESION_TDIGEST):
+    orden = np.argsort(medias, kind='mergesort')
+    medias, pesos = medias[orden], pesos[orden]
+    q = (np.cumsum(pesos) - pesos / 2) / pesos.sum()
+    # Escala k1: los centroides son más pequeños en las colas, donde los cuantiles necesitan más precisión
+    k = compresion / (2 * np.pi) * np.arcsin(2 * q - 1)
+    _, grupo = np.unique(np.floor(k), return_inverse=True)
+    nuevos_pesos = np.bincount(grupo, weights=pesos)
+    return np.bincount(grupo, weights=medias * pesos) / nuevos_pesos, nuevos_pesos
+
+
+def acumulador_columna(valores):
+    valores = valores[~np.isnan(valores)]
+    if len(valores) == 0:
+        return {'conteo': 0, 'suma': 0.0, 'suma_cuadrados': 0.0, 'minimo': np.nan, 'maximo': np.nan,
+                'medias': np.empty(0), 'pesos': np.empty(0)}
+    medias, pesos = _comprimir_tdigest(valores, np.ones(len(valores)))
+    return {'conteo': len(valores), 'suma': valores.sum(), 'suma_cuadrados': np.dot(valores, valores),
+            'minimo': valores.min(), 'maximo': valores.max(), 'medias': medias, 'pesos': pesos}
+
+
+def combinar_acumuladores(a, b):
+    medias = np.concatenate([a['medias'], b['medias']])
+    pesos = np.concatenate([a['pesos'], b['pesos']])
+    if len(medias):
+        medias, pesos = _comprimir_tdigest(medias, pesos)
+    return {'conteo': a['conteo'] + b['conteo'], 'suma': a['suma'] + b['suma'],
+            'suma_cuadrados': a['suma_cuadrados'] + b['suma_cuadrados'],
+            'minimo': np.fmin(a['minimo'], b['minimo']), 'maximo': np.fmax(a['maximo'], b['maximo']),
+            'medias': medias, 'pesos': pesos}
+
+
+def calcular_estadisticas(tabla):
+    return {col: acumulador_columna(tabla[col].to_numpy(dtype=float)) for col in tabla.select_dtypes('number').columns}
+
+
+def actualizar_estadisticas(estado, nuevas_filas):
+    # Combina las estadísticas acumuladas del sitio con las de las filas nuevas
+    nuevas = calcular_estadisticas(nuevas_filas)
+    estado['estadisticas'] = {col: combinar_acumuladores(acc, nuevas[col]) if col in nuevas else acc
+                              for col, acc in estado['estadisticas'].items()}
+
+
+def _cuantil_tdigest(acc, q):
+    if acc['conteo'] == 0:
+        return np.nan
+    posiciones = (np.cumsum(acc['pesos']) - acc['pesos'] / 2) / acc['pesos'].sum()
+    return float(np.interp(q, np.r_[0, posiciones, 1], np.r_[acc['minimo'], acc['medias'], acc['maximo']]))
+
+
+@functools.lru_cache(maxsize=8)
+def tabla_estadisticas(sitio, version):
+    # Equivalente a df.describe().reset_index(), armado a partir de los acumuladores (costo por columna, no por fila)
+    filas = {}
+    for col, acc in estado_sitio(sitio)['estadisticas'].items():
+        n = acc['conteo']
+        media = acc['suma'] / n if n else np.nan
+        varianza = max(acc['suma_cuadrados'] - acc['suma'] * media, 0) / (n - 1) if n > 1 else np.nan
+        filas[col] = [n, media, np.sqrt(varianza), acc['minimo'], _cuantil_tdigest(acc, 0.25),
+                      _cuantil_tdigest(acc, 0.5), _cuantil_tdigest(acc, 0.75), acc['maximo']]
+    return pd.DataFrame(filas, index=['count', 'mean', 'std', 'min', '25%', '50%', '75%', 'max']).reset_index()
+
 
 # Variables a analizar
 variables_a_analizar = ['Temperatura100m', 'WinSpeed100m_2', 'WindSpeed80_2', 'Presion', 'Humedad', 'WindDirection100']
-datos_seleccionados = df[variables_a_analizar]
 
-# Calcular el porcentaje de valores faltantes
-missing_percentages = (datos_seleccionados.isnull().mean() * 100).sort_values(ascending=False)
 
-# Crear un DataFrame para el gráfico de barras apiladas
-missing_data = pd.DataFrame({'Faltante': missing_percentages, 'No Faltante': 100 - missing_percentages})
+def calcular_datos_faltantes(estado):
+    # Calcular el porcentaje de valores faltantes
+    missing_percentages = (estado['conteo_faltantes'] / max(estado['total_filas'], 1) * 100).sort_values(ascending=False)
+
+    # Crear un DataFrame para el gráfico de barras apiladas
+    return pd.DataFrame({'Faltante': missing_percentages, 'No Faltante': 100 - missing_percentages})
+
 
 # Función para crear el gráfico de valores faltantes en Plotly
-def create_missing_data_plot():
+@memoizar_figura
+def create_missing_data_plot(sitio):
+    missing_data = estado_sitio(sitio)['missing_data']
     fig = go.Figure()
 
     # Agregar las barras de "Faltante"
@@ -741,6 +1774,1720 @@ def create_missing_data_plot():
     return fig
 
 
+# Rachas de datos faltantes: codificación por longitud de corridas (RLE) de la máscara de faltantes de
+# todos los sensores a la vez. Los resultados se calculan una vez por versión del dataset.
+def rachas_faltantes(faltantes):
+    # faltantes: matriz booleana (filas x sensores). Devuelve, por cada racha, el sensor, la fila donde
+    # empieza y la fila siguiente a su fin, ordenadas por sensor y luego por fila.
+    relleno = np.zeros((1, faltantes.shape[1]), dtype=np.int8)
+    bordes = np.diff(np.vstack([relleno, faltantes.astype(np.int8), relleno]), axis=0).T
+    sensor, inicios = np.nonzero(bordes == 1)
+    _, fines = np.nonzero(bordes == -1)
+    return sensor, inicios, fines
+
+
+@functools.lru_cache(maxsize=8)
+def resumen_huecos(sitio, version):
+    df = datos_sitio(sitio)
+    sensores = [regla['columna'] for regla in reglas_rango]
+    faltantes = df[sensores].isna().to_numpy()
+    sensor, inicios, fines = rachas_faltantes(faltantes)
+
+    # Duración de cada racha según las marcas de tiempo (incluye registros ausentes dentro del hueco)
+    fechas = df.index.to_numpy()
+    paso = np.median(np.diff(fechas)) if len(fechas) > 1 else np.timedelta64(0, 'ns')
+    fin_tiempo = np.where(fines < len(fechas), fechas[np.minimum(fines, len(fechas) - 1)], fechas[-1] + paso)
+    duraciones = (fin_tiempo - fechas[inicios]) / np.timedelta64(1, 'h')
+
+    huecos = np.bincount(sensor, minlength=len(sensores))
+    mayor = np.zeros(len(sensores))
+    inicio_mayor = np.full(len(sensores), '', dtype=object)
+    if len(sensor):
+        # Racha más larga de cada sensor: el máximo de duración dentro de cada grupo
+        orden = np.lexsort((duraciones, sensor))
+        ultimos = orden[np.r_[np.flatnonzero(np.diff(sensor[orden])), len(orden) - 1]]
+        mayor[sensor[ultimos]] = duraciones[ultimos]
+        inicio_mayor[sensor[ultimos]] = pd.DatetimeIndex(fechas[inicios[ultimos]]).strftime('%Y-%m-%d %H:%M')
+    return pd.DataFrame({
+        'Variable': sensores,
+        'Faltante (%)': np.round(faltantes.mean(axis=0) * 100, 2),
+        'Huecos': huecos,
+        'Hueco más largo (h)': np.round(mayor, 2),
+        'Inicio del hueco más largo': inicio_mayor,
+    })
+
+
+@functools.lru_cache(maxsize=8)
+def disponibilidad_diaria(sitio, version):
+    # Porcentaje de registros válidos por sensor y día
+    df = datos_sitio(sitio)
+    sensores = [regla['columna'] for regla in reglas_rango]
+    # Solo se construye la máscara booleana; groupby descarta las fechas NaT sin filtrar el dataset
+    validos = df[sensores].notna()
+    return validos.groupby(validos.index.floor('D')).mean() * 100
+
+
+@memoizar_figura
+def create_availability_heatmap(sitio):
+    disponibilidad = disponibilidad_diaria(sitio, version_sitio(sitio))
+    fig = go.Figure(go.Heatmap(
+        x=disponibilidad.index, y=disponibilidad.columns, z=disponibilidad.to_numpy().T,
+        colorscale='Blues', zmin=0, zmax=100, colorbar=dict(title='% disponible'),
+        hovertemplate='%{y}<br>%{x|%Y-%m-%d}: %{z:.1f}%<extra></extra>'
+    ))
+    fig.update_layout(height=500, xaxis_title='Fecha', yaxis_title='Sensor')
+    return fig
+
+
+# Consistencia de sensores gemelos: para cada par de anemómetros a la misma altura se analiza la diferencia
+# con estadísticas móviles (sesgo sostenido y saltos puntuales), se ajusta una regresión lineal entre ambos
+# con los registros sin marcas y se rellenan los huecos de cada sensor a partir de su gemelo. El resultado
+# (series reconstruidas, marcas y qué se rellenó) se calcula una vez por versión y se guarda en el almacén;
+# al ingerir filas nuevas se parte del resultado anterior y de las sumas de las regresiones.
+pares_sensores = [('WindSpeed100m_1', 'WinSpeed100m_2'), ('WindSpeed80_1', 'WindSpeed80_2')]
+VENTANA_CONSISTENCIA = 36  # registros de 10 minutos (6 horas)
+UMBRAL_SESGO = 0.5  # m/s de diferencia media en la ventana
+UMBRAL_SALTO = 4  # desviaciones de la diferencia respecto a su media móvil
+MARCA_SESGO, MARCA_SALTO = 1, 2
+
+
+def marcas_divergencia(diferencia, ventana=VENTANA_CONSISTENCIA):
+    # Media y desviación móviles centradas de la diferencia entre gemelos; devuelve la media y las marcas
+    # (0 sin marca, MARCA_SESGO si la media supera UMBRAL_SESGO, MARCA_SALTO si el punto se aparta de la media)
+    movil = pd.Series(diferencia).rolling(ventana, center=True, min_periods=ventana // 2)
+    media, desviacion = movil.mean().to_numpy(), movil.std().to_numpy()
+    with np.errstate(invalid='ignore'):
+        salto = np.abs(diferencia - media) > UMBRAL_SALTO * desviacion
+        sesgo = np.abs(media) > UMBRAL_SESGO
+    return media, np.where(salto, MARCA_SALTO, np.where(sesgo, MARCA_SESGO, 0)).astype(np.int8)
+
+
+def sumas_regresion(x, y):
+    return np.array([len(x), x.sum(), y.sum(), x @ x, y @ y, x @ y])
+
+
+def regresion_gemelos(sumas):
+    # Mínimos cuadrados y = ordenada + pendiente * x en forma cerrada a partir de las sumas de sumas_regresion
+    # (combinables entre tramos); devuelve también el R^2 y la desviación estándar de los residuos
+    n, sx, sy, sxx, syy, sxy = sumas
+    if n < 2:
+        return np.nan, np.nan, np.nan, np.nan
+    vx, vy, cxy = sxx - sx * sx / n, syy - sy * sy / n, sxy - sx * sy / n
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pendiente = cxy / vx
+        r2 = cxy ** 2 / (vx * vy)
+    return (sy - pendiente * sx) / n, pendiente, r2, float(np.sqrt(max(vy * (1 - r2) / (n - 1), 0)))
+
+
+def tabla_gemelos(df, previo=None):
+    # Reconstrucción y ajustes por par. Con `previo` (reconstrucción y ajustes de una versión cuyas filas son
+    # el comienzo de df) las marcas solo se recalculan a menos de una ventana del final anterior, que es lo que
+    # alcanzan las filas nuevas, y las sumas de las regresiones se corrigen con ese tramo
+    limites = {regla['columna']: (regla['min'], regla['max']) for regla in reglas_rango}
+    n_previas = 0 if previo is None else len(previo[0])
+    inicio = max(n_previas - VENTANA_CONSISTENCIA, 0)
+    contexto = max(inicio - VENTANA_CONSISTENCIA, 0)
+    columnas = {'Fecha': df.index.to_numpy()}
+    ajustes = {}
+    for a, b in pares_sensores:
+        clave = f'{a}|{b}'
+        va, vb = df[a].to_numpy(dtype=float), df[b].to_numpy(dtype=float)
+        media, marca = (serie[inicio - contexto:] for serie in marcas_divergencia(va[contexto:] - vb[contexto:]))
+        con_dato = ~np.isnan(va) & ~np.isnan(vb)
+        nuevas = con_dato[n_previas:]
+        par = {'registros': int(nuevas.sum()), 'suma_diferencia': float(np.sum(va[n_previas:][nuevas] - vb[n_previas:][nuevas]))}
+        marca_previa = np.empty(0, dtype=np.int8)
+        if previo is not None:
+            anterior = previo[1][clave]
+            par['registros'] += anterior['registros']
+            par['suma_diferencia'] += anterior['suma_diferencia']
+            marca_previa = previo[0][f'{clave}|marca'].to_numpy()[inicio:]
+            media = np.concatenate([previo[0][f'{clave}|media'].to_numpy()[:inicio], media])
+            marca = np.concatenate([previo[0][f'{clave}|marca'].to_numpy()[:inicio], marca])
+        columnas[f'{clave}|media'] = media.astype(np.float32)
+        columnas[f'{clave}|marca'] = marca
+        par['diferencia_media'] = par['suma_diferencia'] / par['registros'] if par['registros'] else None
+        par['faltante'] = float((len(va) - par['registros']) / max(len(va), 1) * 100)
+        quitar = con_dato[inicio:n_previas] & (marca_previa == 0)
+        agregar = con_dato[inicio:] & (marca[inicio:] == 0)
+        for destino_col, vd, vo in [(a, va, vb), (b, vb, va)]:
+            sumas = np.zeros(6) if previo is None else np.array(previo[1][clave][destino_col]['sumas'])
+            sumas += sumas_regresion(vo[inicio:][agregar], vd[inicio:][agregar])
+            sumas -= sumas_regresion(vo[inicio:n_previas][quitar], vd[inicio:n_previas][quitar])
+            ordenada, pendiente, r2, residuo = regresion_gemelos(sumas)
+            # NaN no es JSON válido: los ajustes imposibles se guardan como None
+            par[destino_col] = {clave_ajuste: None if np.isnan(valor) else float(valor) for clave_ajuste, valor in
+                                [('ordenada', ordenada), ('pendiente', pendiente), ('r2', r2), ('residuo', residuo)]}
+            par[destino_col]['sumas'] = sumas.tolist()
+            # Los coeficientes cambian con cada versión: el relleno se rehace en todas las filas (es solo aritmética)
+            estimado = ordenada + pendiente * vo
+            minimo, maximo = limites.get(destino_col, (-np.inf, np.inf))
+            # Solo se rellena si el gemelo tiene dato y la estimación cae dentro del rango aceptado
+            with np.errstate(invalid='ignore'):
+                rellenar = np.isnan(vd) & ~np.isnan(estimado) & (estimado >= minimo) & (estimado <= maximo)
+            columnas[destino_col] = np.where(rellenar, estimado, vd).astype(np.float32)
+            columnas[f'{destino_col}|relleno'] = rellenar
+        ajustes[clave] = par
+    return pd.DataFrame(columnas), ajustes
+
+
+@functools.lru_cache(maxsize=8)
+def consistencia_pares(sitio, version):
+    # Devuelve la reconstrucción y, por par, los coeficientes de ambas regresiones (con sus sumas) y las
+    # estadísticas de la diferencia, que se guardan como metadatos del almacén para que el resumen no vuelva a ajustar nada
+    destino = os.path.join(directorio_cache, f'gemelos-{version}')
+    if not os.path.isdir(destino):
+        tabla, ajustes = tabla_gemelos(datos_sitio(sitio))
+        _guardar_almacen(tabla, destino, {'ajustes': ajustes})
+    return _leer_almacen(destino).set_index('Fecha'), _leer_metadatos(destino)['ajustes']
+
+
+def extender_consistencia(version_anterior, version, df):
+    origen = os.path.join(directorio_cache, f'gemelos-{version_anterior}')
+    destino = os.path.join(directorio_cache, f'gemelos-{version}')
+    if not os.path.isdir(origen) or os.path.isdir(destino):
+        return
+    ajustes = _leer_metadatos(origen)['ajustes']
+    if any('suma_diferencia' not in ajustes.get(f'{a}|{b}', {}) for a, b in pares_sensores):
+        return  # Escrito antes de guardar las sumas: se recalcula completo cuando se pida
+    tabla, ajustes = tabla_gemelos(df, (_leer_almacen(origen), ajustes))
+    _guardar_almacen(tabla, destino, {'ajustes': ajustes})
+
+
+def serie_reconstruida(sitio, columna):
+    # Serie del sensor con los huecos rellenados desde su gemelo (y la máscara de lo rellenado)
+    reconstruccion, _ = consistencia_pares(sitio, version_sitio(sitio))
+    return reconstruccion[columna], reconstruccion[f'{columna}|relleno']
+
+
+@functools.lru_cache(maxsize=8)
+def resumen_consistencia(sitio, version):
+    reconstruccion, ajustes = consistencia_pares(sitio, version)
+    filas = []
+    for a, b in pares_sensores:
+        par = ajustes[f'{a}|{b}']
+        ajuste = par[a]
+        marca = reconstruccion[f'{a}|{b}|marca'].to_numpy()
+        filas.append({
+            'Sensor A': a,
+            'Sensor B': b,
+            'Registros con ambos': par['registros'],
+            'Diferencia media A-B (m/s)': None if par['diferencia_media'] is None else round(par['diferencia_media'], 3),
+            'Ajuste A = a + b·B': f"{ajuste['ordenada']:.3f} + {ajuste['pendiente']:.4f}·B" if ajuste['pendiente'] is not None else '',
+            'R^2': None if ajuste['r2'] is None else round(ajuste['r2'], 4),
+            'Error típico del ajuste (m/s)': None if ajuste['residuo'] is None else round(ajuste['residuo'], 3),
+            'Sesgo sostenido (%)': round(float(np.mean(marca == MARCA_SESGO) * 100), 2),
+            'Saltos puntuales (%)': round(float(np.mean(marca == MARCA_SALTO) * 100), 2),
+            'Rellenados A': int(reconstruccion[f'{a}|relleno'].sum()),
+            'Rellenados B': int(reconstruccion[f'{b}|relleno'].sum()),
+            'Faltante antes (%)': round(par['faltante'], 2),
+            'Faltante después (%)': round(float(np.mean(np.isnan(reconstruccion[a].to_numpy()) | np.isnan(reconstruccion[b].to_numpy())) * 100), 2),
+        })
+    return pd.DataFrame(filas)
+
+
+def muestra_uniforme(indices, n_puntos):
+    # A lo sumo n_puntos elementos repartidos de forma pareja en todo el rango, no solo los primeros
+    if len(indices) <= n_puntos:
+        return indices
+    return indices[np.linspace(0, len(indices) - 1, n_puntos).astype(int)]
+
+
+@memoizar_figura
+def create_consistency_figure(sitio):
+    reconstruccion, _ = consistencia_pares(sitio, version_sitio(sitio))
+    df = datos_sitio(sitio)
+    fechas = reconstruccion.index.to_numpy()
+    fig = make_subplots(rows=len(pares_sensores), cols=2, column_widths=[0.65, 0.35],
+                        subplot_titles=[titulo for a, b in pares_sensores
+                                        for titulo in (f'Diferencia media móvil {a} - {b}', f'{a} vs. {b}')])
+    for fila, (a, b) in enumerate(pares_sensores, start=1):
+        media = reconstruccion[f'{a}|{b}|media'].to_numpy(dtype=float)
+        marca = reconstruccion[f'{a}|{b}|marca'].to_numpy()
+        validas = ~np.isnat(fechas)
+        indices = np.flatnonzero(validas)[indices_lttb(fechas[validas].astype('int64'), media[validas], MAX_PUNTOS_SERIE)]
+        fig.add_trace(go.Scatter(x=fechas[indices], y=media[indices], mode='lines', line=dict(color='#004F6D'), showlegend=False), row=fila, col=1)
+        for umbral in (-UMBRAL_SESGO, UMBRAL_SESGO):
+            fig.add_hline(y=umbral, line=dict(color='gray', dash='dot'), row=fila, col=1)
+        marcados = muestra_uniforme(np.flatnonzero(marca == MARCA_SALTO), MAX_PUNTOS_SERIE)
+        fig.add_trace(go.Scatter(x=fechas[marcados], y=media[marcados], mode='markers', name='Salto puntual',
+                                 marker=dict(color='#FF7F0E', size=4), showlegend=fila == 1), row=fila, col=1)
+
+        # Dispersión entre gemelos (muestra acotada) con los valores rellenados resaltados
+        va, vb = df[a].to_numpy(dtype=float), df[b].to_numpy(dtype=float)
+        ambos = np.flatnonzero(~np.isnan(va) & ~np.isnan(vb))
+        muestra = muestra_uniforme(ambos, 5 * MAX_PUNTOS_SERIE)
+        fig.add_trace(go.Scattergl(x=vb[muestra], y=va[muestra], mode='markers', marker=dict(size=3, color='#4682B4', opacity=0.4),
+                                   name='Medido', showlegend=fila == 1), row=fila, col=2)
+        relleno_a = reconstruccion[f'{a}|relleno'].to_numpy()
+        relleno_b = reconstruccion[f'{b}|relleno'].to_numpy()
+        x_relleno = np.r_[vb[relleno_a], reconstruccion[b].to_numpy()[relleno_b]]
+        y_relleno = np.r_[reconstruccion[a].to_numpy()[relleno_a], va[relleno_b]]
+        rellenos = muestra_uniforme(np.arange(len(x_relleno)), 5 * MAX_PUNTOS_SERIE)
+        fig.add_trace(go.Scattergl(x=x_relleno[rellenos], y=y_relleno[rellenos],
+                                   mode='markers', marker=dict(size=4, color='#FF7F0E'), name='Rellenado', showlegend=fila == 1), row=fila, col=2)
+        fig.update_xaxes(title_text=f'{b} (m/s)', row=fila, col=2)
+        fig.update_yaxes(title_text=f'{a} (m/s)', row=fila, col=2)
+    fig.update_layout(height=450 * len(pares_sensores), width=1200)
+    return fig
+
+
+# Perfil vertical del viento: exponente de cortante (ley de potencia) y rugosidad (ley logarítmica) de cada
+# registro, ajustados por mínimos cuadrados sobre todas las alturas con dato en una sola pasada de NumPy.
+# El perfil se calcula una vez por versión del dataset y se guarda en el almacén columnar; la extrapolación
+# a la altura del buje se evalúa con el ajuste de cada registro.
+alturas_cortante = [
+    (60, ['WindSpeed60']),
+    (80, ['WindSpeed80_1', 'WindSpeed80_2']),
+    (100, ['WindSpeed100m_1', 'WinSpeed100m_2']),
+]
+ALTURA_BUJE = float(os.environ.get('ALTURA_BUJE', 120))  # m
+alturas_buje = sorted({80.0, 100.0, 120.0, 140.0, 160.0, ALTURA_BUJE})
+
+
+def velocidades_por_altura(df):
+    # Matriz (filas x alturas) con el promedio de los sensores de cada altura; NaN si ninguno tiene dato
+    columnas = []
+    for _, sensores in alturas_cortante:
+        valores = df[sensores].to_numpy(dtype=float)
+        conteo = (~np.isnan(valores)).sum(axis=1)
+        columnas.append(np.where(conteo > 0, np.nansum(valores, axis=1) / np.maximum(conteo, 1), np.nan))
+    return np.column_stack(columnas)
+
+
+def ajuste_perfil(velocidades, alturas):
+    # Regresión lineal por fila con sumas enmascaradas (las alturas sin dato pesan cero):
+    # ln v = ln a + alfa ln z (ley de potencia) y v = A ln z - A ln z0 (ley logarítmica).
+    # Se necesitan al menos dos alturas con dato; en otro caso el registro queda en NaN.
+    ln_z = np.log(np.asarray(alturas, dtype=float))
+    validos = ~np.isnan(velocidades) & (velocidades > 0)
+    v = np.where(validos, velocidades, 0.0)
+    ln_v = np.log(np.where(validos, velocidades, 1.0))  # 0 donde no hay dato
+    n = validos.sum(axis=1)
+    sx, sxx = validos @ ln_z, validos @ ln_z ** 2
+    denominador = n * sxx - sx ** 2
+    ajustable = (n >= 2) & (denominador > 0)
+    denominador = np.where(ajustable, denominador, 1.0)
+    n = np.maximum(n, 1)
+
+    alfa = (n * (ln_v @ ln_z) - sx * ln_v.sum(axis=1)) / denominador
+    ln_a = (ln_v.sum(axis=1) - alfa * sx) / n
+    pendiente = (n * (v @ ln_z) - sx * v.sum(axis=1)) / denominador
+    ordenada = (v.sum(axis=1) - pendiente * sx) / n
+    with np.errstate(over='ignore', invalid='ignore'):
+        # Con pendiente no positiva el perfil no es logarítmico y z0 no está definido
+        z0 = np.exp(-ordenada / np.where(pendiente > 0, pendiente, np.nan))
+    return np.where(ajustable, alfa, np.nan), np.where(ajustable, ln_a, np.nan), np.where(ajustable, z0, np.nan)
+
+
+def tabla_perfil(df):
+    alfa, ln_a, z0 = ajuste_perfil(velocidades_por_altura(df), [altura for altura, _ in alturas_cortante])
+    return pd.DataFrame({
+        'Fecha': df.index.to_numpy(),
+        'alfa': alfa.astype(np.float32), 'ln_a': ln_a.astype(np.float32), 'z0': z0.astype(np.float32),
+    })
+
+
+@functools.lru_cache(maxsize=8)
+def perfil_cortante(sitio, version):
+    destino = os.path.join(directorio_cache, f'cortante-{version}')
+    if not os.path.isdir(destino):
+        _guardar_almacen(tabla_perfil(datos_sitio(sitio)), destino)
+    perfil = _leer_capas(destino)
+    return perfil.set_index('Fecha')
+
+
+def extender_cortante(version_anterior, version, nuevas_filas):
+    # El ajuste es independiente por registro: el perfil de la versión nueva es un segmento con las filas nuevas
+    origen = os.path.join(directorio_cache, f'cortante-{version_anterior}')
+    destino = os.path.join(directorio_cache, f'cortante-{version}')
+    if os.path.isdir(origen) and not os.path.isdir(destino):
+        _anexar_almacen(origen, tabla_perfil(nuevas_filas), destino)
+
+
+def velocidad_buje(perfil, altura):
+    return np.exp(perfil['ln_a'].to_numpy(dtype=float) + perfil['alfa'].to_numpy(dtype=float) * np.log(altura))
+
+
+@functools.lru_cache(maxsize=16)
+def ciclos_cortante(sitio, version, altura_buje):
+    # Ciclo diurno (por hora del día) y mensual del exponente, con la velocidad extrapolada al buje
+    perfil = perfil_cortante(sitio, version)
+    perfil = perfil[perfil.index.notna()]
+    tabla = pd.DataFrame({'alfa': perfil['alfa'].to_numpy(dtype=float), 'buje': velocidad_buje(perfil, altura_buje),
+                          'v100': datos_sitio(sitio).loc[perfil.index, 'WindSpeed100m_1'].to_numpy(dtype=float)},
+                         index=perfil.index)
+    horas = tabla.groupby(tabla.index.hour)
+    diurno = horas['alfa'].quantile([0.25, 0.5, 0.75]).unstack()
+    diurno['buje'] = horas['buje'].mean()
+    mensual = tabla.resample('MS').agg({'alfa': 'median', 'buje': 'mean', 'v100': 'mean'})
+    return diurno, mensual
+
+
+@functools.lru_cache(maxsize=16)
+def resumen_cortante(sitio, version, altura_buje):
+    perfil = perfil_cortante(sitio, version)
+    buje = velocidad_buje(perfil, altura_buje)
+    medidas = velocidades_por_altura(datos_sitio(sitio))
+    filas = [('Exponente de cortante alfa (mediana)', np.nanmedian(perfil['alfa'])),
+             ('Rugosidad z0 en m (mediana)', np.nanmedian(perfil['z0']))]
+    filas += [(f'Velocidad media medida a {altura} m (m/s)', np.nanmean(medidas[:, i])) for i, (altura, _) in enumerate(alturas_cortante)]
+    filas += [(f'Velocidad media extrapolada a {altura_buje:g} m (m/s)', np.nanmean(buje)),
+              ('Registros con perfil ajustado (%)', np.mean(~np.isnan(perfil['alfa'].to_numpy())) * 100)]
+    return pd.DataFrame({'Indicador': [nombre for nombre, _ in filas], 'Valor': [round(float(valor), 3) for _, valor in filas]})
+
+
+@memoizar_figura
+def create_shear_figure(sitio, altura_buje=ALTURA_BUJE):
+    version = version_sitio(sitio)
+    diurno, mensual = ciclos_cortante(sitio, version, altura_buje)
+    perfil = perfil_cortante(sitio, version)
+    medidas = np.nanmean(velocidades_por_altura(datos_sitio(sitio)), axis=0)
+    alturas = np.array([altura for altura, _ in alturas_cortante], dtype=float)
+    alfa = float(np.nanmedian(perfil['alfa']))
+
+    fig = make_subplots(rows=2, cols=2, subplot_titles=[
+        'Perfil vertical medio', 'Ciclo diurno del exponente alfa',
+        'Exponente alfa mensual (mediana)', f'Velocidad media mensual a 100 m y a {altura_buje:g} m'
+    ])
+    # Perfil medido y ley de potencia con el alfa mediano, anclada en la velocidad media a la mayor altura
+    z = np.linspace(min(alturas.min(), altura_buje) * 0.8, max(alturas.max(), altura_buje) * 1.1, 50)
+    fig.add_trace(go.Scatter(x=medidas[-1] * (z / alturas[-1]) ** alfa, y=z, mode='lines', name=f'Ley de potencia (alfa={alfa:.3f})',
+                             line=dict(color='#4682B4')), row=1, col=1)
+    fig.add_trace(go.Scatter(x=medidas, y=alturas, mode='markers', name='Medido', marker=dict(color='#004F6D', size=10)), row=1, col=1)
+    fig.add_hline(y=altura_buje, line=dict(color='gray', dash='dot'), row=1, col=1)
+
+    fig.add_trace(go.Scatter(x=diurno.index, y=diurno[0.75], mode='lines', line=dict(width=0), showlegend=False, hoverinfo='skip'), row=1, col=2)
+    fig.add_trace(go.Scatter(x=diurno.index, y=diurno[0.25], mode='lines', line=dict(width=0), fill='tonexty',
+                             fillcolor='rgba(0, 79, 109, 0.15)', showlegend=False, hoverinfo='skip'), row=1, col=2)
+    fig.add_trace(go.Scatter(x=diurno.index, y=diurno[0.5], mode='lines+markers', name='Alfa (mediana)', line=dict(color='#004F6D')), row=1, col=2)
+
+    fig.add_trace(go.Bar(x=mensual.index, y=mensual['alfa'], name='Alfa mensual', marker=dict(color='#4682B4')), row=2, col=1)
+    fig.add_trace(go.Scatter(x=mensual.index, y=mensual['v100'], mode='lines+markers', name='Medida a 100 m', line=dict(color='#3CB371')), row=2, col=2)
+    fig.add_trace(go.Scatter(x=mensual.index, y=mensual['buje'], mode='lines+markers', name=f'Extrapolada a {altura_buje:g} m',
+                             line=dict(color='#FF7F0E')), row=2, col=2)
+
+    fig.update_xaxes(title_text='Velocidad (m/s)', row=1, col=1)
+    fig.update_yaxes(title_text='Altura (m)', row=1, col=1)
+    fig.update_xaxes(title_text='Hora del día', row=1, col=2)
+    fig.update_yaxes(title_text='Velocidad (m/s)', row=2, col=2)
+    fig.update_layout(height=800, width=1200)
+    return fig
+
+
+@app.callback(
+    [dash.dependencies.Output('cortante-graph', 'figure'),
+     dash.dependencies.Output('tabla-cortante', 'data')],
+    [dash.dependencies.Input('altura-buje', 'value')],
+    [dash.dependencies.State('selector-sitio', 'value')],
+    prevent_initial_call=True
+)
+def update_shear(altura_buje, sitio):
+    return (create_shear_figure(sitio, altura_buje),
+            resumen_cortante(sitio, version_sitio(sitio), altura_buje).to_dict('records'))
+
+
+# Recurso eólico: distribuciones de Weibull por altura, sector y mes, ajustadas a la vez para todos los
+# grupos (sumas por grupo con bincount) y producción anual de energía (AEP) con una curva de potencia
+# cargada por el usuario. Las curvas se guardan en la caché en disco compartida por su huella (SHA-256),
+# así que los resultados se memorizan por versión del dataset y huella de la curva en cualquier worker.
+N_SECTORES_WEIBULL = 12
+ITERACIONES_WEIBULL = 8  # pasos de Newton desde la estimación por momentos
+MIN_REGISTROS_WEIBULL = 30  # grupos con menos registros quedan sin ajuste
+HORAS_ANIO = 8766
+meses = ['Ene', 'Feb', 'Mar', 'Abr', 'May', 'Jun', 'Jul', 'Ago', 'Sep', 'Oct', 'Nov', 'Dic']
+direccion_por_altura = {int(etiqueta[:-1]): col_direccion for etiqueta, col_direccion, _ in alturas_rosa}
+columnas_energia = ['Altura', 'AEP Weibull (MWh)', 'AEP serie medida (MWh)', 'Factor de planta (%)']
+
+
+def ajuste_weibull(valores, grupos, n_grupos, iteraciones=ITERACIONES_WEIBULL):
+    # Máxima verosimilitud para todos los grupos a la vez: k resuelve 1/k + media(ln x) - Σ x^k ln x / Σ x^k = 0
+    # con Newton, partiendo de la aproximación de Justus k = (σ/μ)^-1.086; luego c = (Σ x^k / n)^(1/k)
+    n = np.bincount(grupos, minlength=n_grupos)
+    ajustable = n >= MIN_REGISTROS_WEIBULL
+    n_seguro = np.maximum(n, 1)
+    media = np.bincount(grupos, valores, n_grupos) / n_seguro
+    varianza = np.bincount(grupos, valores ** 2, n_grupos) / n_seguro - media ** 2
+    desviacion = np.sqrt(np.maximum(varianza, 1e-12))
+    k = np.clip((desviacion / np.where(ajustable, media, 1.0)) ** -1.086, 0.5, 20)
+
+    ln_x = np.log(valores)
+    media_ln = np.bincount(grupos, ln_x, n_grupos) / n_seguro
+    with np.errstate(divide='ignore', invalid='ignore'):  # Los grupos vacíos quedan en NaN
+        for _ in range(iteraciones):
+            xk = valores ** k[grupos]
+            s0 = np.bincount(grupos, xk, n_grupos)
+            s1 = np.bincount(grupos, xk * ln_x, n_grupos)
+            s2 = np.bincount(grupos, xk * ln_x ** 2, n_grupos)
+            funcion = 1 / k + media_ln - s1 / s0
+            derivada = -1 / k ** 2 - (s2 * s0 - s1 ** 2) / s0 ** 2
+            k = np.clip(k - funcion / derivada, 0.5, 20)
+        c = (np.bincount(grupos, valores ** k[grupos], n_grupos) / n_seguro) ** (1 / k)
+    return n, np.where(ajustable, media, np.nan), np.where(ajustable, k, np.nan), np.where(ajustable, c, np.nan)
+
+
+def velocidades_weibull(sitio, version):
+    # (etiqueta, velocidad, dirección) por altura medida y a la altura del buje extrapolada con el perfil vertical
+    df = datos_sitio(sitio)
+    medidas = velocidades_por_altura(df)
+    series = [(f'{altura} m', medidas[:, i], df[direccion_por_altura[altura]].to_numpy(dtype=float))
+              for i, (altura, _) in enumerate(alturas_cortante)]
+    buje = velocidad_buje(perfil_cortante(sitio, version), ALTURA_BUJE)
+    series.append((f'{ALTURA_BUJE:g} m (buje)', buje, df[direccion_por_altura[max(direccion_por_altura)]].to_numpy(dtype=float)))
+    return series, df.index.month.to_numpy() - 1
+
+
+@functools.lru_cache(maxsize=8)
+def tabla_weibull(sitio, version, n_sectores):
+    series, mes = velocidades_weibull(sitio, version)
+    ancho_sector = 360 / n_sectores
+    agrupaciones = [('Total', 1, ['Todas']),
+                    ('Sector', n_sectores, [f'{i * ancho_sector:g}°' for i in range(n_sectores)]),
+                    ('Mes', 12, meses)]
+    tablas = []
+    for agrupacion, n_por_altura, etiquetas in agrupaciones:
+        # Un solo ajuste por agrupación: el grupo combina altura y clase (sector o mes)
+        valores, grupos = [], []
+        for indice, (_, velocidad, direccion) in enumerate(series):
+            if agrupacion == 'Sector':
+                clase = ((direccion + ancho_sector / 2) % 360 // ancho_sector)
+            elif agrupacion == 'Mes':
+                clase = mes
+            else:
+                clase = np.zeros(len(velocidad))
+            validos = (velocidad > 0) & ~np.isnan(clase)
+            valores.append(velocidad[validos])
+            grupos.append(indice * n_por_altura + clase[validos].astype(int))
+        n_grupos = len(series) * n_por_altura
+        n, media, k, c = ajuste_weibull(np.concatenate(valores), np.concatenate(grupos), n_grupos)
+        totales = np.repeat(n.reshape(len(series), n_por_altura).sum(axis=1), n_por_altura)
+        tablas.append(pd.DataFrame({
+            'Altura': np.repeat([etiqueta for etiqueta, _, _ in series], n_por_altura),
+            'Agrupación': agrupacion,
+            'Grupo': np.tile(etiquetas, len(series)),
+            'Registros': n,
+            'Frecuencia (%)': np.round(n / np.maximum(totales, 1) * 100, 2),
+            'Media (m/s)': np.round(media, 3),
+            'k': np.round(k, 3),
+            'c (m/s)': np.round(c, 3),
+        }))
+    return pd.concat(tablas, ignore_index=True)
+
+
+def densidad_weibull(u, k, c):
+    # Matriz (grupos x velocidades) de la densidad de Weibull
+    k, c = np.asarray(k, dtype=float)[:, None], np.asarray(c, dtype=float)[:, None]
+    return (k / c) * (u / c) ** (k - 1) * np.exp(-(u / c) ** k)
+
+
+@memoizar_figura
+def create_weibull_figure(sitio):
+    version = version_sitio(sitio)
+    ajustes = tabla_weibull(sitio, version, N_SECTORES_WEIBULL)
+    series, _ = velocidades_weibull(sitio, version)
+    colores = ['#3CB371', '#4682B4', '#004F6D', '#FF7F0E']
+    fig = make_subplots(rows=1, cols=2, subplot_titles=['Distribución de la velocidad y ajuste de Weibull', 'Parámetro de escala c por mes'])
+
+    totales = ajustes[ajustes['Agrupación'] == 'Total'].reset_index(drop=True)
+    bordes = np.arange(0, rango_velocidad_viento[1] + 1, 1.0)
+    u = np.linspace(0.01, rango_velocidad_viento[1], 200)
+    densidades = densidad_weibull(u, totales['k'], totales['c (m/s)'])
+    for i, (etiqueta, velocidad, _) in enumerate(series):
+        color = colores[i % len(colores)]
+        conteos, _ = np.histogram(velocidad[velocidad > 0], bins=bordes, density=True)
+        fig.add_trace(go.Bar(x=(bordes[:-1] + bordes[1:]) / 2, y=conteos, name=f'{etiqueta} medido', marker=dict(color=color),
+                             opacity=0.35, legendgroup=etiqueta), row=1, col=1)
+        fig.add_trace(go.Scatter(x=u, y=densidades[i], mode='lines', name=f'{etiqueta} Weibull', line=dict(color=color),
+                                 legendgroup=etiqueta), row=1, col=1)
+        mensual = ajustes[(ajustes['Agrupación'] == 'Mes') & (ajustes['Altura'] == etiqueta)]
+        fig.add_trace(go.Scatter(x=mensual['Grupo'], y=mensual['c (m/s)'], mode='lines+markers', line=dict(color=color),
+                                 showlegend=False, legendgroup=etiqueta), row=1, col=2)
+    fig.update_xaxes(title_text='Velocidad (m/s)', row=1, col=1)
+    fig.update_yaxes(title_text='Densidad', row=1, col=1)
+    fig.update_yaxes(title_text='c (m/s)', row=1, col=2)
+    fig.update_layout(height=500, width=1200, barmode='overlay')
+    return fig
+
+
+def leer_curva_potencia(contenido, nombre):
+    # Contenido de dcc.Upload ("data:<tipo>;base64,<datos>") -> velocidades y potencias ordenadas por velocidad
+    datos = base64.b64decode(contenido.split(',', 1)[1])
+    if nombre.lower().endswith(('.xlsx', '.xls')):
+        tabla = pd.read_excel(io.BytesIO(datos))
+    else:
+        tabla = pd.read_csv(io.StringIO(datos.decode('utf-8-sig')), sep=None, engine='python')
+    tabla = tabla.apply(pd.to_numeric, errors='coerce').dropna()
+    if tabla.shape[1] < 2 or len(tabla) < 2:
+        raise ValueError('se esperan dos columnas numéricas (velocidad en m/s y potencia en kW) y al menos dos filas')
+    tabla = tabla.iloc[:, :2].sort_values(tabla.columns[0])
+    velocidades, potencias = tabla.iloc[:, 0].to_numpy(dtype=float), tabla.iloc[:, 1].to_numpy(dtype=float)
+    if (velocidades < 0).any() or (potencias < 0).any():
+        raise ValueError('la curva tiene valores negativos')
+    return velocidades, potencias
+
+
+def guardar_curva_potencia(velocidades, potencias):
+    huella = hashlib.sha256(np.concatenate([velocidades, potencias]).tobytes()).hexdigest()[:16]
+    cache_trabajos.set(f'curva-{huella}', (velocidades, potencias))
+    return huella
+
+
+@functools.lru_cache(maxsize=32)
+def energia_anual(sitio, version, huella_curva):
+    curva = cache_trabajos.get(f'curva-{huella_curva}')
+    if curva is None:
+        raise KeyError(f'Curva de potencia no encontrada: {huella_curva}')
+    velocidades, potencias = curva
+    nominal = float(potencias.max())
+    ajustes = tabla_weibull(sitio, version, N_SECTORES_WEIBULL)
+    series, _ = velocidades_weibull(sitio, version)
+    # Integración numérica de la curva contra la densidad de cada sector, ponderada por la frecuencia del sector
+    u = np.linspace(0, max(velocidades.max(), rango_velocidad_viento[1]), 1201)[1:]
+    potencia_u = np.interp(u, velocidades, potencias, left=0, right=0)
+    filas = []
+    for etiqueta, velocidad, _ in series:
+        sectores = ajustes[(ajustes['Agrupación'] == 'Sector') & (ajustes['Altura'] == etiqueta)].dropna(subset=['k'])
+        frecuencias = sectores['Registros'].to_numpy() / max(sectores['Registros'].sum(), 1)
+        potencia_media = frecuencias @ np.trapezoid(potencia_u * densidad_weibull(u, sectores['k'], sectores['c (m/s)']), u, axis=1)
+        medida = np.interp(velocidad[velocidad > 0], velocidades, potencias, left=0, right=0)
+        filas.append({
+            'Altura': etiqueta,
+            'AEP Weibull (MWh)': round(float(potencia_media) * HORAS_ANIO / 1000, 1),
+            'AEP serie medida (MWh)': round(float(medida.mean()) * HORAS_ANIO / 1000, 1) if len(medida) else None,
+            'Factor de planta (%)': round(float(potencia_media) / nominal * 100, 2) if nominal > 0 else None,
+        })
+    return filas
+
+
+@app.callback(
+    [dash.dependencies.Output('curva-potencia', 'data'),
+     dash.dependencies.Output('estado-curva', 'children')],
+    [dash.dependencies.Input('carga-curva', 'contents')],
+    [dash.dependencies.State('carga-curva', 'filename')],
+    prevent_initial_call=True
+)
+def cargar_curva(contenido, nombre):
+    try:
+        velocidades, potencias = leer_curva_potencia(contenido, nombre or '')
+    except Exception as error:
+        return dash.no_update, f'No se pudo leer {nombre}: {error}'
+    huella = guardar_curva_potencia(velocidades, potencias)
+    return ({'huella': huella, 'nombre': nombre},
+            f'Curva {nombre}: {len(velocidades)} puntos, potencia nominal {potencias.max():g} kW')
+
+
+@app.callback(
+    dash.dependencies.Output('tabla-aep', 'data'),
+    [dash.dependencies.Input('curva-potencia', 'data')],
+    [dash.dependencies.State('selector-sitio', 'value')]
+)
+def update_aep(curva, sitio):
+    if not curva:
+        return []
+    try:
+        return energia_anual(sitio, version_sitio(sitio), curva['huella'])
+    except KeyError:
+        return []
+
+
+# Correlación y multicolinealidad entre canales para la selección de variables: matrices de Pearson y Spearman
+# con los registros completos de cada par, VIF y correlación cruzada con desfase respecto a un canal de
+# referencia, todo con productos matriciales y FFT sobre la matriz (registros x canales). Las direcciones entran
+# como sus componentes seno y coseno. Los resultados se guardan en la caché en disco compartida por versión del
+# dataset y ventana de tiempo, así que cada ventana se calcula una sola vez en cualquier worker.
+UMBRAL_REDUNDANCIA = 0.9  # |r| de Pearson a partir del cual dos canales se consideran redundantes
+MAX_DESFASE_HORAS = 24
+FILAS_BLOQUE_CORRELACION = 1 << 18
+BLOQUE_DESFASES = 4096
+MIN_AUTOVALOR_VIF = 1e-6
+REFERENCIA_DESFASE = 'WindSpeed100m_1'
+direcciones_correlacion = [col_direccion for _, col_direccion, _ in alturas_rosa]
+metodos_correlacion = {'pearson': 'Pearson', 'spearman': 'Spearman'}
+columnas_redundancia = ['Canal A', 'Canal B', 'Pearson', 'Spearman', 'Registros comunes', 'VIF A', 'VIF B', 'Redundante', 'Sugerencia']
+
+
+def canales_correlacion(sitio, inicio=None, fin=None):
+    # Matriz (registros x canales) de la ventana pedida; se descartan los canales sin variación o casi sin datos
+    df = datos_sitio(sitio)
+    fechas = df.index.to_numpy()
+    mascara = ~np.isnat(fechas)
+    if inicio is not None:
+        mascara &= fechas >= np.datetime64(inicio)
+    if fin is not None:
+        mascara &= fechas <= np.datetime64(fin)
+    numericas = list(df.select_dtypes('number').columns)
+    nombres = [nombre for columna in numericas for nombre in
+               ([f'{columna} (sen)', f'{columna} (cos)'] if columna in direcciones_correlacion else [columna])]
+    matriz = np.empty((int(mascara.sum()), len(nombres)))
+    j = 0
+    for columna in numericas:
+        valores = df[columna].to_numpy()[mascara]
+        if columna in direcciones_correlacion:
+            radianes = np.deg2rad(valores, dtype=float)
+            matriz[:, j], matriz[:, j + 1] = np.sin(radianes), np.cos(radianes)
+            j += 2
+        else:
+            matriz[:, j] = valores
+            j += 1
+    # fmax/fmin ignoran los NaN; un canal sin datos queda con rango -inf y se descarta
+    rango = np.fmax.reduce(matriz, axis=0, initial=-np.inf) - np.fmin.reduce(matriz, axis=0, initial=np.inf)
+    utiles = ((~np.isnan(matriz)).sum(axis=0) >= 3) & (rango > 0)
+    return [nombre for nombre, util in zip(nombres, utiles) if util], matriz[:, utiles], fechas[mascara]
+
+
+def correlacion_pares(matriz):
+    # Pearson con los registros completos de cada par (pairwise): con los huecos en cero y la máscara m de datos,
+    # n = mᵀm, Σx = xᵀm, Σx² = (x²)ᵀm y Σxy = xᵀx dan a la vez las sumas de todos los pares. Se centra cada
+    # canal en su media antes de sumar y se acumula por bloques de filas para acotar la memoria.
+    p = matriz.shape[1]
+    medias = np.nanmean(matriz, axis=0) if len(matriz) else np.zeros(p)
+    n, sx, sxx, sxy = (np.zeros((p, p)) for _ in range(4))
+    for inicio in range(0, len(matriz), FILAS_BLOQUE_CORRELACION):
+        bloque = matriz[inicio:inicio + FILAS_BLOQUE_CORRELACION] - medias
+        m = (~np.isnan(bloque)).astype(float)
+        x = np.nan_to_num(bloque)
+        n += m.T @ m
+        sx += x.T @ m
+        sxx += (x ** 2).T @ m
+        sxy += x.T @ x
+    with np.errstate(divide='ignore', invalid='ignore'):
+        covarianza = sxy - sx * sx.T / n
+        varianza = sxx - sx ** 2 / n
+        r = covarianza / np.sqrt(varianza * varianza.T)
+    r = np.where(n >= 3, np.clip(r, -1, 1), np.nan)
+    np.fill_diagonal(r, 1.0)
+    return r, n.astype(np.int64)
+
+
+def rangos(matriz):
+    # Rangos promedio por canal (los empates reciben la media de sus posiciones y los NaN se conservan).
+    # Spearman se calcula como Pearson sobre los rangos de cada canal completo: coincide con el re-rankeo
+    # por par cuando los dos canales comparten los huecos.
+    resultado = np.full(matriz.shape, np.nan)
+    for j in range(matriz.shape[1]):
+        validos = np.flatnonzero(~np.isnan(matriz[:, j]))
+        valores = matriz[validos, j]
+        orden = np.argsort(valores)
+        ordenados = valores[orden]
+        nuevo = np.r_[True, ordenados[1:] != ordenados[:-1]]
+        primeros = np.flatnonzero(nuevo)
+        ultimos = np.r_[primeros[1:], len(ordenados)] - 1
+        posiciones = np.empty(len(valores))
+        posiciones[orden] = ((primeros + ultimos) / 2 + 1)[np.cumsum(nuevo) - 1]
+        resultado[validos, j] = posiciones
+    return resultado
+
+
+def factores_vif(r):
+    # VIF_i = (R⁻¹)_ii sobre la matriz de correlación, por descomposición espectral. Con correlaciones por pares
+    # R puede no ser semidefinida positiva, y con sensores gemelos es casi singular: los autovalores se acotan
+    # por abajo para que los VIF salgan grandes y finitos en lugar de negativos o infinitos. Los pares sin
+    # datos comunes se toman como no correlacionados.
+    autovalores, autovectores = np.linalg.eigh(np.nan_to_num(r))
+    autovalores = np.maximum(autovalores, MIN_AUTOVALOR_VIF)
+    return np.maximum((autovectores ** 2) @ (1 / autovalores), 1.0)
+
+
+def correlacion_desfasada(matriz, referencia, max_desfase):
+    # Pearson entre la referencia y_t y cada canal x_{t+k} para k en [-max_desfase, max_desfase], con los registros
+    # completos de cada desfase. Las sumas por par (n, Σx, Σy, Σx², Σy², Σxy) son correlaciones cruzadas de los
+    # valores y las máscaras, calculadas por FFT en bloques de BLOQUE_DESFASES registros (overlap-save): cada
+    # bloque de la referencia se cruza con el tramo del canal que lo cubre con max_desfase de margen, las FFT de
+    # todos los bloques salen en un solo llamado y los productos se suman en el dominio de la frecuencia.
+    # k > 0 significa que el canal va detrás de la referencia.
+    from scipy.fft import next_fast_len
+    from numpy.lib.stride_tricks import sliding_window_view
+    n_filas = len(matriz)
+    max_desfase = min(max_desfase, max(n_filas - 1, 0))
+    n_bloques = max(-(-n_filas // BLOQUE_DESFASES), 1)
+    tam = next_fast_len(BLOQUE_DESFASES + 2 * max_desfase, real=True)
+    desfases = np.arange(-max_desfase, max_desfase + 1)
+
+    def series(valores):
+        validos = ~np.isnan(valores)
+        x = np.where(validos, valores - np.nanmean(valores), 0.0)
+        return validos.astype(float), x, x ** 2
+
+    def bloques_referencia(serie):
+        relleno = np.zeros(n_bloques * BLOQUE_DESFASES)
+        relleno[:n_filas] = serie
+        return np.fft.rfft(relleno.reshape(n_bloques, BLOQUE_DESFASES), tam, axis=1)
+
+    def tramos_canal(serie):
+        relleno = np.zeros(n_bloques * BLOQUE_DESFASES + tam)
+        relleno[max_desfase:max_desfase + n_filas] = serie
+        return np.fft.rfft(sliding_window_view(relleno, tam)[::BLOQUE_DESFASES][:n_bloques], axis=1)
+
+    def correlacion(f_y, f_x):
+        return np.fft.irfft((np.conj(f_y) * f_x).sum(axis=0), tam)[desfases + max_desfase]
+
+    m_y, y, yy = (bloques_referencia(serie) for serie in series(matriz[:, referencia]))
+    resultado = np.empty((matriz.shape[1], len(desfases)))
+    for j in range(matriz.shape[1]):
+        m_x, x, xx = (tramos_canal(serie) for serie in series(matriz[:, j]))
+        n = np.rint(correlacion(m_y, m_x))
+        sx, sy = correlacion(m_y, x), correlacion(y, m_x)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            covarianza = correlacion(y, x) - sx * sy / n
+            varianzas = (correlacion(yy, m_x) - sy ** 2 / n) * (correlacion(m_y, xx) - sx ** 2 / n)
+            resultado[j] = np.where(n >= 3, covarianza / np.sqrt(varianzas), np.nan)
+    return desfases, np.clip(resultado, -1, 1)
+
+
+def desfases_maximos(fechas):
+    # Registros que caben en MAX_DESFASE_HORAS según el paso típico de la serie (10 minutos en eda.xlsx)
+    pasos = np.diff(fechas).astype('timedelta64[s]').astype(float)
+    paso = np.median(pasos[pasos > 0]) if (pasos > 0).any() else 600.0
+    return int(MAX_DESFASE_HORAS * 3600 // paso), paso
+
+
+def ventana_correlacion(inicio, fin):
+    # Las fechas del selector son días: el fin incluye el día completo
+    return (pd.Timestamp(inicio) if inicio else None,
+            pd.Timestamp(fin) + pd.Timedelta(days=1) - pd.Timedelta(1, 'ns') if fin else None)
+
+
+@functools.lru_cache(maxsize=16)
+def analisis_correlacion(sitio, version, inicio=None, fin=None):
+    clave = f'correlacion-{version}-{inicio}-{fin}'
+    resultado = cache_trabajos.get(clave)
+    if resultado is None:
+        nombres, matriz, fechas = canales_correlacion(sitio, *ventana_correlacion(inicio, fin))
+        pearson, pares = correlacion_pares(matriz)
+        spearman, _ = correlacion_pares(rangos(matriz))
+        max_desfase, paso = desfases_maximos(fechas)
+        resultado = {
+            'canales': nombres, 'pearson': pearson, 'spearman': spearman, 'pares': pares,
+            'validos': (~np.isnan(matriz)).sum(axis=0), 'vif': factores_vif(pearson),
+            'max_desfase': max_desfase, 'paso_s': paso, 'registros': len(matriz),
+        }
+        cache_trabajos.set(clave, resultado, expire=24 * 3600)
+    return resultado
+
+
+@functools.lru_cache(maxsize=16)
+def analisis_desfases(sitio, version, referencia, inicio=None, fin=None):
+    clave = f'desfases-{version}-{referencia}-{inicio}-{fin}'
+    resultado = cache_trabajos.get(clave)
+    if resultado is None:
+        nombres, matriz, fechas = canales_correlacion(sitio, *ventana_correlacion(inicio, fin))
+        max_desfase, paso = desfases_maximos(fechas)
+        desfases, r = correlacion_desfasada(matriz, nombres.index(referencia), max_desfase)
+        resultado = {'canales': nombres, 'horas': desfases * paso / 3600, 'r': r}
+        cache_trabajos.set(clave, resultado, expire=24 * 3600)
+    return resultado
+
+
+def grupos_redundantes(analisis):
+    # Une los canales con |r| >= UMBRAL_REDUNDANCIA (componentes conexas) y en cada grupo conserva el canal con
+    # más registros válidos (a igualdad, el de menor VIF); los demás se sugieren para descartar
+    canales, r = analisis['canales'], np.abs(np.nan_to_num(analisis['pearson']))
+    grupo = list(range(len(canales)))
+
+    def raiz(i):
+        while grupo[i] != i:
+            grupo[i] = grupo[grupo[i]]
+            i = grupo[i]
+        return i
+
+    for i, j in zip(*np.nonzero(np.triu(r >= UMBRAL_REDUNDANCIA, k=1))):
+        grupo[raiz(i)] = raiz(j)
+    miembros = collections.defaultdict(list)
+    for i in range(len(canales)):
+        miembros[raiz(i)].append(i)
+    conservado = {}
+    for indices in miembros.values():
+        elegido = min(indices, key=lambda i: (-analisis['validos'][i], analisis['vif'][i]))
+        for i in indices:
+            conservado[i] = elegido
+    return conservado
+
+
+@functools.lru_cache(maxsize=16)
+def tabla_redundancia(sitio, version, inicio=None, fin=None):
+    # Pares de canales ordenados por |r| de Pearson, solo los que superan la mitad del umbral
+    analisis = analisis_correlacion(sitio, version, inicio, fin)
+    canales, pearson, spearman, vif = analisis['canales'], analisis['pearson'], analisis['spearman'], analisis['vif']
+    conservado = grupos_redundantes(analisis)
+    i, j = np.nonzero(np.triu(np.abs(np.nan_to_num(pearson)) >= UMBRAL_REDUNDANCIA / 2, k=1))
+    orden = np.argsort(-np.abs(pearson[i, j]), kind='stable')
+    filas = []
+    for a, b in zip(i[orden], j[orden]):
+        redundante = abs(pearson[a, b]) >= UMBRAL_REDUNDANCIA
+        descartar = next((canales[k] for k in (a, b) if conservado[k] != k), '') if redundante else ''
+        filas.append({
+            'Canal A': canales[a],
+            'Canal B': canales[b],
+            'Pearson': round(float(pearson[a, b]), 4),
+            'Spearman': round(float(spearman[a, b]), 4),
+            'Registros comunes': int(analisis['pares'][a, b]),
+            'VIF A': round(float(vif[a]), 1),
+            'VIF B': round(float(vif[b]), 1),
+            'Redundante': 'Sí' if redundante else 'No',
+            'Sugerencia': f'Descartar {descartar}' if descartar else '',
+        })
+    return pd.DataFrame(filas, columns=columnas_redundancia)
+
+
+@functools.lru_cache(maxsize=16)
+def tabla_vif(sitio, version, inicio=None, fin=None):
+    analisis = analisis_correlacion(sitio, version, inicio, fin)
+    canales = analisis['canales']
+    conservado = grupos_redundantes(analisis)
+    tabla = pd.DataFrame({
+        'Canal': canales,
+        'VIF': np.round(analisis['vif'], 1),
+        'Registros válidos': analisis['validos'],
+        'Sugerencia': ['Conservar' if conservado[i] == i else f'Descartar (se conserva {canales[conservado[i]]})'
+                       for i in range(len(canales))],
+    })
+    return tabla.sort_values('VIF', ascending=False, kind='stable')
+
+
+
+@memoizar_figura
+def create_correlation_figure(sitio, metodo='pearson', inicio=None, fin=None):
+    analisis = analisis_correlacion(sitio, version_sitio(sitio), inicio, fin)
+    canales = analisis['canales']
+    fig = go.Figure(go.Heatmap(
+        z=analisis[metodo], x=canales, y=canales, zmin=-1, zmax=1, colorscale='RdBu_r',
+        texttemplate='%{z:.2f}', textfont=dict(size=9), colorbar=dict(title='r'),
+        customdata=analisis['pares'], hovertemplate='%{y} / %{x}<br>r = %{z:.4f}<br>Registros comunes: %{customdata}<extra></extra>',
+    ))
+    fig.update_layout(title=f"Correlación de {metodos_correlacion[metodo]} ({analisis['registros']} registros)",
+                      height=max(500, 28 * len(canales) + 200), width=1200, yaxis=dict(autorange='reversed'))
+    return fig
+
+
+@memoizar_figura
+def create_lag_figure(sitio, referencia=REFERENCIA_DESFASE, inicio=None, fin=None):
+    desfases = analisis_desfases(sitio, version_sitio(sitio), referencia, inicio, fin)
+    fig = go.Figure(go.Heatmap(
+        z=desfases['r'], x=desfases['horas'], y=desfases['canales'], zmin=-1, zmax=1, colorscale='RdBu_r', colorbar=dict(title='r'),
+        hovertemplate='%{y}<br>Desfase: %{x:.2f} h<br>r = %{z:.4f}<extra></extra>',
+    ))
+    fig.add_vline(x=0, line=dict(color='gray', dash='dot'))
+    fig.update_xaxes(title_text=f'Desfase respecto a {referencia} (h)')
+    fig.update_layout(title=f'Correlación cruzada con {referencia}', height=max(450, 28 * len(desfases['canales']) + 150),
+                      width=1200, yaxis=dict(autorange='reversed'))
+    return fig
+
+
+@app.callback(
+    [dash.dependencies.Output('correlacion-graph', 'figure'),
+     dash.dependencies.Output('desfases-graph', 'figure'),
+     dash.dependencies.Output('tabla-redundancia', 'data'),
+     dash.dependencies.Output('tabla-vif', 'data')],
+    [dash.dependencies.Input('rango-correlacion', 'start_date'),
+     dash.dependencies.Input('rango-correlacion', 'end_date'),
+     dash.dependencies.Input('metodo-correlacion', 'value'),
+     dash.dependencies.Input('referencia-desfase', 'value')],
+    [dash.dependencies.State('selector-sitio', 'value')],
+    prevent_initial_call=True
+)
+def update_correlation(inicio, fin, metodo, referencia, sitio):
+    version = version_sitio(sitio)
+    return (create_correlation_figure(sitio, metodo, inicio, fin),
+            create_lag_figure(sitio, referencia, inicio, fin),
+            tabla_redundancia(sitio, version, inicio, fin).to_dict('records'),
+            tabla_vif(sitio, version, inicio, fin).to_dict('records'))
+
+
+# Explorador de datos crudos: filtros y orden se resuelven en el servidor con operaciones vectorizadas
+# sobre las columnas y un índice de orden (argsort) por columna que se calcula una vez por versión.
+operadores_filtro = [['ge ', '>='], ['le ', '<='], ['lt ', '<'], ['gt ', '>'], ['ne ', '!='], ['eq ', '='], ['contains '], ['datestartswith ']]
+
+
+def separar_filtro(parte):
+    # Traduce una condición de filter_query de la DataTable a (columna, operador, valor)
+    for grupo in operadores_filtro:
+        for operador in grupo:
+            if operador in parte:
+                nombre, valor = parte.split(operador, 1)
+                nombre = nombre[nombre.find('{') + 1: nombre.rfind('}')]
+                valor = valor.strip()
+                delimitador = valor[0] if valor else ''
+                if delimitador in ("'", '"', '`') and valor[-1] == delimitador:
+                    valor = valor[1:-1].replace('\\' + delimitador, delimitador)
+                return nombre, grupo[0].strip(), valor
+    return None, None, None
+
+
+def texto_tabla(valores):
+    # Valores numéricos tal como se muestran en la tabla: redondeados a 3 decimales y sin ceros finales
+    texto = np.char.mod('%.3f', np.round(valores.astype(float), 3))
+    texto = np.char.rstrip(np.char.rstrip(texto, '0'), '.')
+    return np.where(np.isnan(valores), '', texto)
+
+
+def mascara_filtro(df, filter_query):
+    mascara = np.ones(len(df), dtype=bool)
+    for parte in filter_query.split(' && ') if filter_query else []:
+        columna, operador, valor = separar_filtro(parte)
+        try:
+            if columna == 'Fecha':
+                fechas = df.index
+                if operador in ('datestartswith', 'contains', 'eq'):
+                    # '2022', '2022-03' o '2022-03-15' equivalen a todo ese periodo
+                    periodo = pd.Period(valor)
+                    mascara &= (fechas >= periodo.start_time) & (fechas <= periodo.end_time)
+                    continue
+                x, valor = fechas, pd.Timestamp(valor)
+            elif columna in df.columns and pd.api.types.is_numeric_dtype(df[columna]):
+                x = df[columna].to_numpy()
+                if operador in ('contains', 'datestartswith'):
+                    # Prefijo del valor mostrado: '12.3' encuentra 12.3, 12.31, 12.345...
+                    mascara &= np.char.startswith(texto_tabla(x), valor)
+                    continue
+                valor = float(valor)
+                if operador in ('eq', 'ne'):
+                    # La igualdad se evalúa sobre el valor mostrado (3 decimales), no sobre la precisión completa
+                    x, valor = np.round(x.astype(float), 3), round(valor, 3)
+            elif columna in df.columns:
+                x, valor = df[columna].to_numpy(), float(valor)
+            else:
+                continue
+        except (ValueError, TypeError):
+            continue  # Condición incompleta o con un valor que no corresponde a la columna: se ignora
+        if operador == 'ge':
+            mascara &= x >= valor
+        elif operador == 'le':
+            mascara &= x <= valor
+        elif operador == 'lt':
+            mascara &= x < valor
+        elif operador == 'gt':
+            mascara &= x > valor
+        elif operador in ('eq', 'contains', 'datestartswith'):
+            mascara &= x == valor
+        elif operador == 'ne':
+            mascara &= x != valor
+    return mascara
+
+
+@functools.lru_cache(maxsize=32)
+def orden_columna(sitio, columna, descendente, version):
+    df = datos_sitio(sitio)
+    valores = df.index.to_numpy() if columna == 'Fecha' else df[columna].to_numpy()
+    if not descendente:
+        return np.argsort(valores, kind='stable')  # Los NaN/NaT quedan al final
+    # Descendente estable: se ordena la columna invertida y se invierte el resultado, así los empates conservan
+    # el orden original de las filas. Los NaN/NaT quedan al principio y se pasan al final.
+    orden = len(valores) - 1 - np.argsort(valores[::-1], kind='stable')[::-1]
+    faltantes = int(np.count_nonzero(pd.isna(valores)))
+    return np.concatenate([orden[faltantes:], orden[:faltantes]])
+
+
+@functools.lru_cache(maxsize=16)
+def filas_consulta(sitio, filter_query, orden, version):
+    # Posiciones de las filas que cumplen el filtro, en el orden pedido; cambiar de página no recalcula nada
+    mascara = mascara_filtro(datos_sitio(sitio), filter_query)
+    if not orden:
+        return np.flatnonzero(mascara)
+    columna, direccion = orden[0]
+    indices = orden_columna(sitio, columna, direccion == 'desc', version)
+    return indices[mascara[indices]]
+
+
+@app.callback(
+    [dash.dependencies.Output('tabla-crudos', 'data'),
+     dash.dependencies.Output('tabla-crudos', 'page_count')],
+    [dash.dependencies.Input('tabla-crudos', 'page_current'),
+     dash.dependencies.Input('tabla-crudos', 'page_size'),
+     dash.dependencies.Input('tabla-crudos', 'sort_by'),
+     dash.dependencies.Input('tabla-crudos', 'filter_query')],
+    [dash.dependencies.State('selector-sitio', 'value')]
+)
+def update_raw_table(page_current, page_size, sort_by, filter_query, sitio):
+    orden = tuple((criterio['column_id'], criterio['direction']) for criterio in sort_by or [])
+    posiciones = filas_consulta(sitio, filter_query or '', orden, version_sitio(sitio))
+    pagina = datos_sitio(sitio).iloc[posiciones[page_current * page_size:(page_current + 1) * page_size]]
+    # Solo se redondean las columnas numéricas (en float64, para que float32 no deje decimales espurios en el
+    # JSON); las categóricas y de texto se envían tal cual
+    numericas = pagina.select_dtypes('number')
+    pagina = pagina.assign(**{col: numericas[col].astype(float).round(3) for col in numericas.columns})
+    pagina.index = pagina.index.strftime('%Y-%m-%d %H:%M')
+    return pagina.reset_index().to_dict('records'), max(1, -(-len(posiciones) // page_size))
+
+
+# Datos de los modelos (modelos.xlsx): se leen una sola vez, desde el almacén columnar, al abrir la página
+HORIZONTE_MODELOS = 6  # pasos de 10 minutos: predicción a una hora
+variables_meteorologicas_modelos = ['Presion', 'humedad', 'temperatura 100m', 'temperatura 21 m']
+
+
+@functools.lru_cache(maxsize=1)
+def datos_modelos():
+    return cargar_datos('modelos.xlsx', preparar=_preparar_eda)
+
+
+def matriz_modelo(tabla, objetivo):
+    # Predictores: variables meteorológicas, dirección a 100 m (seno/coseno) y la velocidad de una hora antes
+    direccion = np.radians(tabla['WindDirection100'].to_numpy(dtype=float))
+    X = np.column_stack([
+        tabla[variables_meteorologicas_modelos].to_numpy(dtype=float),
+        np.sin(direccion), np.cos(direccion),
+        tabla[objetivo].shift(HORIZONTE_MODELOS).to_numpy(dtype=float),
+    ])
+    y = tabla[objetivo].to_numpy(dtype=float)
+    validos = ~np.isnan(X).any(axis=1) & ~np.isnan(y)
+    return X[validos], y[validos], tabla['Fecha'].to_numpy()[validos]
+
+
+@functools.lru_cache(maxsize=8)
+def prediccion_lineal(objetivo):
+    X, y, fechas = matriz_modelo(datos_modelos(), objetivo)
+    n = int(len(y) * 0.8)  # El 20 % final queda como tramo de prueba
+    A = np.column_stack([np.ones(len(X)), X])
+    coeficientes = np.linalg.lstsq(A[:n], y[:n], rcond=None)[0]
+    return fechas[n:], y[n:], A[n:] @ coeficientes
+
+
+@memoizar_figura
+def create_prediction_figure(objetivo):
+    fechas, reales, predichos = prediccion_lineal(objetivo)
+    fig = make_subplots(rows=1, cols=2, column_widths=[0.7, 0.3],
+                        subplot_titles=['Serie real vs. predicha (tramo de prueba)', 'Predicho vs. real'])
+    indices = indices_lttb(fechas.astype('int64'), reales, MAX_PUNTOS_SERIE)
+    fig.add_trace(go.Scatter(x=fechas[indices], y=reales[indices], mode='lines', name='Real', line=dict(color='#004F6D')), row=1, col=1)
+    fig.add_trace(go.Scatter(x=fechas[indices], y=predichos[indices], mode='lines', name='Predicho', line=dict(color='#FF7F0E')), row=1, col=1)
+    fig.add_trace(go.Scattergl(x=reales, y=predichos, mode='markers', marker=dict(size=3, color='#4682B4', opacity=0.4), showlegend=False), row=1, col=2)
+    limites = [float(np.nanmin(reales)), float(np.nanmax(reales))]
+    fig.add_trace(go.Scatter(x=limites, y=limites, mode='lines', line=dict(color='black', dash='dash'), showlegend=False), row=1, col=2)
+    fig.update_xaxes(title_text='Real (m/s)', row=1, col=2)
+    fig.update_yaxes(title_text='Predicho (m/s)', row=1, col=2)
+    fig.update_layout(height=500, legend=dict(x=0, y=1.15, orientation='h'))
+    return fig
+
+
+# Diagnóstico de series (residuos de los modelos y velocidad observada): autocorrelación por FFT en O(n log n),
+# autocorrelación parcial con la recursión de Durbin-Levinson sobre la ACF, Ljung-Box para todos los rezagos
+# con una suma acumulada y pruebas de normalidad (Jarque-Bera y D'Agostino-Pearson). Los resultados se guardan
+# en la caché en disco compartida por huella (SHA-256) de los valores de la serie, así que una misma serie se
+# analiza una sola vez en cualquier worker.
+MAX_REZAGO_DIAGNOSTICO = 144  # 24 horas de registros a 10 minutos
+rezagos_ljung_box = [6, 36, 144]
+series_diagnostico = {'residuos': 'Residuos del modelo lineal (tramo de prueba)', 'viento': 'Velocidad del viento observada'}
+
+
+def autocorrelacion_fft(valores, max_rezago):
+    # ACF sesgada (dividida por n) de la serie centrada; los NaN cuentan como cero y n es el número de datos
+    # válidos. Con relleno de ceros hasta n + max_rezago la correlación circular no se solapa consigo misma.
+    from scipy.fft import next_fast_len
+    validos = ~np.isnan(valores)
+    n = int(validos.sum())
+    x = np.where(validos, valores - np.nanmean(valores), 0.0)
+    max_rezago = min(max_rezago, max(len(x) - 1, 0))
+    tam = next_fast_len(len(x) + max_rezago, real=True)
+    espectro = np.fft.rfft(x, tam)
+    autocovarianza = np.fft.irfft(espectro * np.conj(espectro), tam)[:max_rezago + 1] / n
+    return autocovarianza / autocovarianza[0], n
+
+
+def pacf_durbin_levinson(acf):
+    # Coeficiente phi_kk de cada orden k, actualizando los coeficientes AR del orden anterior
+    pacf = np.ones(len(acf))
+    phi = np.zeros(0)
+    varianza = 1.0
+    for k in range(1, len(acf)):
+        phi_kk = (acf[k] - phi @ acf[k - 1:0:-1]) / varianza
+        phi = np.r_[phi - phi_kk * phi[::-1], phi_kk]
+        varianza *= 1 - phi_kk ** 2
+        pacf[k] = phi_kk
+    return pacf
+
+
+def ljung_box(acf, n):
+    # Q(h) = n (n + 2) Σ_{k<=h} ρ_k² / (n - k) para todos los h a la vez, con su p-valor chi² de h grados de libertad
+    from scipy.stats import chi2
+    rezagos = np.arange(1, len(acf))
+    q = n * (n + 2) * np.cumsum(acf[1:] ** 2 / (n - rezagos))
+    return q, chi2.sf(q, rezagos)
+
+
+def pruebas_normalidad(valores):
+    from scipy.stats import chi2, normaltest
+    x = valores[~np.isnan(valores)]
+    z = x - x.mean()
+    m2 = np.mean(z ** 2)
+    asimetria = np.mean(z ** 3) / m2 ** 1.5
+    curtosis = np.mean(z ** 4) / m2 ** 2 - 3
+    jarque_bera = len(x) / 6 * (asimetria ** 2 + curtosis ** 2 / 4)
+    dagostino, p_dagostino = normaltest(x) if len(x) >= 8 else (np.nan, np.nan)
+    return {
+        'n': len(x), 'media': x.mean(), 'desviacion': np.sqrt(m2), 'asimetria': asimetria, 'curtosis': curtosis,
+        'jarque_bera': jarque_bera, 'p_jarque_bera': chi2.sf(jarque_bera, 2),
+        'dagostino': float(dagostino), 'p_dagostino': float(p_dagostino),
+    }
+
+
+def calcular_diagnostico(valores, max_rezago):
+    from scipy.stats import norm
+    acf, n = autocorrelacion_fft(valores, max_rezago)
+    q, p_valor = ljung_box(acf, n)
+    # Bandas de confianza del 95 %: fórmula de Bartlett para la ACF y ±1.96/√n para la PACF
+    banda_acf = 1.96 * np.sqrt(np.r_[0, 1, 1 + 2 * np.cumsum(acf[1:-1] ** 2)] / n)
+    # Gráfico QQ de los valores estandarizados contra los cuantiles normales, con a lo sumo MAX_PUNTOS_SERIE puntos
+    ordenados = np.sort(valores[~np.isnan(valores)])
+    muestra = np.unique(np.linspace(0, len(ordenados) - 1, min(len(ordenados), MAX_PUNTOS_SERIE)).astype(int))
+    return {
+        'acf': acf, 'pacf': pacf_durbin_levinson(acf), 'banda_acf': banda_acf, 'banda_pacf': 1.96 / np.sqrt(n),
+        'ljung_box': q, 'p_ljung_box': p_valor, 'normalidad': pruebas_normalidad(valores),
+        'qq_teoricos': norm.ppf((muestra + 0.5) / len(ordenados)),
+        'qq_muestrales': (ordenados[muestra] - ordenados.mean()) / ordenados.std(),
+    }
+
+
+def diagnostico_serie(valores, max_rezago=MAX_REZAGO_DIAGNOSTICO):
+    valores = np.ascontiguousarray(valores, dtype=float)
+    clave = f'diagnostico-{hashlib.sha256(valores.tobytes()).hexdigest()[:16]}-{max_rezago}'
+    resultado = cache_trabajos.get(clave)
+    if resultado is None:
+        resultado = calcular_diagnostico(valores, max_rezago)
+        cache_trabajos.set(clave, resultado, expire=24 * 3600)
+    return resultado
+
+
+def serie_modelo(objetivo, serie):
+    if serie == 'residuos':
+        _, reales, predichos = prediccion_lineal(objetivo)
+        return reales - predichos
+    return datos_modelos()[objetivo].to_numpy(dtype=float)
+
+
+def resumen_diagnostico(objetivo, serie):
+    diagnostico = diagnostico_serie(serie_modelo(objetivo, serie))
+    normalidad = diagnostico['normalidad']
+    filas = [('Registros', normalidad['n']), ('Media', normalidad['media']), ('Desviación estándar', normalidad['desviacion']),
+             ('Asimetría', normalidad['asimetria']), ('Curtosis (exceso)', normalidad['curtosis']),
+             ('Jarque-Bera', normalidad['jarque_bera']), ('Jarque-Bera p-value', normalidad['p_jarque_bera']),
+             ("D'Agostino-Pearson", normalidad['dagostino']), ("D'Agostino-Pearson p-value", normalidad['p_dagostino'])]
+    for rezago in rezagos_ljung_box:
+        if rezago <= len(diagnostico['ljung_box']):
+            filas += [(f'Ljung-Box Q ({rezago} rezagos)', diagnostico['ljung_box'][rezago - 1]),
+                      (f'Ljung-Box p-value ({rezago} rezagos)', diagnostico['p_ljung_box'][rezago - 1])]
+    return pd.DataFrame({'Indicador': [nombre for nombre, _ in filas], 'Valor': [f'{float(valor):.6g}' for _, valor in filas]})
+
+
+@memoizar_figura
+def create_diagnostics_figure(objetivo, serie='residuos'):
+    diagnostico = diagnostico_serie(serie_modelo(objetivo, serie))
+    rezagos = np.arange(len(diagnostico['acf']))
+    horas = rezagos / 6  # un rezago = 10 minutos
+    fig = make_subplots(rows=2, cols=2, subplot_titles=[
+        'Autocorrelación (ACF)', 'Autocorrelación parcial (PACF)', 'Ljung-Box: p-valor por rezago', 'Gráfico QQ normal'
+    ])
+    for col, (nombre, valores, banda) in enumerate([('ACF', diagnostico['acf'], diagnostico['banda_acf']),
+                                                    ('PACF', diagnostico['pacf'], np.full(len(rezagos), diagnostico['banda_pacf']))], start=1):
+        fig.add_trace(go.Scatter(x=rezagos, y=banda, mode='lines', line=dict(width=0), showlegend=False, hoverinfo='skip'), row=1, col=col)
+        fig.add_trace(go.Scatter(x=rezagos, y=-banda, mode='lines', line=dict(width=0), fill='tonexty', fillcolor='rgba(0, 79, 109, 0.15)',
+                                 showlegend=False, hoverinfo='skip'), row=1, col=col)
+        fig.add_trace(go.Bar(x=rezagos, y=valores, name=nombre, marker=dict(color='#004F6D'), customdata=horas,
+                             hovertemplate='Rezago %{x} (%{customdata:.2f} h)<br>%{y:.4f}<extra>' + nombre + '</extra>'), row=1, col=col)
+        fig.update_xaxes(title_text='Rezago (10 min)', row=1, col=col)
+
+    fig.add_trace(go.Scatter(x=rezagos[1:], y=diagnostico['p_ljung_box'], mode='lines+markers', name='p-valor Ljung-Box',
+                             marker=dict(size=3), line=dict(color='#4682B4')), row=2, col=1)
+    fig.add_hline(y=0.05, line=dict(color='gray', dash='dot'), row=2, col=1)
+    fig.update_yaxes(type='log', title_text='p-valor', row=2, col=1)
+    fig.update_xaxes(title_text='Rezagos incluidos', row=2, col=1)
+
+    teoricos = diagnostico['qq_teoricos']
+    fig.add_trace(go.Scattergl(x=teoricos, y=diagnostico['qq_muestrales'], mode='markers', name='Cuantiles',
+                               marker=dict(size=4, color='#4682B4')), row=2, col=2)
+    limites = [float(teoricos.min()), float(teoricos.max())] if len(teoricos) else [0, 0]
+    fig.add_trace(go.Scatter(x=limites, y=limites, mode='lines', line=dict(color='black', dash='dash'), showlegend=False), row=2, col=2)
+    fig.update_xaxes(title_text='Cuantil normal teórico', row=2, col=2)
+    fig.update_yaxes(title_text='Cuantil muestral (estandarizado)', row=2, col=2)
+    fig.update_layout(height=800, showlegend=False, title=series_diagnostico[serie])
+    return fig
+
+
+@app.callback(
+    [dash.dependencies.Output('diagnostico-graph', 'figure'),
+     dash.dependencies.Output('tabla-diagnostico', 'data')],
+    [dash.dependencies.Input('serie-diagnostico', 'value')],
+    [dash.dependencies.State('tabs-modelos', 'value')],
+    prevent_initial_call=True
+)
+def update_diagnostics(serie, tab):
+    _, objetivo = modelos_objetivos[tab]
+    return create_diagnostics_figure(objetivo, serie), resumen_diagnostico(objetivo, serie).to_dict('records')
+
+
+# Backtesting: entrena los cuatro regresores para cada sensor objetivo con validación de origen móvil
+# (cada pliegue entrena con todo lo anterior a su bloque de prueba). La grilla pliegue x modelo x objetivo
+# corre en un pool de procesos y cada combinación se guarda en disco según la huella de modelos.xlsx,
+# así que al reentrenar solo se calculan las combinaciones que faltan.
+N_PLIEGUES = 5
+FRACCION_PRUEBA = 0.2
+
+
+def crear_estimador(modelo):
+    from sklearn.linear_model import Lasso, LinearRegression, Ridge
+    from sklearn.neighbors import KNeighborsRegressor
+    from sklearn.pipeline import make_pipeline
+    from sklearn.preprocessing import StandardScaler
+
+    if modelo == 'Regresión K-NN':
+        return make_pipeline(StandardScaler(), KNeighborsRegressor(n_neighbors=10))
+    elif modelo == 'Regresión Lasso':
+        return make_pipeline(StandardScaler(), Lasso(alpha=0.01))
+    elif modelo == 'Regresión Lineal':
+        return LinearRegression()
+    elif modelo == 'Regresión Ridge':
+        return make_pipeline(StandardScaler(), Ridge(alpha=1.0))
+    raise ValueError(f'Modelo desconocido: {modelo}')
+
+
+def pliegues_origen_movil(n, n_pliegues=N_PLIEGUES, fraccion_prueba=FRACCION_PRUEBA):
+    # El tramo final se divide en bloques consecutivos; el pliegue i entrena con [0, inicio_i) y prueba en [inicio_i, fin_i)
+    bordes = np.linspace(int(n * (1 - fraccion_prueba)), n, n_pliegues + 1).astype(int)
+    return list(zip(bordes[:-1], bordes[1:]))
+
+
+def metricas_regresion(reales, predichos):
+    residuos = reales - predichos
+    acf, n = autocorrelacion_fft(residuos, 10)
+    return {
+        'MAPE': float(np.mean(np.abs(residuos / reales)) * 100),
+        'RMSE': float(np.sqrt(np.mean(residuos ** 2))),
+        'R^2': float(1 - np.sum(residuos ** 2) / np.sum((reales - reales.mean()) ** 2)),
+        'Ljung-Box p-value': float(ljung_box(acf, n)[1][-1]),
+        'Jarque-Bera p-value': float(pruebas_normalidad(residuos)['p_jarque_bera']),
+    }
+
+
+def directorio_backtesting():
+    huella = _huella_archivo('modelos.xlsx')
+    return os.path.join(directorio_cache, 'backtesting', f'{huella}-h{HORIZONTE_MODELOS}-p{N_PLIEGUES}')
+
+
+def _ejecutar_tarea(tarea):
+    # Se ejecuta en un proceso del pool: ajusta un modelo en un pliegue y guarda el modelo y sus métricas
+    objetivo, modelo, inicio, fin, ruta = tarea
+    X, y, _ = matriz_modelo(datos_modelos(), objetivo)
+    estimador = crear_estimador(modelo).fit(X[:inicio], y[:inicio])
+    resultado = {'metricas': metricas_regresion(y[inicio:fin], estimador.predict(X[inicio:fin])), 'estimador': estimador}
+    tmp = f'{ruta}.{os.getpid()}.tmp'
+    with open(tmp, 'wb') as f:
+        pickle.dump(resultado, f)
+    os.replace(tmp, ruta)
+    return ruta
+
+
+def ejecutar_backtesting(n_procesos=None, progreso=None):
+    datos_modelos()  # Se carga antes de crear el pool para que los procesos la hereden
+    destino = directorio_backtesting()
+    os.makedirs(destino, exist_ok=True)
+
+    tareas = []
+    for tab, (_, objetivo) in modelos_objetivos.items():
+        n = len(matriz_modelo(datos_modelos(), objetivo)[1])
+        for pliegue, (inicio, fin) in enumerate(pliegues_origen_movil(n)):
+            for modelo in nombres_modelos:
+                ruta = os.path.join(destino, f'{objetivo}-{modelo}-{pliegue}.pkl')
+                tareas.append((tab, modelo, ruta, (objetivo, modelo, int(inicio), int(fin), ruta)))
+
+    pendientes = [tarea for *_, ruta, tarea in tareas if not os.path.exists(ruta)]
+    if pendientes:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=n_procesos) as pool:
+            futuros = [pool.submit(_ejecutar_tarea, tarea) for tarea in pendientes]
+            for hechos, futuro in enumerate(concurrent.futures.as_completed(futuros), start=1):
+                futuro.result()
+                if progreso is not None:
+                    progreso(hechos, len(futuros))
+
+    # Resumen por objetivo y modelo: promedio de los errores y mediana de los p-valores entre pliegues
+    filas = []
+    for tab, modelo, ruta, _ in tareas:
+        with open(ruta, 'rb') as f:
+            filas.append({'Objetivo': tab, 'Modelo': modelo, **pickle.load(f)['metricas']})
+    resumen = pd.DataFrame(filas).groupby(['Objetivo', 'Modelo'], sort=False).agg({
+        'MAPE': 'mean', 'RMSE': 'mean', 'R^2': 'mean', 'Ljung-Box p-value': 'median', 'Jarque-Bera p-value': 'median'
+    }).reset_index()
+    for col in ['Ljung-Box p-value', 'Jarque-Bera p-value']:
+        resumen[col] = resumen[col].map('{:.6e}'.format)
+    registros = {tab: grupo.drop(columns='Objetivo').to_dict('records') for tab, grupo in resumen.groupby('Objetivo')}
+    with open(os.path.join(destino, 'resumen.pkl'), 'wb') as f:
+        pickle.dump(registros, f)
+    return resumen
+
+
+@app.callback(
+    [dash.dependencies.Output('estado-reentrenamiento', 'children'),
+     dash.dependencies.Output('version-modelos', 'data')],
+    [dash.dependencies.Input('boton-reentrenar', 'n_clicks')],
+    background=True,
+    manager=gestor_reentrenamiento,
+    progress=[dash.dependencies.Output('progreso-reentrenamiento', 'value'),
+              dash.dependencies.Output('progreso-reentrenamiento', 'label')],
+    running=[(dash.dependencies.Output('boton-reentrenar', 'disabled'), True, False),
+             (dash.dependencies.Output('progreso-reentrenamiento', 'style'), {'height': '20px'}, {'display': 'none'})],
+    prevent_initial_call=True,
+)
+def reentrenar_modelos(set_progress, n_clicks):
+    set_progress((0, 'En cola'))
+    with turno_trabajo():
+        resumen = ejecutar_backtesting(progreso=lambda hechos, total: set_progress((hechos * 100 // total, f'{hechos}/{total} combinaciones')))
+    return f'Backtesting terminado: {len(resumen)} combinaciones objetivo/modelo.', time.time()
+
+
+@functools.lru_cache(maxsize=2)
+def _leer_resumen(ruta, mtime):
+    with open(ruta, 'rb') as f:
+        return pickle.load(f)
+
+
+def metricas_vigentes():
+    # Métricas del último backtesting para la versión actual de modelos.xlsx, o las publicadas si no se ha corrido
+    ruta = os.path.join(directorio_backtesting(), 'resumen.pkl')
+    if os.path.exists(ruta):
+        return _leer_resumen(ruta, os.path.getmtime(ruta)), f'Backtesting de origen móvil ({N_PLIEGUES} pliegues) sobre modelos.xlsx'
+    return registros_metricas, 'Resultados publicados del entrenamiento original'
+
+
+# Ingesta incremental: los registros nuevos de cada sitio se dejan como archivos CSV/Parquet en su
+# directorio de ingesta, que funciona como registro de solo-anexión compartido. Cada worker lo revisa y,
+# si nadie lo hizo antes, valida los lotes nuevos con las mismas reglas de rango y escribe solo esas filas
+# como un segmento sobre el almacén de la versión anterior, identificado por la versión nueva; los demás
+# workers (y los reinicios) leen ese mismo almacén en lugar de repetir la anexión. Los rollups, el perfil
+# de cortante y la consistencia de gemelos que ya estaban calculados se extienden con las filas nuevas, y
+# al publicar la versión se borra del disco lo que solo servía a la anterior.
+ESPERA_ARCHIVO_INGESTA = 5  # segundos sin modificarse antes de leer un lote (evita leer archivos a medio escribir)
+
+
+def leer_lote(ruta, df):
+    lote = pd.read_parquet(ruta) if ruta.endswith('.parquet') else pd.read_csv(ruta)
+    lote = _compactar(_preparar_eda(lote)).reindex(columns=df.columns).astype(df.dtypes.to_dict())
+    return aplicar_reglas_rango(lote, reglas_rango)
+
+
+def ingerir_lotes(sitio, estado):
+    # Devuelve un estado nuevo del sitio con los lotes pendientes incorporados, o None si no hay lotes.
+    # El estado recibido no se modifica: quien lo esté usando sigue viendo una versión consistente.
+    directorio = sitios[sitio]['ingesta']
+    if not os.path.isdir(directorio):
+        return None
+    limite = time.time() - ESPERA_ARCHIVO_INGESTA
+    nuevos = {
+        nombre: _huella_archivo(os.path.join(directorio, nombre)) for nombre in sorted(os.listdir(directorio))
+        if nombre.endswith(('.csv', '.parquet')) and nombre not in estado['archivos_ingeridos']
+        and os.path.getmtime(os.path.join(directorio, nombre)) < limite
+    }
+    if not nuevos:
+        return None
+    archivos = {**estado['archivos_ingeridos'], **nuevos}
+    version = version_datos(sitio, estado['huella_base'], archivos)
+    destino = os.path.join(directorio_cache, f'sitio-{version}')
+    if os.path.isdir(destino):
+        # Otro worker ya escribió el almacén con estos lotes
+        return estado_desde_almacen(sitio, destino, estado['huella_base'], archivos, estado['candado'])
+
+    lotes = []
+    rechazados = estado['reporte_rangos']['Rechazados'].to_numpy()
+    for nombre in nuevos:
+        try:
+            lote, reporte = leer_lote(os.path.join(directorio, nombre), estado['df'])
+        except Exception as error:
+            # El lote cuenta como ingerido (forma parte de la versión) aunque no aporte filas
+            server.logger.warning('No se pudo ingerir %s: %s', nombre, error)
+            continue
+        lotes.append(lote)
+        rechazados = rechazados + reporte['Rechazados'].to_numpy()
+    nuevo = dict(estado, version=version, archivos_ingeridos=archivos,
+                 reporte_rangos=estado['reporte_rangos'].assign(Rechazados=rechazados))
+    if not lotes:
+        return nuevo
+
+    nuevas_filas = pd.concat(lotes)
+    _anexar_almacen(estado['almacen'], nuevas_filas.reset_index(), destino,
+                    {'reporte_rangos': nuevo['reporte_rangos'].to_dict('list')})
+    nuevo['almacen'] = destino
+    nuevo['df'] = _compactar(_leer_capas(destino))
+    # Los derivados se actualizan con las filas nuevas, sin recorrer de nuevo el dataset completo
+    extender_rollups(estado['version'], version, nuevo['df'], nuevas_filas)
+    extender_cortante(estado['version'], version, nuevas_filas)
+    extender_consistencia(estado['version'], version, nuevo['df'])
+    actualizar_estadisticas(nuevo, nuevas_filas)
+    nuevo['conteo_faltantes'] = estado['conteo_faltantes'] + nuevas_filas[variables_a_analizar].isnull().sum()
+    nuevo['total_filas'] = estado['total_filas'] + len(nuevas_filas)
+    nuevo['missing_data'] = calcular_datos_faltantes(nuevo)
+    nuevo['bytes'] = int(nuevo['df'].memory_usage(index=True, deep=True).sum())
+    return nuevo
+
+
+def revisar_ingesta(sitio):
+    with estado_sitio(sitio)['candado']:
+        # Se vuelve a leer dentro del candado: otro hilo pudo haber publicado una versión más nueva
+        estado = estado_sitio(sitio)
+        nuevo = ingerir_lotes(sitio, estado)
+        if nuevo is None:
+            return False
+        # df, versión y derivados se publican juntos; si el sitio fue expulsado mientras tanto no se reinserta
+        with _candado_sitios:
+            if _sitios_cargados.get(sitio) is estado:
+                _sitios_cargados[sitio] = nuevo
+        podar_version(sitio, estado, nuevo)
+        return True
+
+
+def derivados_version(version):
+    return [os.path.join(directorio_cache, nombre) for nombre in
+            [f'rollup-{version}-{resolucion}' for resolucion in resoluciones] + [f'cortante-{version}', f'gemelos-{version}']]
+
+
+def podar_version(sitio, anterior, nuevo):
+    # Borra los almacenes y derivados de la versión reemplazada que no forman parte de la cadena de segmentos
+    # de la nueva. El almacén base del archivo se conserva: es de donde arranca cualquier worker que cargue el
+    # sitio. Un worker que todavía tenga mapeada la versión anterior sigue leyendo sus archivos ya borrados.
+    def capas(destinos):
+        return {capa for destino in destinos if os.path.isdir(destino) for capa in _capas_almacen(destino)}
+
+    vigentes = capas([nuevo['almacen']] + derivados_version(nuevo['version']))
+    vigentes.add(os.path.join(directorio_cache, f"sitio-{nuevo['huella_base']}"))
+    for capa in capas([anterior['almacen']] + derivados_version(anterior['version'])) - vigentes:
+        shutil.rmtree(capa, ignore_errors=True)
+    podar_descomposiciones(sitio, nuevo['version'])
+
+
+# Reporte de memoria del worker: tamaño de cada sitio cargado por columna, cachés de figuras y memoria residente
+def _mapeada(arreglo):
+    while arreglo is not None:
+        if isinstance(arreglo, np.memmap):
+            return True
+        arreglo = arreglo.base
+    return False
+
+
+def reporte_memoria():
+    residente = None
+    if os.path.exists('/proc/self/statm'):
+        with open('/proc/self/statm') as f:
+            residente = int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    with _candado_sitios:
+        cargados = list(_sitios_cargados.items())
+    reporte_sitios = {}
+    for sitio, estado in cargados:
+        df = estado['df']
+        por_columna = df.memory_usage(index=True, deep=True)
+        # Las columnas mapeadas del almacén comparten páginas entre workers; el resto es memoria privada
+        mapeadas = [col for col in df.columns if _mapeada(df[col].to_numpy())]
+        reporte_sitios[sitio] = {
+            'version': estado['version'],
+            'filas': len(df),
+            'bytes_dataset': int(por_columna.sum()),
+            'bytes_mapeados': int(por_columna[mapeadas].sum()),
+            'bytes_por_columna': {str(col): int(n) for col, n in por_columna.items()},
+            'tipos': {str(col): str(tipo) for col, tipo in df.dtypes.items()},
+        }
+    return {
+        'pid': os.getpid(),
+        'sitios': reporte_sitios,
+        'sitios_registrados': list(sitios),
+        'bytes_cache_figuras': _bytes_cache_figuras,
+        'bytes_residentes': residente,
+    }
+
+
+@server.route('/memoria')
+def ruta_memoria():
+    return flask.jsonify(reporte_memoria())
+
+
+# Instrumentación de callbacks: alrededor de cada petición a /_dash-update-component se mide el tiempo total,
+# el tiempo de CPU del hilo, los bytes de la respuesta y los aciertos/fallos de la caché de figuras, por
+# callback y por valor de pestaña o ruta. /metrics los expone como histogramas en formato de texto de
+# Prometheus (por proceso: con varios workers cada uno publica los suyos). Con UMBRAL_PERFIL_S definido,
+# las peticiones que tardan más que el umbral se muestrean cada INTERVALO_PERFIL_S con sys._current_frames
+# y las pilas más frecuentes se registran en el log y quedan disponibles en /perfiles.
+ruta_callbacks = app.config.routes_pathname_prefix + '_dash-update-component'
+entradas_etiquetadas = {'tabs-intro', 'tabs-eda', 'tabs-modelos', 'url', 'selector-sitio'}
+limites_segundos = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+limites_bytes = [1024, 10 * 1024, 100 * 1024, 1024 ** 2, 10 * 1024 ** 2]
+UMBRAL_PERFIL_S = float(os.environ['UMBRAL_PERFIL_S']) if os.environ.get('UMBRAL_PERFIL_S') else None
+INTERVALO_PERFIL_S = float(os.environ.get('INTERVALO_PERFIL_S', 0.01))
+_histogramas = {}
+_contadores = collections.Counter()
+_perfiles_lentos = collections.deque(maxlen=20)
+_candado_metricas = threading.Lock()
+ayudas_metricas = {
+    'dash_callback_duracion_segundos': ('histogram', 'Tiempo total de la petición del callback'),
+    'dash_callback_cpu_segundos': ('histogram', 'Tiempo de CPU del hilo que atendió el callback'),
+    'dash_callback_respuesta_bytes': ('histogram', 'Tamaño de la respuesta serializada del callback'),
+    'dash_callback_errores_total': ('counter', 'Respuestas de callbacks con estado HTTP de error'),
+    'dash_callback_cache_total': ('counter', 'Consultas a la caché de figuras durante el callback'),
+    'dash_figura_cache_total': ('counter', 'Consultas a la caché de figuras por constructor'),
+}
+
+
+def observar(nombre, etiquetas, valor, limites):
+    with _candado_metricas:
+        histograma = _histogramas.setdefault((nombre, etiquetas), {'limites': limites, 'cubetas': [0] * len(limites), 'suma': 0.0, 'conteo': 0})
+        for i, limite in enumerate(limites):
+            if valor <= limite:
+                histograma['cubetas'][i] += 1
+        histograma['suma'] += valor
+        histograma['conteo'] += 1
+
+
+def registrar_cache(constructor, acierto):
+    resultado = 'acierto' if acierto else 'fallo'
+    with _candado_metricas:
+        _contadores[('dash_figura_cache_total', (('constructor', constructor), ('resultado', resultado)))] += 1
+    if flask.has_request_context() and 'metricas' in flask.g:
+        flask.g.metricas[resultado] += 1
+
+
+def identificar_callback(cuerpo):
+    # Nombre de la función del callback y valor de la pestaña o ruta que lo disparó (si corresponde)
+    salida = cuerpo.get('output', '')
+    nombre = getattr(app.callback_map.get(salida, {}).get('callback'), '__name__', salida)
+    valores = [entrada.get('value') for entrada in cuerpo.get('inputs', [])
+               if isinstance(entrada, dict) and entrada.get('id') in entradas_etiquetadas and isinstance(entrada.get('value'), str)]
+    return nombre, ','.join(valores)
+
+
+def muestrear_pilas(ident, detener, pilas):
+    while not detener.wait(INTERVALO_PERFIL_S):
+        frame = sys._current_frames().get(ident)
+        if frame is None:
+            return
+        pilas[tuple(f'{marco.filename}:{marco.lineno} {marco.name}' for marco in traceback.extract_stack(frame))] += 1
+
+
+@server.before_request
+def iniciar_medicion():
+    if flask.request.path != ruta_callbacks:
+        return
+    flask.g.metricas = {'inicio': time.perf_counter(), 'cpu': time.thread_time(), 'acierto': 0, 'fallo': 0}
+    if UMBRAL_PERFIL_S is not None:
+        detener, pilas = threading.Event(), collections.Counter()
+        muestreo = threading.Timer(UMBRAL_PERFIL_S, muestrear_pilas, args=(threading.get_ident(), detener, pilas))
+        muestreo.daemon = True
+        muestreo.start()
+        flask.g.metricas['muestreo'] = (muestreo, detener, pilas)
+
+
+@server.after_request
+def registrar_medicion(respuesta):
+    metricas = flask.g.pop('metricas', None)
+    if metricas is None:
+        return respuesta
+    duracion = time.perf_counter() - metricas['inicio']
+    cpu = time.thread_time() - metricas['cpu']
+    nombre, valor = identificar_callback(flask.request.get_json(silent=True) or {})
+    etiquetas = (('callback', nombre), ('valor', valor))
+    observar('dash_callback_duracion_segundos', etiquetas, duracion, limites_segundos)
+    observar('dash_callback_cpu_segundos', etiquetas, cpu, limites_segundos)
+    observar('dash_callback_respuesta_bytes', etiquetas, respuesta.calculate_content_length() or 0, limites_bytes)
+    with _candado_metricas:
+        for resultado in ('acierto', 'fallo'):
+            if metricas[resultado]:
+                _contadores[('dash_callback_cache_total', etiquetas + (('resultado', resultado),))] += metricas[resultado]
+        if respuesta.status_code >= 400:
+            _contadores[('dash_callback_errores_total', etiquetas)] += 1
+
+    if 'muestreo' in metricas:
+        muestreo, detener, pilas = metricas['muestreo']
+        detener.set()
+        muestreo.cancel()
+        if pilas:
+            frecuentes = [{'muestras': n, 'pila': list(pila)} for pila, n in pilas.most_common(5)]
+            _perfiles_lentos.append({'callback': nombre, 'valor': valor, 'segundos': round(duracion, 3),
+                                     'momento': time.strftime('%Y-%m-%d %H:%M:%S'), 'pilas': frecuentes})
+            server.logger.warning('Callback lento %s (%s): %.2f s\n%s', nombre, valor, duracion, '\n'.join(frecuentes[0]['pila'][-15:]))
+    return respuesta
+
+
+def _etiquetas_prometheus(etiquetas):
+    def escapar(texto):
+        return str(texto).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return ','.join(f'{clave}="{escapar(valor)}"' for clave, valor in etiquetas)
+
+
+def texto_metricas():
+    with _candado_metricas:
+        histogramas = {clave: {**h, 'cubetas': list(h['cubetas'])} for clave, h in _histogramas.items()}
+        contadores = dict(_contadores)
+    lineas = []
+    for nombre, (tipo, ayuda) in ayudas_metricas.items():
+        lineas += [f'# HELP {nombre} {ayuda}', f'# TYPE {nombre} {tipo}']
+        if tipo == 'histogram':
+            for (metrica, etiquetas), h in sorted(histogramas.items()):
+                if metrica != nombre:
+                    continue
+                for limite, conteo in zip(h['limites'], h['cubetas']):
+                    lineas.append(f'{nombre}_bucket{{{_etiquetas_prometheus(etiquetas + (("le", f"{limite:g}"),))}}} {conteo}')
+                lineas.append(f'{nombre}_bucket{{{_etiquetas_prometheus(etiquetas + (("le", "+Inf"),))}}} {h["conteo"]}')
+                lineas.append(f'{nombre}_sum{{{_etiquetas_prometheus(etiquetas)}}} {h["suma"]:.6f}')
+                lineas.append(f'{nombre}_count{{{_etiquetas_prometheus(etiquetas)}}} {h["conteo"]}')
+        else:
+            for (metrica, etiquetas), conteo in sorted(contadores.items()):
+                if metrica == nombre:
+                    lineas.append(f'{nombre}{{{_etiquetas_prometheus(etiquetas)}}} {conteo}')
+    return '\n'.join(lineas) + '\n'
+
+
+@server.route('/metrics')
+def ruta_metricas():
+    return flask.Response(texto_metricas(), mimetype='text/plain; version=0.0.4')
+
+
+@server.route('/perfiles')
+def ruta_perfiles():
+    return flask.jsonify(list(_perfiles_lentos))
+
+
+# Arranque rápido: al importar no se carga ningún dataset, así que el worker queda escuchando de inmediato.
+# El calentamiento carga los sitios de SITIOS_PRECARGA y arma las figuras de las pestañas más visitadas:
+#   MODO_ARRANQUE=fondo     en un hilo aparte dentro de cada worker (por defecto)
+#   MODO_ARRANQUE=precarga  al importar; con `gunicorn --preload` corre una sola vez en el proceso maestro
+#                           y los workers comparten esa memoria por copy-on-write
+#   MODO_ARRANQUE=perezoso  sin calentamiento: todo se carga con la primera consulta
+# /health responde mientras el proceso esté vivo; /ready responde 503 hasta que termine el calentamiento.
+MODO_ARRANQUE = os.environ.get('MODO_ARRANQUE', 'fondo')
+sitios_precarga = [nombre for nombre in os.environ.get('SITIOS_PRECARGA', SITIO_PREDETERMINADO).split(',') if nombre in sitios]
+pestanas_precarga = ['tab-graficos', 'tab-estadisticas', 'tab-cortante', 'tab-weibull', 'tab-correlacion']
+momento_inicio = time.time()
+estado_arranque = {'etapa': 'perezoso' if MODO_ARRANQUE == 'perezoso' else 'pendiente', 'completado': [], 'error': None, 'segundos': None}
+
+
+def calentar():
+    estado_arranque['etapa'] = 'calentando'
+    try:
+        for sitio in sitios_precarga:
+            for tab in pestanas_precarga:
+                contenido_eda(tab, sitio)
+                estado_arranque['completado'].append(f'{sitio}/{tab}')
+        for _, objetivo in modelos_objetivos.values():
+            create_prediction_figure(objetivo)
+            create_diagnostics_figure(objetivo)
+        estado_arranque['completado'].append('modelos')
+        estado_arranque['etapa'] = 'listo'
+    except Exception as error:
+        server.logger.exception('Falló el calentamiento')
+        estado_arranque.update(etapa='error', error=str(error))
+    estado_arranque['segundos'] = round(time.time() - momento_inicio, 2)
+
+
+@server.route('/health')
+def ruta_salud():
+    return flask.jsonify({'estado': 'vivo', 'pid': os.getpid(), 'segundos_activo': round(time.time() - momento_inicio, 2)})
+
+
+@server.route('/ready')
+def ruta_listo():
+    listo = estado_arranque['etapa'] in ('listo', 'perezoso')
+    return flask.jsonify({**estado_arranque, 'listo': listo, 'pid': os.getpid()}), 200 if listo else 503
+
+
+# Los procesos hijos (trabajos en segundo plano, backtesting) y `python index.py entrenar` no calientan ni
+# barren la caché de formatos anteriores
+if multiprocessing.parent_process() is None and sys.argv[1:2] != ['entrenar']:
+    podar_formatos_anteriores()
+    if MODO_ARRANQUE == 'precarga':
+        calentar()
+    elif MODO_ARRANQUE == 'fondo':
+        threading.Thread(target=calentar, name='calentamiento', daemon=True).start()
 
 
 # Callback para manejar las diferentes páginas
@@ -761,5 +3508,9 @@ def display_page(pathname):
 
 # Ejecución de la aplicación
 if __name__ == "__main__":
-    port = int(os.environ.get("PORT", 8050))
-    app.run_server(host="0.0.0.0", port=port)
+    if sys.argv[1:2] == ['entrenar']:
+        # python index.py entrenar [procesos]: corre el backtesting y guarda modelos y métricas
+        print(ejecutar_backtesting(int(sys.argv[2]) if len(sys.argv) > 2 else None).to_string())
+    else:
+        port = int(os.environ.get("PORT", 8050))
+        app.run(host="0.0.0.0", port=port)
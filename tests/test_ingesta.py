@@ -0,0 +1,117 @@
+# Ingesta incremental: los segmentos del almacén y los derivados extendidos deben coincidir con recalcular
+# todo sobre el dataset ampliado, y al publicar la versión nueva se borra lo que solo usaba la anterior.
+#
+#   python -m pytest -q tests
+import os
+import sys
+import time
+import tempfile
+import numpy as np
+import pandas as pd
+import pytest
+
+directorio = tempfile.mkdtemp(prefix='pruebas-')
+os.environ.setdefault('DIRECTORIO_CACHE', os.path.join(directorio, 'cache'))
+os.environ.setdefault('DIRECTORIO_INGESTA', os.path.join(directorio, 'ingesta'))
+os.environ.setdefault('MODO_ARRANQUE', 'perezoso')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import index  # noqa: E402
+from benchmark import generar_mastil  # noqa: E402
+
+SITIO = 'prueba-ingesta'
+
+
+@pytest.fixture
+def sitio(tmp_path, monkeypatch):
+    tabla = generar_mastil(4000, semilla=1)
+    tabla.iloc[:3000].to_parquet(tmp_path / 'base.parquet')
+    ingesta = tmp_path / 'ingesta'
+    ingesta.mkdir()
+    monkeypatch.setitem(index.sitios, SITIO, {'archivo': str(tmp_path / 'base.parquet'), 'ingesta': str(ingesta)})
+    yield tabla, ingesta
+    with index._candado_sitios:
+        index._sitios_cargados.pop(SITIO, None)
+
+
+def dejar_lote(ingesta, nombre, filas):
+    ruta = ingesta / nombre
+    filas.to_parquet(ruta)
+    antiguo = time.time() - 2 * index.ESPERA_ARCHIVO_INGESTA
+    os.utime(ruta, (antiguo, antiguo))
+
+
+def calcular_derivados(version):
+    for resolucion in ['hora', 'dia', 'mes']:
+        index.rollup(SITIO, resolucion, version)
+    index.perfil_cortante(SITIO, version)
+    index.consistencia_pares(SITIO, version)
+
+
+def comprobar_derivados(estado):
+    df, version = estado['df'], estado['version']
+    for resolucion in ['hora', 'dia', 'mes']:
+        extendido = index.rollup(SITIO, resolucion, version)
+        pd.testing.assert_frame_equal(extendido, index.agregar_intervalos(df, index.resoluciones[resolucion]), check_dtype=False)
+    perfil = index.perfil_cortante(SITIO, version)
+    pd.testing.assert_frame_equal(perfil.reset_index(), index.tabla_perfil(df))
+    reconstruccion, ajustes = index.consistencia_pares(SITIO, version)
+    completa, ajustes_completos = index.tabla_gemelos(df)
+    for columna in completa.columns.drop('Fecha'):
+        np.testing.assert_allclose(reconstruccion[columna].to_numpy(dtype=float), completa[columna].to_numpy(dtype=float),
+                                   rtol=1e-5, atol=1e-5, err_msg=columna)
+    for par, ajuste in ajustes_completos.items():
+        assert ajustes[par]['registros'] == ajuste['registros']
+        for sensor in par.split('|'):
+            np.testing.assert_allclose(ajustes[par][sensor]['sumas'], ajuste[sensor]['sumas'], rtol=1e-9)
+            assert ajustes[par][sensor]['pendiente'] == pytest.approx(ajuste[sensor]['pendiente'], rel=1e-9)
+
+
+def test_segmento_y_derivados_extendidos(sitio):
+    tabla, ingesta = sitio
+    anterior = index.estado_sitio(SITIO)
+    calcular_derivados(anterior['version'])
+
+    dejar_lote(ingesta, 'lote1.parquet', tabla.iloc[3000:3500])
+    assert index.revisar_ingesta(SITIO)
+    estado = index.estado_sitio(SITIO)
+    assert len(estado['df']) == 3500
+    # Las filas nuevas quedan en un segmento sobre el almacén base, y el perfil de cortante también
+    assert index._capas_almacen(estado['almacen']) == [anterior['almacen'], estado['almacen']]
+    assert len(index._capas_almacen(os.path.join(index.directorio_cache, f"cortante-{estado['version']}"))) == 2
+    pd.testing.assert_frame_equal(estado['df'], index._compactar(index._preparar_sitio(tabla.iloc[:3500])[0]), check_freq=False)
+    comprobar_derivados(estado)
+    # Se borraron los derivados de la versión reemplazada, salvo el perfil de cortante (es la base del
+    # segmento nuevo); el almacén base se conserva
+    cortante = os.path.join(index.directorio_cache, f"cortante-{anterior['version']}")
+    assert [destino for destino in index.derivados_version(anterior['version']) if os.path.isdir(destino)] == [cortante]
+    assert os.path.isdir(anterior['almacen'])
+
+
+def test_lote_con_fechas_anteriores_y_compactacion(sitio, monkeypatch):
+    tabla, ingesta = sitio
+    dejar_lote(ingesta, 'lote1.parquet', tabla.iloc[3000:3500])
+    index.revisar_ingesta(SITIO)
+    intermedio = index.estado_sitio(SITIO)
+    calcular_derivados(intermedio['version'])
+
+    # Registros atrasados en medio del rango: los rollups se rehacen desde su intervalo
+    monkeypatch.setattr(index, 'MAX_SEGMENTOS_ALMACEN', 1)
+    atrasados = tabla.iloc[3500:4000].assign(SoftwareVersion=tabla['SoftwareVersion'].iloc[1000:1500].to_numpy())
+    dejar_lote(ingesta, 'lote2.parquet', atrasados)
+    assert index.revisar_ingesta(SITIO)
+    estado = index.estado_sitio(SITIO)
+    # Con la cadena en el máximo de segmentos se compacta en un almacén completo
+    assert index._capas_almacen(estado['almacen']) == [estado['almacen']]
+    assert len(estado['df']) == 4000
+    comprobar_derivados(estado)
+    assert not os.path.isdir(intermedio['almacen'])
+
+
+def test_podar_formatos_anteriores():
+    viejo = os.path.join(index.directorio_cache, f'rollup-{SITIO}-v{index.VERSION_ALMACEN - 1}-0123456789abcdef0123-hora')
+    vigente = os.path.join(index.directorio_cache, f'rollup-{SITIO}-v{index.VERSION_ALMACEN}-0123456789abcdef0123-hora')
+    for destino in (viejo, vigente):
+        os.makedirs(destino)
+    index.podar_formatos_anteriores()
+    assert not os.path.isdir(viejo) and os.path.isdir(vigente)
@@ -0,0 +1,113 @@
+# Pruebas de los motores numéricos de index.py contra las implementaciones de referencia de numpy, pandas y statsmodels.
+#
+#   python -m pytest -q tests
+import os
+import sys
+import tempfile
+import numpy as np
+import pandas as pd
+import pytest
+
+# La app se importa con una caché vacía y sin calentamiento: solo se usan funciones puras
+directorio = tempfile.mkdtemp(prefix='pruebas-')
+os.environ.setdefault('DIRECTORIO_CACHE', os.path.join(directorio, 'cache'))
+os.environ.setdefault('DIRECTORIO_INGESTA', os.path.join(directorio, 'ingesta'))
+os.environ.setdefault('MODO_ARRANQUE', 'perezoso')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import index  # noqa: E402
+
+
+@pytest.fixture
+def generador():
+    return np.random.default_rng(0)
+
+
+@pytest.mark.parametrize('n_puntos', [3, 10, 500])
+def test_lttb_conserva_extremos_y_largo(generador, n_puntos):
+    x = np.arange(5000, dtype=np.int64) * 600
+    y = np.cumsum(generador.standard_normal(5000))
+    y[[0, 1, 2500, 4999]] = np.nan
+    indices = index.indices_lttb(x, y, n_puntos)
+    validos = np.flatnonzero(~np.isnan(y))
+    assert len(indices) == n_puntos
+    assert indices[0] == validos[0] and indices[-1] == validos[-1]
+    assert np.all(np.diff(indices) > 0)
+    assert not np.isnan(y[indices]).any()
+
+
+def test_lttb_serie_corta_sin_cambios():
+    y = np.array([1.0, np.nan, 3.0, 4.0])
+    assert list(index.indices_lttb(np.arange(4), y, 10)) == [0, 2, 3]
+
+
+def test_tdigest_cuartiles(generador):
+    # Acumuladores calculados por partes y combinados, como al ingerir lotes
+    valores = 8 * generador.weibull(2.0, 60000)
+    valores[generador.choice(len(valores), 600, replace=False)] = np.nan
+    acumulador = index.acumulador_columna(valores[:20000])
+    for inicio in range(20000, len(valores), 10000):
+        acumulador = index.combinar_acumuladores(acumulador, index.acumulador_columna(valores[inicio:inicio + 10000]))
+    validos = np.sort(valores[~np.isnan(valores)])
+    assert acumulador['conteo'] == len(validos)
+    for q in [0, 0.25, 0.5, 0.75, 1]:
+        estimado = index._cuantil_tdigest(acumulador, q)
+        assert abs(estimado - np.quantile(validos, q)) < 0.05
+        # Error en rango: posición del estimado dentro de los datos ordenados
+        assert abs(np.searchsorted(validos, estimado) / len(validos) - q) < 0.005
+
+
+def test_rachas_faltantes_coinciden_con_grupos_de_isnull(generador):
+    tabla = pd.DataFrame(generador.standard_normal((3000, 4)), columns=list('abcd'))
+    for col in tabla.columns:
+        tabla.loc[generador.random(len(tabla)) < 0.1, col] = np.nan
+    tabla.loc[:40, 'a'] = np.nan
+    tabla.loc[2950:, 'b'] = np.nan
+    tabla['d'] = np.nan
+    sensor, inicios, fines = index.rachas_faltantes(tabla.isnull().to_numpy())
+    for j, col in enumerate(tabla.columns):
+        nulos = tabla[col].isnull()
+        grupo = (nulos != nulos.shift()).cumsum()
+        esperadas = [(g.index[0], g.index[-1] + 1) for _, g in nulos[nulos].groupby(grupo[nulos])]
+        assert list(zip(inicios[sensor == j], fines[sensor == j])) == esperadas
+
+
+def test_weibull_recupera_parametros(generador):
+    k_real = np.array([1.6, 2.0, 2.8, 3.5])
+    c_real = np.array([5.0, 7.5, 9.0, 12.0])
+    grupos = np.repeat(np.arange(4), 20000)
+    valores = c_real[grupos] * generador.weibull(k_real[grupos])
+    # Un grupo con menos registros que el mínimo queda sin ajuste
+    grupos = np.r_[grupos, np.full(5, 4)]
+    valores = np.r_[valores, np.full(5, 6.0)]
+    n, media, k, c = index.ajuste_weibull(valores, grupos, 5)
+    assert list(n) == [20000] * 4 + [5]
+    np.testing.assert_allclose(k[:4], k_real, rtol=0.02)
+    np.testing.assert_allclose(c[:4], c_real, rtol=0.01)
+    assert np.isnan(k[4]) and np.isnan(c[4])
+
+
+def test_acf_pacf_coinciden_con_statsmodels(generador):
+    from statsmodels.tsa.stattools import acf, pacf
+    ruido = generador.standard_normal(4000)
+    serie = np.empty_like(ruido)
+    serie[:2] = ruido[:2]
+    for t in range(2, len(serie)):
+        serie[t] = 0.6 * serie[t - 1] - 0.2 * serie[t - 2] + ruido[t]
+    autocorrelacion, n = index.autocorrelacion_fft(serie, 40)
+    assert n == len(serie)
+    np.testing.assert_allclose(autocorrelacion, acf(serie, nlags=40, fft=False), atol=1e-10)
+    np.testing.assert_allclose(index.pacf_durbin_levinson(autocorrelacion), pacf(serie, nlags=40, method='ldb'), atol=1e-10)
+
+
+def test_pearson_por_pares_coincide_con_corr(generador, monkeypatch):
+    # Bloques pequeños para que la acumulación por bloques de filas también quede probada
+    monkeypatch.setattr(index, 'FILAS_BLOQUE_CORRELACION', 700)
+    base = generador.standard_normal((5000, 1))
+    tabla = pd.DataFrame(base + 0.5 * generador.standard_normal((5000, 5)) + np.arange(5) * 10, columns=list('abcde'))
+    for col in tabla.columns:
+        tabla.loc[generador.random(len(tabla)) < 0.15, col] = np.nan
+    tabla.loc[:4990, 'e'] = np.nan  # Solo 9 registros: los pares con 'e' siguen por encima del mínimo de 3
+    r, n = index.correlacion_pares(tabla.to_numpy())
+    np.testing.assert_allclose(r, tabla.corr().to_numpy(), atol=1e-10)
+    assert (n == tabla.notna().astype(int).T.dot(tabla.notna().astype(int)).to_numpy()).all()